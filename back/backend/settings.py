@@ -45,6 +45,29 @@ SECRET_KEY = 'django-insecure-9%6v-es02t-b)=xxmxpk!^ym@+_ujle%%vpvy5qyqrigj@j6rs
 
 # Clé API TMDB depuis .env
 TMDB_API_TOKEN = os.getenv('TMDB_API_TOKEN')
+# Surchargeable pour pointer vers un serveur TMDB local (tests, CI)
+TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+
+# Nombre de signalements à partir duquel un commentaire est supprimé automatiquement
+REVIEW_REPORT_DELETE_THRESHOLD = int(os.getenv('REVIEW_REPORT_DELETE_THRESHOLD', '10'))
+# Recommandations (manage.py build_recommendations) : voisins gardés par film et
+# part de la similarité de genres face au filtrage collaboratif (0 à 1)
+RECOMMENDATION_NEIGHBORS = int(os.getenv('RECOMMENDATION_NEIGHBORS', '20'))
+RECOMMENDATION_CONTENT_WEIGHT = float(os.getenv('RECOMMENDATION_CONTENT_WEIGHT', '0.3'))
+
+# Ménage (manage.py prune_expired) : durée de conservation en jours
+EXPIRED_TOKEN_RETENTION_DAYS = int(os.getenv('EXPIRED_TOKEN_RETENTION_DAYS', '1'))
+PENDING_USER_RETENTION_DAYS = int(os.getenv('PENDING_USER_RETENTION_DAYS', '2'))
+EMAIL_VERIFICATION_RETENTION_DAYS = int(os.getenv('EMAIL_VERIFICATION_RETENTION_DAYS', '2'))
+TASK_RETENTION_DAYS = int(os.getenv('TASK_RETENTION_DAYS', '7'))
+
+# Tâches lancées régulièrement par les workers (manage.py run_tasks) : {nom: période en secondes}
+PERIODIC_TASKS = {
+    'users.prune_expired': 60 * 60,
+    # Recalcul incrémental des films voisins (seuls les films touchés depuis le dernier passage)
+    'movies.build_recommendations': int(os.getenv('RECOMMENDATIONS_INTERVAL', str(15 * 60))),
+}
+
 DATABASE_NAME = os.getenv('DATABASE_NAME')
 # BACKEND_URL = os.getenv('BACKEND_URL')
 
@@ -85,6 +108,7 @@ INSTALLED_APPS = [
     # Apps internes
     'movies',
     'users',
+    'tasks',
 ]
 
 # Middleware
@@ -143,8 +167,12 @@ CORS_ALLOW_HEADERS = [
 # Authentification REST avec JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication avec l'utilisateur en cache (pas de requête SQL par appel)
+        'users.authentication.CachedJWTAuthentication',
     ),
+    # Proxys de confiance devant l'application (nginx...) : 0 = l'IP cliente est REMOTE_ADDR
+    # et X-Forwarded-For, que tout client peut forger, est ignoré par les limitations
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
 # Configuration de SimpleJWT
@@ -185,14 +213,94 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
-# Base de données locale SQLite
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / DATABASE_NAME,
+# Profil SQLite de production, appliqué à chaque connexion (init_command) :
+# - WAL : les lectures ne bloquent plus les écritures et inversement ;
+# - synchronous=NORMAL : sûr en WAL, un fsync par checkpoint au lieu d'un par commit ;
+# - mmap et tables temporaires en mémoire pour les lectures ;
+# - transaction_mode IMMEDIATE : une transaction prend le verrou d'écriture dès
+#   BEGIN, les écrivains concurrents attendent leur tour (timeout) au lieu
+#   d'échouer en « database is locked » quand une lecture veut devenir écriture.
+# Comparaison avec le profil par défaut : manage.py bench_concurrent_writes
+# Activé avec SQLITE_PRODUCTION_PROFILE=True (.env de production) ; en dev et dans
+# les tests, SQLite garde les réglages par défaut de Django.
+SQLITE_PRODUCTION_PROFILE = os.getenv("SQLITE_PRODUCTION_PROFILE", "False") == "True"
+SQLITE_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};"
+        "PRAGMA temp_store=MEMORY;"
+    ),
+    "transaction_mode": "IMMEDIATE",
+    # Attente maximale du verrou d'écriture (busy timeout), en secondes
+    "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+}
+
+# Base de données : SQLite par défaut, PostgreSQL avec DB_ENGINE=postgresql (voir README)
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "critiq"),
+            "USER": os.getenv("DB_USER", "critiq"),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            # Pool de connexions psycopg 3 (pip install "psycopg[binary,pool]") ;
+            # incompatible avec CONN_MAX_AGE, qui reste donc à 0
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / DATABASE_NAME,
+        }
     }
+    if SQLITE_PRODUCTION_PROFILE:
+        DATABASES["default"].update({
+            "OPTIONS": SQLITE_OPTIONS,
+            # Connexions gardées ouvertes entre les requêtes (PRAGMA appliqués une fois)
+            "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+        })
+
+# Cache : mémoire locale en dev ; en prod CACHE_BACKEND=file ou redis (CACHE_LOCATION = dossier ou URL)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHES = {
+    "default": {
+        "locmem": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "critiq",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+        "file": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache")),
+        },
+        "redis": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379"),
+        },
+    }[CACHE_BACKEND]
 }
 
+# Connexion par nom d'utilisateur ou email, sans casse, en une requête indexée
+AUTHENTICATION_BACKENDS = ['users.backends.EmailOrUsernameBackend']
+
+# Échecs de connexion tolérés par fenêtre (secondes) avant une réponse 429 :
+# par IP, et par compte depuis une même IP (users/throttling.py)
+LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', '300'))
+LOGIN_THROTTLE_IP_FAILURES = int(os.getenv('LOGIN_THROTTLE_IP_FAILURES', '20'))
+LOGIN_THROTTLE_ACCOUNT_FAILURES = int(os.getenv('LOGIN_THROTTLE_ACCOUNT_FAILURES', '5'))
+
 # Validation des mots de passe
 AUTH_PASSWORD_VALIDATORS = [
     {
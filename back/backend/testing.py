@@ -0,0 +1,144 @@
+"""
+Outils de test partagés : budget de requêtes SQL et de latence par route.
+
+Chaque route des API `movies` et `users` a un budget (nombre maximal de
+requêtes SQL, latence maximale en ms). Un test qui dépasse son budget de
+requêtes échoue, ce qui attrape les régressions N+1 dans les serializers.
+
+La latence dépend de la charge de la machine : elle est seulement mesurée et
+rapportée, sauf si QUERY_BUDGET_ENFORCE_LATENCY=1 (machine dédiée aux mesures).
+
+Si la variable d'environnement QUERY_BUDGET_REPORT est définie, les mesures
+sont écrites dans ce fichier JSON pour suivre les chiffres entre versions.
+"""
+import json
+import os
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, resolve
+
+# Nom de route -> (requêtes SQL max, latence max en ms)
+QUERY_BUDGETS = {
+    # movies
+    'api-root': (0, 200),
+    'movie-list': (3, 500),
+    'movie-genre-facets': (1, 500),
+    'movie-recommended': (4, 300),
+    'movie-detail': (2, 200),
+    'movie-reviews': (3, 300),
+    'movie-add-review': (5, 300),
+    'movie-update-review': (4, 300),
+    'movie-delete-review': (5, 200),
+    'movie-like': (10, 300),
+    'movie-view': (10, 300),
+    'movie-bulk-view': (5, 300),
+    'movie-report-review': (7, 300),
+    'movie-reported-reviews': (2, 300),
+    'movie-reports': (8, 300),
+    'movie-all-reported-reviews': (3, 500),
+    'movie-moderate-reviews': (5, 500),
+    'list-list': (1, 300),
+    'list-detail': (3, 500),
+    'list-movies': (4, 300),
+    'list-add-movie': (6, 300),
+    'list-remove-movie': (3, 300),
+    'list-add-movies': (5, 300),
+    'list-remove-movies': (5, 300),
+    # users
+    'login': (2, 500),
+    'logout': (7, 300),
+    'me': (0, 200),
+    'register': (2, 300),
+    'token_refresh': (13, 300),
+    'update_profile': (3, 300),
+    'resend_verification': (4, 300),
+    'verify-email': (6, 300),
+}
+
+# Budgets de latence vérifiés (sinon seulement rapportés) et facteur appliqué
+ENFORCE_LATENCY = os.getenv('QUERY_BUDGET_ENFORCE_LATENCY', '') == '1'
+LATENCY_FACTOR = float(os.getenv('QUERY_BUDGET_LATENCY_FACTOR', '1'))
+
+_report = {}
+
+
+def _callback_name(callback):
+    # Les vues @api_view sont enveloppées : on retrouve le nom de la fonction d'origine
+    return getattr(getattr(callback, 'cls', None), '__name__', None) or callback.__name__
+
+
+def route_name(match):
+    return match.url_name or _callback_name(match.func)
+
+
+def iter_routes(urlconf_module):
+    """Liste les noms de routes déclarées dans un module urls (récursivement)."""
+    patterns = get_resolver(urlconf_module).url_patterns
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                yield pattern.name or _callback_name(pattern.callback)
+
+    return set(walk(patterns))
+
+
+def write_report():
+    path = os.getenv('QUERY_BUDGET_REPORT')
+    if not path or not _report:
+        return
+    existing = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+    existing.update(_report)
+    with open(path, 'w') as f:
+        json.dump(existing, f, indent=2, sort_keys=True)
+
+
+class QueryBudgetMixin:
+    """À combiner avec un TestCase utilisant `self.client` (APIClient)."""
+
+    @classmethod
+    def tearDownClass(cls):
+        write_report()
+        super().tearDownClass()
+
+    def assertWithinBudget(self, method, url, expected_status=200, **kwargs):
+        name = route_name(resolve(url.split('?')[0]))
+        self.assertIn(name, QUERY_BUDGETS, f"Aucun budget défini pour la route '{name}'")
+        max_queries, max_ms = QUERY_BUDGETS[name]
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertEqual(response.status_code, expected_status, getattr(response, 'data', response))
+        queries = len(ctx.captured_queries)
+        # On garde la mesure la plus coûteuse de chaque route
+        if queries >= _report.get(name, {}).get('queries', -1):
+            _report[name] = {
+                'method': method.upper(),
+                'url': url,
+                'queries': queries,
+                'max_queries': max_queries,
+                'ms': round(elapsed_ms, 2),
+                'max_ms': max_ms,
+                'over_latency_budget': elapsed_ms > max_ms * LATENCY_FACTOR,
+            }
+        self.assertLessEqual(
+            queries, max_queries,
+            f"{method.upper()} {url}: {queries} requêtes SQL (budget {max_queries})\n"
+            + "\n".join(q['sql'] for q in ctx.captured_queries)
+        )
+        if ENFORCE_LATENCY:
+            self.assertLessEqual(
+                elapsed_ms, max_ms * LATENCY_FACTOR,
+                f"{method.upper()} {url}: {elapsed_ms:.0f} ms (budget {max_ms} ms)"
+            )
+        return response
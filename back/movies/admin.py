@@ -1,13 +1,15 @@
 from django.contrib import admin
-from .models import Movie, Review, List, MovieInList, Like, View, Report
+from .models import Movie, Genre, Review, List, MovieInList, Like, View, Report, MovieNeighbor
 
 admin.site.register(Movie)
+admin.site.register(Genre)
 admin.site.register(Review)
 admin.site.register(List)
 admin.site.register(MovieInList)
 admin.site.register(Like)
 admin.site.register(View)
 admin.site.register(Report)
+admin.site.register(MovieNeighbor)
 
 # from django.contrib import admin
 # from .models import Movie
@@ -0,0 +1,144 @@
+"""
+Cache des lectures du catalogue (MovieViewSet.list / retrieve, movie_list).
+
+La partie partagée d'une réponse est séparée de la surcouche propre à chaque
+utilisateur :
+- catalog:gen           génération du catalogue (horodatage), changée quand un film
+                        ou un avis change : elle préfixe les pages de liste ;
+- catalog:page:<gen>:…  une page de liste : ids des films + count / next / previous ;
+- movie:<id>            représentation partagée d'un film (sans is_liked / is_viewed) ;
+- user:<id>:flags       films aimés / vus par l'utilisateur.
+
+Les entrées sont invalidées précisément par les signaux post_save / post_delete
+(movies/signals.py), pas par des TTL courts ; les écritures en masse (bulk_create,
+update) appellent directement les fonctions invalidate_*.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Filet de sécurité seulement : l'invalidation se fait par signaux
+ENTRY_TIMEOUT = 60 * 60
+
+GENERATION_KEY = 'catalog:gen'
+
+
+def catalog_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time()
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def movie_key(movie_id):
+    return f'movie:{movie_id}'
+
+
+def user_flags_key(user_id):
+    return f'user:{user_id}:flags'
+
+
+def page_key(generation, uri):
+    return f'catalog:page:{generation}:{hashlib.md5(uri.encode()).hexdigest()}'
+
+
+def _now_and_on_commit(func):
+    # Tout de suite pour cette requête, et de nouveau après le commit pour qu'une
+    # lecture concurrente n'ait pas remis en cache l'état d'avant la transaction
+    func()
+    transaction.on_commit(func)
+
+
+def invalidate_catalog():
+    """Les pages de liste (filtres, tris, count) ne sont plus valables."""
+    _now_and_on_commit(lambda: cache.set(GENERATION_KEY, time.time(), None))
+
+
+def invalidate_movies(movie_ids):
+    keys = [movie_key(movie_id) for movie_id in movie_ids]
+    if keys:
+        _now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user_flags(user_ids):
+    keys = [user_flags_key(user_id) for user_id in user_ids]
+    if keys:
+        _now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def get_movies_data(movie_ids, load):
+    """
+    Représentations partagées des films demandés, depuis le cache ; les absents
+    sont chargés en une fois par `load(ids)` (-> {id: data}) puis mis en cache.
+    Retourne ({id: data}, date de mise en cache la plus récente).
+    """
+    cached = cache.get_many([movie_key(movie_id) for movie_id in movie_ids])
+    entries = {movie_id: cached[movie_key(movie_id)] for movie_id in movie_ids if movie_key(movie_id) in cached}
+    missing = [movie_id for movie_id in movie_ids if movie_id not in entries]
+    if missing:
+        now = time.time()
+        loaded = {movie_id: {'data': data, 'at': now} for movie_id, data in load(missing).items()}
+        cache.set_many({movie_key(movie_id): entry for movie_id, entry in loaded.items()}, ENTRY_TIMEOUT)
+        entries.update(loaded)
+    last_modified = max((entry['at'] for entry in entries.values()), default=0)
+    return {movie_id: entry['data'] for movie_id, entry in entries.items()}, last_modified
+
+
+def store_movies_data(data_by_id):
+    now = time.time()
+    cache.set_many({movie_key(movie_id): {'data': data, 'at': now} for movie_id, data in data_by_id.items()},
+                   ENTRY_TIMEOUT)
+
+
+def get_user_flags(user):
+    """(ids aimés, ids vus, date) de l'utilisateur ; une requête au premier appel."""
+    if user is None or not user.is_authenticated:
+        return set(), set(), 0
+    entry = cache.get(user_flags_key(user.pk))
+    if entry is None:
+        from .models import Like, View
+        likes = Like.objects.filter(user=user).order_by().annotate(
+            kind=models.Value('like', output_field=models.CharField())
+        ).values_list('movie_id', 'kind')
+        views = View.objects.filter(user=user).order_by().annotate(
+            kind=models.Value('view', output_field=models.CharField())
+        ).values_list('movie_id', 'kind')
+        entry = {'liked': [], 'viewed': [], 'at': time.time()}
+        for movie_id, kind in likes.union(views, all=True):
+            entry['liked' if kind == 'like' else 'viewed'].append(movie_id)
+        cache.set(user_flags_key(user.pk), entry, ENTRY_TIMEOUT)
+    return set(entry['liked']), set(entry['viewed']), entry['at']
+
+
+def with_user_flags(movie_data, liked, viewed):
+    return {**movie_data, 'is_liked': movie_data['id'] in liked, 'is_viewed': movie_data['id'] in viewed}
+
+
+def conditional_response(request, data, last_modified):
+    """
+    Calcule ETag (empreinte du contenu) et Last-Modified. Retourne une réponse 304
+    si le client a déjà cette version, sinon None et les en-têtes à poser.
+    """
+    etag = quote_etag(hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest())
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        last_modified = int(last_modified)
+        headers['Last-Modified'] = http_date(last_modified)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return not_modified, headers
+
+
+def apply_cache_headers(response, headers):
+    for name, value in headers.items():
+        response[name] = value
+    # Réponse propre à l'utilisateur : revalidation obligatoire, jamais de cache partagé
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
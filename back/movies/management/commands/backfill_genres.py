@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.cache import invalidate_catalog
+from movies.models import Movie, sync_movie_genres
+
+
+class Command(BaseCommand):
+    help = "Remplir la table Genre et la relation Movie.genres à partir du champ texte `genre`"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            with transaction.atomic():
+                sync_movie_genres(Movie.objects.filter(pk__in=ids[start:start + batch_size]).only('pk', 'genre'))
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f"Genres synchronisés pour {len(ids)} films."))
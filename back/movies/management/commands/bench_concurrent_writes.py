@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+# Profils comparés : réglages Django par défaut contre settings.SQLITE_OPTIONS
+PROFILES = {
+    'defaut': {},
+    'production': None,
+}
+
+SCHEMA = [
+    "CREATE TABLE bench_movie (id INTEGER PRIMARY KEY, like_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE bench_like (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+    "movie_id INTEGER NOT NULL, created_at TEXT NOT NULL, UNIQUE (user_id, movie_id))",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesurer le débit d'écritures concurrentes sur SQLite (transactions de type « like » : "
+        "lecture, INSERT, mise à jour du compteur) avec le profil par défaut et le profil de "
+        "production (settings.SQLITE_OPTIONS). Travaille sur une base temporaire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Écrivains concurrents")
+        parser.add_argument('--ops', type=int, default=200, help="Transactions par écrivain")
+        parser.add_argument('--movies', type=int, default=50, help="Films se partageant les likes")
+        parser.add_argument('--profile', choices=[*PROFILES, 'tous'], default='tous')
+
+    def handle(self, *args, **options):
+        names = list(PROFILES) if options['profile'] == 'tous' else [options['profile']]
+        self.stdout.write(f"{options['threads']} écrivains x {options['ops']} transactions")
+        self.stdout.write(f"{'profil':<12}{'tx/s':>10}{'échecs':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for name in names:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.run_profile(name, os.path.join(directory, 'bench.sqlite3'), options)
+            self.stdout.write(
+                f"{name:<12}{result['rate']:>10.0f}{result['errors']:>10}"
+                f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['max']:>10.1f}"
+            )
+
+    def run_profile(self, name, path, options):
+        alias = f'bench_{name}'
+        profile = PROFILES[name]
+        database = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': dict(settings.SQLITE_OPTIONS if profile is None else profile),
+        }
+        # Alias temporaire, complété des valeurs par défaut de Django
+        connections.settings[alias] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]), alias: database}
+        )[alias]
+        try:
+            with connections[alias].cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+                cursor.executemany("INSERT INTO bench_movie (id) VALUES (%s)",
+                                   [(movie_id,) for movie_id in range(options['movies'])])
+            connections[alias].close()
+            return self.run_writers(alias, options)
+        finally:
+            del connections.settings[alias]
+
+    def run_writers(self, alias, options):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start_gate = threading.Barrier(options['threads'])
+
+        def writer(worker):
+            connection = connections[alias]
+            local_latencies, local_errors = [], 0
+            start_gate.wait()
+            try:
+                for n in range(options['ops']):
+                    movie_id = (worker * 7 + n) % options['movies']
+                    started = time.perf_counter()
+                    try:
+                        # Même forme que POST like : lecture, INSERT, recalcul du compteur
+                        with transaction.atomic(using=alias), connection.cursor() as cursor:
+                            cursor.execute("SELECT like_count FROM bench_movie WHERE id = %s", [movie_id])
+                            cursor.execute(
+                                "INSERT OR IGNORE INTO bench_like (user_id, movie_id, created_at) "
+                                "VALUES (%s, %s, datetime('now'))", [worker * options['ops'] + n, movie_id]
+                            )
+                            cursor.execute(
+                                "UPDATE bench_movie SET like_count = "
+                                "(SELECT COUNT(*) FROM bench_like WHERE movie_id = %s) WHERE id = %s",
+                                [movie_id, movie_id]
+                            )
+                    except OperationalError:
+                        local_errors += 1
+                        continue
+                    local_latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+        return {
+            'rate': len(latencies) / elapsed if elapsed else 0.0,
+            'errors': sum(errors),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': latencies[-1] if latencies else 0.0,
+        }
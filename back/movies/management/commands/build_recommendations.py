@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from movies.recommendations import build_neighbors, last_build, stale_movie_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Calculer la table des films voisins (MovieNeighbor) utilisée par movies/recommended/. "
+        "Par défaut, seuls les films touchés depuis le dernier calcul sont recalculés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Recalculer tout le catalogue (prend aussi en compte les retraits)")
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help="Nombre de films calculés et écrits par transaction")
+
+    def handle(self, *args, **options):
+        # Repère pris avant la lecture des interactions : celles qui arrivent
+        # pendant le calcul seront reprises au prochain passage
+        now = timezone.now()
+        since = None if options['full'] else last_build()
+        if since is None:
+            movie_ids, mode = None, "complet"
+        else:
+            movie_ids, mode = stale_movie_ids(since), "incrémental"
+            if not movie_ids:
+                self.stdout.write("Aucun film à recalculer.")
+                return
+        count = build_neighbors(movie_ids, batch_size=options['batch_size'], now=now)
+        self.stdout.write(self.style.SUCCESS(f"Voisins recalculés pour {count} films (calcul {mode})."))
@@ -0,0 +1,95 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+
+from movies.models import Movie, Review, List, MovieInList, Like
+from movies.recommendations import recommendations_queryset
+from movies.views import moderation_queue, movies_with_all_genres
+from users.backends import login_candidates
+
+# Lignes de plan qui signalent une lecture complète d'une table
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)(\S+)(?!.*\bUSING\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\S+)'),
+}
+# Tri fait en mémoire faute d'index dans le bon ordre (avertissement seulement)
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'^\s*(?:->\s*)?Sort\b'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Afficher le plan d'exécution (EXPLAIN) des requêtes principales de l'API et signaler "
+        "les lectures complètes de table. À lancer sur une base remplie (voir seed_catalog)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Afficher tous les plans")
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Terminer en erreur si une lecture complète de table est trouvée (CI)")
+
+    def querysets(self):
+        """
+        (nom, queryset, lecture complète admise) reproduisant les requêtes des vues les plus
+        appelées. Une lecture complète n'est admise que sur une petite table de référence.
+        """
+        movie = Movie.objects.filter(reviews__isnull=False).first() or Movie.objects.first()
+        user = User.objects.filter(lists__isnull=False).first() or User.objects.first()
+        list_obj = List.objects.filter(created_by=user).first()
+        if movie is None or user is None or list_obj is None:
+            raise CommandError("Base vide : lancer d'abord `python manage.py seed_catalog`.")
+        page = slice(0, 24)
+        genres = list(movie.genres.values_list('name', flat=True)[:2]) or ['Drama']
+
+        yield 'catalogue (tri par défaut)', Movie.objects.order_by('-created_at', '-pk')[page], None
+        yield 'catalogue par année', Movie.objects.filter(release_year=movie.release_year).order_by(
+            '-created_at', '-pk'
+        )[page], None
+        yield 'catalogue par note', Movie.objects.filter(review_avg__gte=3).order_by('-review_avg', '-pk')[page], None
+        yield 'catalogue par titre', Movie.objects.order_by('title', 'pk')[page], None
+        yield 'catalogue par genres', Movie.objects.filter(pk__in=movies_with_all_genres(genres)).order_by(
+            '-created_at', '-pk'
+        )[page], "table des genres (quelques dizaines de lignes, comparaison sans casse)"
+        yield 'avis d\'un film', Review.objects.filter(movie=movie).order_by('-created_at', '-pk')[page], None
+        yield 'file de modération', moderation_queue()[page], None
+        yield 'listes d\'un utilisateur', (
+            List.objects.filter(created_by=user).annotate(movies_count=models.Count('movieinlist'))
+        ), None
+        yield 'liste système', List.objects.filter(created_by=user, is_system=True, name="Favoris"), None
+        yield 'films d\'une liste', MovieInList.objects.filter(list=list_obj).order_by('-added_at', '-pk')[page], None
+        yield 'likes d\'un utilisateur', Like.objects.filter(user=user).order_by().values_list('movie_id'), None
+        yield 'recommandations', recommendations_queryset(user)[:20], None
+        yield 'connexion (nom ou email)', login_candidates(user.email).order_by('pk')[:5], None
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f"Base {vendor} non prise en charge (sqlite ou postgresql).")
+        scan_pattern, sort_pattern = FULL_SCAN_PATTERNS[vendor], SORT_PATTERNS[vendor]
+
+        scans = 0
+        for name, queryset, accepted in self.querysets():
+            lines = queryset.explain().splitlines()
+            full_scans = [line for line in lines if scan_pattern.search(line)]
+            sorts = [line for line in lines if sort_pattern.search(line)]
+            if full_scans and accepted:
+                self.stdout.write(f"ADMIS   {name} : {accepted}")
+                full_scans = sorts = []
+            elif full_scans:
+                scans += len(full_scans)
+                self.stdout.write(self.style.ERROR(f"SCAN    {name}"))
+            elif sorts:
+                self.stdout.write(self.style.WARNING(f"TRI     {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK      {name}"))
+            if full_scans or sorts or options['verbose_plans']:
+                for line in lines:
+                    self.stdout.write(f"        {line}")
+
+        if scans and options['fail_on_scan']:
+            raise CommandError(f"{scans} lecture(s) complète(s) de table.")
+        self.stdout.write(f"{scans} lecture(s) complète(s) de table.")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from movies.models import Movie, Review
+from movies.signals import batched_stats_refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprimer les avis en double (même utilisateur, même film) en gardant le plus récent. "
+        "À lancer avant la migration qui ajoute la contrainte unique sur Review(user, movie) : "
+        "fonctionne aussi sur une base dont les colonnes ajoutées depuis n'existent pas encore."
+    )
+
+    def stats_columns_exist(self):
+        """Les agrégats dénormalisés de Movie existent-ils déjà (migration passée) ?"""
+        wanted = {Movie._meta.get_field(name).column for name in ('review_avg', 'review_count', 'like_count', 'view_count')}
+        with connection.cursor() as cursor:
+            columns = {column.name for column in connection.introspection.get_table_description(
+                cursor, Movie._meta.db_table
+            )}
+        return wanted <= columns
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Nombre d'avis supprimés par transaction")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compter les doublons sans rien supprimer")
+
+    def handle(self, *args, **options):
+        # Un avis est en trop s'il existe un avis plus récent du même utilisateur sur le même film
+        newer = Review.objects.filter(
+            user=models.OuterRef('user'), movie=models.OuterRef('movie'), pk__gt=models.OuterRef('pk')
+        )
+        duplicates = list(Review.objects.filter(models.Exists(newer)).order_by('pk').values_list('pk', flat=True))
+        if options['dry_run']:
+            self.stdout.write(f"{len(duplicates)} avis en double.")
+            return
+
+        batch_size = options['batch_size']
+        refresh = self.stats_columns_exist()
+        for start in range(0, len(duplicates), batch_size):
+            with transaction.atomic(), batched_stats_refresh(refresh=refresh):
+                # only() : seules les colonnes d'origine sont lues, la base peut précéder la migration
+                Review.objects.filter(pk__in=duplicates[start:start + batch_size]).only(
+                    'pk', 'user_id', 'movie_id'
+                ).delete()
+        self.stdout.write(self.style.SUCCESS(f"{len(duplicates)} avis en double supprimés."))
+        if duplicates and not refresh:
+            self.stdout.write("Agrégats des films non recalculés : lancer `manage.py rebuild_movie_stats` après migrate.")
@@ -1,29 +1,168 @@
-from django.core.management.base import BaseCommand
-from movies.tmdb import discover_movies
-from movies.models import Movie
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from movies.models import Movie, sync_movie_genres
+from movies.cache import invalidate_catalog, invalidate_movies
+from movies.search import index_movies
+from movies.tmdb import get_client
+
+UPDATE_FIELDS = ['title', 'description', 'release_year', 'genre', 'poster_url', 'updated_at']
+
+
+class RateLimiter:
+    """Au plus `rate` appels par seconde, partagé entre les threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
 
 class Command(BaseCommand):
-    help = "Importer environ 100 films diversifiés depuis TMDB"
+    help = "Importer des films depuis TMDB (pages en parallèle, upsert par lots sur tmdb_id, reprise possible)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5, help="Nombre de pages discover (20 films par page)")
+        parser.add_argument('--since', help="Import incrémental : films sortis depuis cette date (AAAA-MM-JJ)")
+        parser.add_argument('--workers', type=int, default=4, help="Pages téléchargées en parallèle")
+        parser.add_argument('--rate', type=float, default=20, help="Requêtes TMDB max par seconde")
+        parser.add_argument('--batch-size', type=int, default=500, help="Films écrits par transaction")
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / 'tmdb_import.checkpoint.json'),
+                            help="Fichier de reprise (pages déjà importées)")
+        parser.add_argument('--resume', action='store_true', help="Reprendre l'import interrompu")
 
     def handle(self, *args, **options):
+        filters = {'primary_release_date.gte': options['since']} if options['since'] else {}
+        checkpoint_path = options['checkpoint']
+        done = self.load_checkpoint(checkpoint_path, filters) if options['resume'] else set()
+        pages = [page for page in range(1, options['pages'] + 1) if page not in done]
+        if done:
+            self.stdout.write(f"Reprise : {len(done)} pages déjà importées, {len(pages)} restantes.")
+
+        client = get_client()
+        limiter = RateLimiter(options['rate'])
+
+        genres = client.genre_map() or {}
+
+        def fetch(page):
+            limiter.wait()
+            return page, client.get("/discover/movie", params={'page': page, **filters})
+
         total_imported = 0
-        pages_needed = 5  # 5 pages x 20 films par page = 100 films
-
-        for page in range(1, pages_needed + 1):
-            movies = discover_movies(page=page)
-            for movie_data in movies:
-                # Join genre names with commas
-                genres = ", ".join(movie_data.get('genre_names', ["Inconnu"]))
-                
-                Movie.objects.update_or_create(
-                    title=movie_data['title'],
-                    defaults={
-                        'description': movie_data['overview'] or "Pas de description",
-                        'release_year': movie_data['release_date'][:4] if movie_data['release_date'] else 0,
-                        'genre': genres,
-                        'poster_url': f"https://image.tmdb.org/t/p/w500{movie_data['poster_path']}" if movie_data['poster_path'] else ""
-                    }
-                )
-                total_imported += 1
+        failed = []
+        buffer, buffer_pages = {}, []
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(fetch, page) for page in pages]
+            for future in as_completed(futures):
+                page, data = future.result()
+                if data is None:
+                    # Page non marquée comme faite : elle sera retentée avec --resume
+                    failed.append(page)
+                    continue
+                for movie_data in data['results']:
+                    movie_data['genre_names'] = [genres.get(i, "Unknown") for i in movie_data.get('genre_ids', [])]
+                    buffer[movie_data['id']] = movie_data
+                buffer_pages.append(page)
+                if len(buffer) >= options['batch_size']:
+                    total_imported += self.write_batch(buffer.values())
+                    done.update(buffer_pages)
+                    self.save_checkpoint(checkpoint_path, filters, done)
+                    buffer, buffer_pages = {}, []
+        if buffer:
+            total_imported += self.write_batch(buffer.values())
+            done.update(buffer_pages)
 
+        if failed:
+            self.save_checkpoint(checkpoint_path, filters, done)
+            raise CommandError(
+                f"{total_imported} films importés, mais {len(failed)} pages en échec ({sorted(failed)}). "
+                f"Relancez avec --resume pour les reprendre."
+            )
+        # Tout est importé : le point de reprise n'a plus de raison d'être
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
         self.stdout.write(self.style.SUCCESS(f"{total_imported} films importés avec succès !"))
+
+    def build_movie(self, movie_data, now):
+        # Join genre names with commas
+        genres = ", ".join(movie_data.get('genre_names') or ["Inconnu"])
+        release_date = movie_data.get('release_date')
+        poster_path = movie_data.get('poster_path')
+        return Movie(
+            tmdb_id=movie_data['id'],
+            title=movie_data['title'],
+            description=movie_data.get('overview') or "Pas de description",
+            release_year=int(release_date[:4]) if release_date else 0,
+            genre=genres[:100],
+            poster_url=f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else "",
+            created_at=now,
+            updated_at=now,
+        )
+
+    @transaction.atomic
+    def write_batch(self, movies_data):
+        now = timezone.now()
+        movies = [self.build_movie(movie_data, now) for movie_data in movies_data]
+        tmdb_ids = [movie.tmdb_id for movie in movies]
+
+        # Films importés avant tmdb_id (clé = titre) : on les rattache au lieu de les dupliquer
+        known = set(Movie.objects.filter(tmdb_id__in=tmdb_ids).values_list('tmdb_id', flat=True))
+        legacy = {
+            movie.title: movie
+            for movie in Movie.objects.filter(tmdb_id__isnull=True, title__in=[m.title for m in movies])
+        }
+        attached = []
+        for movie in movies:
+            old = legacy.pop(movie.title, None)
+            if old is not None and movie.tmdb_id not in known:
+                old.tmdb_id = movie.tmdb_id
+                attached.append(old)
+        Movie.objects.bulk_update(attached, ['tmdb_id'])
+
+        Movie.objects.bulk_create(
+            movies,
+            update_conflicts=True,
+            unique_fields=['tmdb_id'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create ne déclenche pas les signaux : genres et index de recherche à la main
+        saved = list(Movie.objects.filter(tmdb_id__in=tmdb_ids).only('pk', 'title', 'description', 'genre'))
+        sync_movie_genres(saved)
+        index_movies(saved)
+        invalidate_movies([movie.pk for movie in saved])
+        invalidate_catalog()
+        return len(saved)
+
+    def load_checkpoint(self, path, filters):
+        if not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('filters') != filters:
+            raise CommandError(
+                f"Le point de reprise {path} correspond à d'autres options ({checkpoint.get('filters')})."
+            )
+        return set(checkpoint['pages'])
+
+    def save_checkpoint(self, path, filters, pages):
+        # Écriture atomique : un import interrompu ne laisse jamais un fichier à moitié écrit
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'filters': filters, 'pages': sorted(pages)}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from movies.cache import invalidate_catalog, invalidate_movies
+from movies.models import Movie, Report, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculer les agrégats dénormalisés des films (note moyenne, avis, likes, vues) "
+        "et la date du dernier signalement des commentaires signalés"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Nombre de films mis à jour par transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        # Par lots, pour ne pas verrouiller la base pendant toute la reconstruction
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with transaction.atomic():
+                updated += Movie.objects.filter(pk__in=batch).refresh_stats()
+                invalidate_movies(batch)
+        invalidate_catalog()
+        last_report = Report.objects.filter(review=models.OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+        Review.objects.filter(is_reported=True).update(last_reported_at=models.Subquery(last_report))
+        self.stdout.write(self.style.SUCCESS(f"Agrégats recalculés pour {updated} films."))
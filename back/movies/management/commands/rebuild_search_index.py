@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from movies.cache import invalidate_catalog
+from movies.search import create_search_index, fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruire l'index de recherche plein texte des films (SQLite FTS5)"
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            self.stdout.write("PostgreSQL : recherche plein texte native (to_tsvector), aucun index à reconstruire.")
+            return
+        create_search_index()
+        if not fts_available():
+            self.stdout.write(self.style.WARNING(
+                "Index plein texte indisponible sur cette base : la recherche filtre titre et description, "
+                "sans classement."
+            ))
+            return
+        with transaction.atomic():
+            count = rebuild_search_index()
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f"{count} films indexés."))
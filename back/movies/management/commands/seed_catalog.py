@@ -0,0 +1,117 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import Movie, Review, List, MovieInList, Like, View, Report
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+    "Romance", "Science Fiction", "Thriller", "TV Movie", "War", "Western"
+]
+
+WORDS = [
+    "star", "night", "love", "war", "dark", "city", "lost", "dream", "king",
+    "shadow", "river", "storm", "last", "secret", "journey", "fire", "ghost",
+    "empire", "winter", "silent", "golden", "wild", "broken", "return",
+]
+
+
+class Command(BaseCommand):
+    help = "Générer un jeu de données réaliste (films, avis, likes, listes) pour les tests et benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--reviews-per-user', type=int, default=40)
+        parser.add_argument('--likes-per-user', type=int, default=60)
+        parser.add_argument('--views-per-user', type=int, default=80)
+        parser.add_argument('--lists-per-user', type=int, default=3)
+        parser.add_argument('--movies-per-list', type=int, default=30)
+        parser.add_argument('--reports', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        # Un seul hash pour tous les comptes : le hachage coûte cher et n'apporte rien ici
+        password = make_password('password')
+        offset = User.objects.count()
+        users = User.objects.bulk_create([
+            User(username=f"seed_user_{offset + i}", email=f"seed_user_{offset + i}@example.com",
+                 password=password)
+            for i in range(options['users'])
+        ], batch_size=batch_size)
+
+        movies = Movie.objects.bulk_create([
+            Movie(
+                title=" ".join(rng.sample(WORDS, rng.randint(1, 4))).title() + f" {i}",
+                description=" ".join(rng.choices(WORDS, k=30)),
+                release_year=rng.randint(1950, 2025),
+                genre=", ".join(rng.sample(GENRES, rng.randint(1, 3))),
+                poster_url=f"https://image.tmdb.org/t/p/w500/seed_{i}.jpg",
+                created_by=rng.choice(users) if users else None,
+            )
+            for i in range(options['movies'])
+        ], batch_size=batch_size)
+
+        def sample_movies(count):
+            return rng.sample(movies, min(count, len(movies)))
+
+        likes, views, reviews, lists, entries = [], [], [], [], []
+        for user in users:
+            likes += [Like(user=user, movie=m) for m in sample_movies(options['likes_per_user'])]
+            views += [View(user=user, movie=m) for m in sample_movies(options['views_per_user'])]
+            reviews += [
+                Review(user=user, movie=m, rating=rng.randint(1, 5), comment=" ".join(rng.choices(WORDS, k=12)))
+                for m in sample_movies(options['reviews_per_user'])
+            ]
+            lists.append(List(name="Favoris", created_by=user, is_system=True,
+                              description='Films que vous avez aimés'))
+            lists.append(List(name="Déjà vu", created_by=user, is_system=True,
+                              description='Films que vous avez vus'))
+            lists += [List(name=f"Liste {n}", created_by=user) for n in range(options['lists_per_user'])]
+
+        Like.objects.bulk_create(likes, batch_size=batch_size)
+        View.objects.bulk_create(views, batch_size=batch_size)
+        reviews = Review.objects.bulk_create(reviews, batch_size=batch_size)
+        lists = List.objects.bulk_create(lists, batch_size=batch_size)
+
+        for list_obj in lists:
+            entries += [MovieInList(list=list_obj, movie=m) for m in sample_movies(options['movies_per_list'])]
+        MovieInList.objects.bulk_create(entries, batch_size=batch_size)
+
+        reports = []
+        seen = set()
+        for _ in range(options['reports'] if reviews and users else 0):
+            review, user = rng.choice(reviews), rng.choice(users)
+            if (review.pk, user.pk) in seen:
+                continue
+            seen.add((review.pk, user.pk))
+            reports.append(Report(user=user, review=review, reason=rng.choice(Report.REPORT_REASONS)[0]))
+        Report.objects.bulk_create(reports, batch_size=batch_size)
+        reported = {}
+        for report in reports:
+            reported[report.review_id] = reported.get(report.review_id, 0) + 1
+        for review in reviews:
+            if review.pk in reported:
+                review.is_reported = True
+                review.report_count = reported[review.pk]
+        Review.objects.bulk_update([r for r in reviews if r.pk in reported], ['is_reported', 'report_count'],
+                                   batch_size=batch_size)
+        # bulk_create ne déclenche pas les signaux : on recalcule les agrégats en une passe
+        call_command('rebuild_movie_stats', stdout=self.stdout._out)
+        call_command('rebuild_search_index', stdout=self.stdout._out)
+        call_command('backfill_genres', stdout=self.stdout._out)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(users)} utilisateurs, {len(movies)} films, {len(reviews)} avis, {len(likes)} likes, "
+            f"{len(views)} vues, {len(lists)} listes, {len(reports)} signalements générés."
+        ))
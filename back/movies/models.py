@@ -1,24 +1,122 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+
+def _per_movie(model):
+    return model.objects.filter(movie=models.OuterRef('pk')).order_by().values('movie')
+
+
+def _review_avg():
+    return Coalesce(
+        models.Subquery(_per_movie(Review).annotate(avg=models.Avg('rating')).values('avg')),
+        models.Value(0.0),
+    )
+
+
+class MovieQuerySet(models.QuerySet):
+    def refresh_stats(self):
+        """
+        Recalcule les agrégats dénormalisés (note moyenne, nombre d'avis, de likes
+        et de vues) des films du queryset en un seul UPDATE avec sous-requêtes.
+        """
+        def count_of(model):
+            return Coalesce(
+                models.Subquery(_per_movie(model).annotate(n=models.Count('pk')).values('n')),
+                models.Value(0),
+            )
+
+        return self.update(
+            review_avg=_review_avg(),
+            review_count=count_of(Review),
+            like_count=count_of(Like),
+            view_count=count_of(View),
+        )
+
+    def refresh_review_avg(self, review_delta=0):
+        """
+        Recalcule la seule note moyenne et, si review_delta, décale review_count
+        en base (F()) : un UPDATE sans recompter avis, likes et vues.
+        """
+        changes = {'review_count': models.F('review_count') + review_delta} if review_delta else {}
+        return self.update(review_avg=_review_avg(), **changes)
+
+    def add_to_counter(self, field, delta):
+        """like_count / view_count += delta en base (F()) : pas de recomptage."""
+        return self.update(**{field: models.F(field) + delta})
+
+
+def split_genres(value):
+    """Découpe "Action, Drama" (format écrit par import_tmdb_movies) en ["Action", "Drama"]."""
+    return list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+
+
+class Genre(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+def sync_movie_genres(movies):
+    """
+    Aligne la relation Movie.genres sur le champ texte `genre` des films donnés,
+    en un nombre fixe de requêtes quel que soit le nombre de films.
+    """
+    movies = [movie for movie in movies if movie.pk]
+    if not movies:
+        return
+    names = {name for movie in movies for name in split_genres(movie.genre)}
+    Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+    genre_ids = dict(Genre.objects.filter(name__in=names).values_list('name', 'pk'))
+    MovieGenre = Movie.genres.through
+    MovieGenre.objects.filter(movie_id__in=[movie.pk for movie in movies]).delete()
+    MovieGenre.objects.bulk_create([
+        MovieGenre(movie_id=movie.pk, genre_id=genre_ids[name])
+        for movie in movies for name in split_genres(movie.genre)
+    ], ignore_conflicts=True)
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     release_year = models.IntegerField()
     genre = models.CharField(max_length=100)
+    # Version normalisée et indexée de `genre`, synchronisée par movies/signals.py
+    genres = models.ManyToManyField(Genre, related_name='movies', blank=True)
     poster_url = models.URLField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='movies_created')
+    # Identifiant TMDB : clé stable des imports (les titres ne sont pas uniques)
+    tmdb_id = models.IntegerField(unique=True, null=True, blank=True)
     likes = models.ManyToManyField(User, through='Like', related_name='liked_movies')
     views = models.ManyToManyField(User, through='View', related_name='viewed_movies')
+    # Agrégats dénormalisés, tenus à jour par movies/signals.py (voir rebuild_movie_stats)
+    review_avg = models.FloatField(default=0, db_index=True)
+    review_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    view_count = models.IntegerField(default=0)
+
+    objects = MovieQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title} ({self.release_year})"
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Catalogue par défaut et pagination par curseur : ORDER BY created_at, id
+            models.Index(fields=['created_at']),
+            # Filtre par année avec le tri par défaut
+            models.Index(fields=['release_year', 'created_at']),
+            # Tri alphabétique (?ordering=title)
+            models.Index(fields=['title']),
+        ]
 
 class List(models.Model):
     name = models.CharField(max_length=100)
@@ -36,6 +134,10 @@ class List(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['name', 'created_by']
+        indexes = [
+            # Listes d'un utilisateur, les plus récentes d'abord (l'index unique commence par name)
+            models.Index(fields=['created_by', 'created_at']),
+        ]
 
 class MovieInList(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
@@ -46,6 +148,10 @@ class MovieInList(models.Model):
     class Meta:
         unique_together = ['movie', 'list']
         ordering = ['-added_at']
+        indexes = [
+            # Page des films d'une liste triée par date d'ajout (lists/{id}/movies/)
+            models.Index(fields=['list', 'added_at']),
+        ]
 
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -73,10 +179,62 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_reported = models.BooleanField(default=False)
     report_count = models.IntegerField(default=0)  # Nombre de signalements
+    # Date du dernier signalement (dénormalisée pour trier la file de modération par index)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Review by {self.user.username} on {self.movie.title}"
 
+    class Meta:
+        constraints = [
+            # Un avis par utilisateur et par film (doublons existants : manage.py dedupe_reviews)
+            models.UniqueConstraint(fields=['user', 'movie'], name='unique_review_per_user_movie'),
+        ]
+        indexes = [
+            # File de modération : partiel, seuls les commentaires signalés sont indexés,
+            # dans l'ordre de la file (report_count, last_reported_at, id)
+            models.Index(fields=['report_count', 'last_reported_at'], condition=models.Q(is_reported=True),
+                         name='review_moderation_queue_idx'),
+            # Avis d'un film, les plus récents d'abord (movies/{id}/reviews/)
+            models.Index(fields=['movie', 'created_at']),
+        ]
+
+class FullTextDocumentField(models.TextField):
+    """Colonne cachée d'une table FTS5 (lookup `match` : movies/search.py)."""
+
+
+class MovieSearchEntry(models.Model):
+    """
+    Ligne de la table FTS5 de recherche (créée par movies/search.py, hors migrations).
+    Déclarée pour que Django la joigne aux films : rowid = id du film, et `document`
+    est la colonne cachée qui porte le nom de la table (cible de MATCH et de bm25).
+    """
+    movie = models.OneToOneField(Movie, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+                                 db_constraint=False, related_name='search_entry')
+    document = FullTextDocumentField(db_column='movies_movie_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'movies_movie_fts'
+
+class MovieNeighbor(models.Model):
+    """
+    Voisins les plus proches d'un film (top-K), précalculés par
+    `manage.py build_recommendations` (voir movies/recommendations.py).
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Début du calcul qui a produit la ligne : repère des reconstructions incrémentales
+    computed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ['movie', 'neighbor']
+        ordering = ['-score']
+
+    def __str__(self):
+        return f"{self.movie_id} -> {self.neighbor_id} ({self.score:.3f})"
+
 class Report(models.Model):
     REPORT_REASONS = [
         ('spam', 'Spam'),
@@ -94,6 +252,10 @@ class Report(models.Model):
     class Meta:
         unique_together = ['user', 'review']
         ordering = ['-created_at']
+        indexes = [
+            # Dernier signalement d'un commentaire (tri de la file de modération)
+            models.Index(fields=['review', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Report by {self.user.username} on review {self.review.id}"
\ No newline at end of file
@@ -0,0 +1,192 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# Add custom pagination class
+class MoviePagination(PageNumberPagination):
+    page_size = 24  # 4 rows with 6 movies per row
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def use_cursor_pagination(request):
+    """Le mode curseur est opt-in : ?pagination=cursor (les liens next/previous le conservent)."""
+    if request is None:
+        return False
+    params = request.query_params
+    return params.get('pagination') == 'cursor' or 'cursor' in params
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur l'ordre complet du queryset, plus l'id.
+
+    La page suivante est lue avec WHERE (champ1, champ2, ..., id) « après » les
+    valeurs de la dernière ligne au lieu d'un OFFSET, et sans COUNT(*) : la page
+    1000 coûte autant que la page 1. L'ordre est celui du queryset reçu (donc celui
+    choisi par OrderingFilter ou par la vue), tous ses termes sont conservés ; l'id
+    sert à départager les ex aequo pour que les curseurs restent stables. Un ordre
+    que le keyset ne sait pas exprimer (expression, champ d'un modèle lié) est
+    refusé (400) plutôt que remplacé par un autre.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide.'
+    invalid_ordering_message = "Ce tri n'est pas disponible en pagination par curseur."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+
+        # En arrière, on parcourt dans l'ordre inverse puis on remet la page à l'endroit
+        terms = [(name, descending != reverse) for name, descending in self.ordering]
+        queryset = queryset.order_by(*[f"{'-' if descending else ''}{name}" for name, descending in terms])
+        if cursor:
+            values = [self.parse_value(queryset, name, raw) for (name, _), raw in zip(terms, cursor['v'])]
+            queryset = queryset.filter(self.after(terms, values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """[(champ, décroissant)] de l'ordre du queryset, terminé par l'id."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or ['-pk'])
+        terms = []
+        for term in ordering:
+            if not isinstance(term, str) or '__' in term or term.lstrip('-') == '?':
+                raise ValidationError({'ordering': self.invalid_ordering_message})
+            name = term.lstrip('-')
+            if name in ('id', queryset.model._meta.pk.attname):
+                name = 'pk'
+            terms.append((name, term.startswith('-')))
+            if name == 'pk':
+                return terms
+        return terms + [('pk', terms[-1][1])]
+
+    def after(self, terms, values):
+        """Q des lignes situées strictement après `values` dans l'ordre `terms`."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(terms, values):
+            # Les NULL sont en fin de parcours si le sens du tri va vers les « grandes » valeurs
+            nulls_after = self.nulls_largest != descending
+            if value is None:
+                if not nulls_after:
+                    condition |= equal & Q(**{f'{name}__isnull': False})
+                equal &= Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if nulls_after:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                condition |= equal & beyond
+                equal &= Q(**{name: value})
+        return condition
+
+    def parse_value(self, queryset, name, raw):
+        if raw is None:
+            return None
+        try:
+            field = queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            annotation = queryset.query.annotations.get(name)
+            field = annotation.output_field if annotation is not None else None
+        try:
+            return field.to_python(raw) if field is not None else raw
+        except DjangoValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            # Curseur produit pour un autre tri : refusé
+            if [tuple(term) for term in cursor['o']] != self.ordering or len(cursor['v']) != len(self.ordering):
+                raise ValueError
+            return {'v': cursor['v'], 'r': bool(cursor.get('r'))}
+        except (ValueError, KeyError, TypeError, binascii.Error, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        values = []
+        for name, _ in self.ordering:
+            value = getattr(item, name)
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            values.append(value)
+        payload = {'o': self.ordering, 'v': values, 'r': reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CursorPaginationMixin:
+    """Pour un ViewSet : bascule sur KeysetPagination quand le client le demande."""
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and use_cursor_pagination(getattr(self, 'request', None)):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,222 @@
+"""
+Recommandations « pour vous ».
+
+Filtrage collaboratif article-article : chaque film est un vecteur sur les
+utilisateurs (vues, likes, notes, ajouts à une liste) et la similarité entre
+deux films est le cosinus de ces vecteurs, calculé par produits de matrices
+creuses (SciPy). Elle est mélangée à une similarité de contenu (cosinus des
+genres), qui donne aussi des voisins aux films encore sans interactions.
+
+Les K meilleurs voisins de chaque film sont stockés dans MovieNeighbor par
+`manage.py build_recommendations` ; une demande de recommandations n'est
+qu'une agrégation SQL sur cette table, sans calcul en ligne.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Movie, Like, View, Review, MovieInList, MovieNeighbor
+
+# Poids d'un signal dans le vecteur d'un film ; un avis pèse rating * REVIEW_WEIGHT
+INTERACTION_WEIGHTS = {'view': 1.0, 'like': 2.0, 'list': 1.0}
+REVIEW_WEIGHT = 0.4
+# Un avis en dessous de cette note ne sert pas de point de départ aux recommandations
+MIN_SEED_RATING = 4
+
+
+def _item_matrix(pairs, movie_ids):
+    """Matrice creuse films x colonnes (utilisateurs ou genres), lignes normalisées (L2)."""
+    movies, keys, weights = zip(*pairs) if pairs else ((), (), ())
+    column_keys, columns = np.unique(np.asarray(keys, dtype=np.int64), return_inverse=True)
+    n_columns = len(column_keys)
+    rows = np.searchsorted(movie_ids, np.asarray(movies, dtype=np.int64))
+    # coo -> csr additionne les doublons (un like et une vue du même utilisateur)
+    matrix = sparse.coo_matrix(
+        (np.asarray(weights, dtype=np.float32), (rows, columns)), shape=(len(movie_ids), n_columns)
+    ).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(inverse_norms.astype(np.float32)) @ matrix
+
+
+def interaction_matrix(movie_ids):
+    """Films x utilisateurs, pondéré par INTERACTION_WEIGHTS et la note des avis."""
+    sources = [
+        (Like.objects.values_list('movie_id', 'user_id'), INTERACTION_WEIGHTS['like']),
+        (View.objects.values_list('movie_id', 'user_id'), INTERACTION_WEIGHTS['view']),
+        # Les listes système doublonnent les likes / vues
+        (MovieInList.objects.filter(list__is_system=False).values_list('movie_id', 'list__created_by_id'),
+         INTERACTION_WEIGHTS['list']),
+    ]
+    pairs = [
+        (movie_id, user_id, weight)
+        for queryset, weight in sources
+        for movie_id, user_id in queryset.order_by().iterator(chunk_size=10000)
+    ]
+    pairs += [
+        (movie_id, user_id, rating * REVIEW_WEIGHT)
+        for movie_id, user_id, rating in
+        Review.objects.order_by().values_list('movie_id', 'user_id', 'rating').iterator(chunk_size=10000)
+    ]
+    return _item_matrix(pairs, movie_ids)
+
+
+def genre_matrix(movie_ids):
+    """Films x genres (Movie.genres)."""
+    pairs = [
+        (movie_id, genre_id, 1.0)
+        for movie_id, genre_id in
+        Movie.genres.through.objects.order_by().values_list('movie_id', 'genre_id').iterator(chunk_size=10000)
+    ]
+    return _item_matrix(pairs, movie_ids)
+
+
+def build_neighbors(movie_ids=None, batch_size=256, now=None):
+    """
+    Recalcule les voisins des films donnés (tout le catalogue par défaut) et
+    remplace leurs lignes MovieNeighbor, une transaction par lot. Les similarités
+    sont toujours calculées contre tout le catalogue. Retourne le nombre de films traités.
+    """
+    now = now or timezone.now()
+    k = getattr(settings, 'RECOMMENDATION_NEIGHBORS', 20)
+    content_weight = getattr(settings, 'RECOMMENDATION_CONTENT_WEIGHT', 0.3)
+
+    all_ids = np.array(list(Movie.objects.order_by('pk').values_list('pk', flat=True)), dtype=np.int64)
+    if movie_ids is None:
+        targets = np.arange(len(all_ids))
+    else:
+        # Les films supprimés entre-temps sont ignorés : leurs lignes sont parties en cascade
+        targets = np.flatnonzero(np.isin(all_ids, list(movie_ids)))
+    if len(all_ids) < 2 or not len(targets):
+        return 0
+
+    items = interaction_matrix(all_ids)
+    items_t = items.T.tocsc()
+    genres = genre_matrix(all_ids)
+    genres_t = genres.T.tocsc()
+    k = min(k, len(all_ids) - 1)
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        # Lot x catalogue : la seule matrice dense, de taille bornée par batch_size
+        scores = (1 - content_weight) * (items[batch] @ items_t).toarray()
+        scores += content_weight * (genres[batch] @ genres_t).toarray()
+        scores[np.arange(len(batch)), batch] = 0
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        rows = [
+            MovieNeighbor(movie_id=int(all_ids[movie_pos]), neighbor_id=int(all_ids[neighbor_pos]),
+                          score=float(scores[i, neighbor_pos]), computed_at=now)
+            for i, movie_pos in enumerate(batch)
+            for neighbor_pos in top[i]
+            if scores[i, neighbor_pos] > 0
+        ]
+        with transaction.atomic():
+            MovieNeighbor.objects.filter(movie_id__in=[int(all_ids[pos]) for pos in batch]).delete()
+            MovieNeighbor.objects.bulk_create(rows, batch_size=1000)
+    return len(targets)
+
+
+def last_build():
+    """Début du dernier calcul de voisins (None si la table est vide)."""
+    return MovieNeighbor.objects.aggregate(at=models.Max('computed_at'))['at']
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _interactions(**filters):
+    """Querysets (movie_id, user_id) des quatre signaux, filtrés par date (since) ou par utilisateurs (users)."""
+    since, users = filters.get('since'), filters.get('users')
+    sources = [
+        (Like.objects.all(), 'created_at', 'user_id'),
+        (View.objects.all(), 'viewed_at', 'user_id'),
+        (Review.objects.all(), 'created_at', 'user_id'),
+        (MovieInList.objects.filter(list__is_system=False), 'added_at', 'list__created_by_id'),
+    ]
+    for queryset, date_field, user_field in sources:
+        if since is not None:
+            queryset = queryset.filter(**{f'{date_field}__gt': since})
+        if users is not None:
+            queryset = queryset.filter(**{f'{user_field}__in': users})
+        yield queryset.order_by().values_list('movie_id', user_field).distinct()
+
+
+def stale_movie_ids(since):
+    """
+    Films dont les voisins ont pu changer depuis `since`. Une nouvelle interaction
+    d'un utilisateur sur X change la similarité de X avec les autres films de cet
+    utilisateur, et le poids de X pour les films qui l'ont pour voisin : on reprend
+    X, l'historique de l'utilisateur et ces films. Les films créés ou modifiés sont
+    repris aussi. Les retraits (unlike, avis supprimé) attendent la prochaine
+    reconstruction complète (--full).
+    """
+    changed, users = set(), set()
+    for queryset in _interactions(since=since):
+        for movie_id, user_id in queryset:
+            changed.add(movie_id)
+            users.add(user_id)
+    changed.update(Movie.objects.filter(updated_at__gt=since).values_list('pk', flat=True))
+
+    stale = set(changed)
+    for chunk in _chunks(users):
+        for queryset in _interactions(users=chunk):
+            stale.update(movie_id for movie_id, _ in queryset)
+    for chunk in _chunks(changed):
+        stale.update(
+            MovieNeighbor.objects.filter(neighbor_id__in=chunk).order_by().values_list('movie_id', flat=True).distinct()
+        )
+    return stale
+
+
+def _known_movies(user):
+    return {
+        'liked': Like.objects.filter(user=user).values('movie_id'),
+        'viewed': View.objects.filter(user=user).values('movie_id'),
+        'listed': MovieInList.objects.filter(list__created_by=user, list__is_system=False).values('movie_id'),
+        'reviewed': Review.objects.filter(user=user).values('movie_id'),
+    }
+
+
+def recommendations_queryset(user):
+    """
+    (movie_id, score) des films recommandés : somme des scores de voisinage depuis
+    les films que l'utilisateur a aimés, vus, bien notés ou rangés dans ses listes,
+    hors films qu'il connaît déjà.
+    """
+    known = _known_movies(user)
+    seeds = (
+        models.Q(movie_id__in=known['liked'])
+        | models.Q(movie_id__in=known['viewed'])
+        | models.Q(movie_id__in=known['listed'])
+        | models.Q(movie_id__in=Review.objects.filter(user=user, rating__gte=MIN_SEED_RATING).values('movie_id'))
+    )
+    already_known = models.Q()
+    for subquery in known.values():
+        already_known |= models.Q(neighbor_id__in=subquery)
+    return (
+        MovieNeighbor.objects.filter(seeds)
+        .exclude(already_known)
+        .values('neighbor_id')
+        .annotate(total=models.Sum('score'))
+        .order_by('-total', 'neighbor_id')
+        .values_list('neighbor_id', 'total')
+    )
+
+
+def recommend_for_user(user, limit=20):
+    """Les `limit` meilleures recommandations, en une requête SQL : [(movie_id, score)]."""
+    return list(recommendations_queryset(user)[:limit])
+
+
+def popular_movie_ids(user, limit=20):
+    """Repli pour les nouveaux comptes (aucune interaction) : les films les mieux notés."""
+    queryset = Movie.objects.all()
+    for subquery in _known_movies(user).values():
+        queryset = queryset.exclude(pk__in=subquery)
+    return list(queryset.order_by('-review_avg', '-like_count').values_list('pk', flat=True)[:limit])
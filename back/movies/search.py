@@ -0,0 +1,166 @@
+"""
+Recherche plein texte sur le catalogue.
+
+Sous SQLite, une table virtuelle FTS5 indexe le titre, la description et le
+genre de chaque film (rowid = id du film). Elle est créée après `migrate`
+(voir MoviesConfig.ready) et tenue à jour par movies/signals.py.
+Sous PostgreSQL, la recherche passe par to_tsvector / to_tsquery (préfixes,
+classement ts_rank), sans table supplémentaire.
+Ailleurs, ou si SQLite est compilé sans FTS5, chaque mot doit apparaître dans le
+titre ou la description (icontains), sans classement.
+"""
+import logging
+import re
+
+from django.db import connection, connections, models, OperationalError
+
+from .models import FullTextDocumentField, Movie, MovieSearchEntry
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = MovieSearchEntry._meta.db_table
+FTS_COLUMNS = ('title', 'description', 'genre')
+# Poids bm25 par colonne (même ordre que FTS_COLUMNS) : le titre compte le plus
+FTS_WEIGHTS = (10.0, 1.0, 3.0)
+
+
+def create_search_index(using='default', **kwargs):
+    """Crée la table FTS5 si besoin (appelé sur post_migrate)."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+            )
+    except OperationalError:
+        # SQLite compilé sans FTS5 : on garde la recherche par préfixe
+        db.movies_fts = False
+        return
+    db.movies_fts = True
+
+
+def fts_available():
+    """
+    La table FTS5 existe-t-elle ? Seule une réponse positive est mémorisée sur la
+    connexion (la table ne disparaît pas) : une connexion persistante ouverte avant
+    `migrate` voit la table dès qu'elle est créée.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    if not getattr(connection, 'movies_fts', False):
+        connection.movies_fts = FTS_TABLE in connection.introspection.table_names()
+    return connection.movies_fts
+
+
+def index_movies(movies):
+    """Ajoute ou remplace les films donnés dans l'index."""
+    if not fts_available() or not movies:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(m.pk,) for m in movies])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)",
+            [(m.pk, m.title, m.description, m.genre) for m in movies],
+        )
+
+
+def unindex_movies(movie_ids):
+    if not fts_available() or not movie_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in movie_ids])
+
+
+def rebuild_search_index():
+    """Reconstruit tout l'index à partir de la table des films. Retourne le nombre de films indexés."""
+    if not fts_available():
+        return 0
+    movie_table = Movie._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT id, {', '.join(FTS_COLUMNS)} FROM {movie_table}"
+        )
+        return cursor.rowcount
+
+
+def build_match_query(text):
+    """
+    Transforme la saisie utilisateur en requête FTS5 : chaque mot devient un
+    préfixe ("sta"* "wa"*), ce qui permet la recherche au fil de la frappe.
+    Les mots sont mis entre guillemets pour neutraliser la syntaxe FTS5.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+@FullTextDocumentField.register_lookup
+class Match(models.Lookup):
+    """document__match="requête" : opérateur MATCH de FTS5 (MovieSearchEntry.document)."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+class SearchRank(models.Func):
+    """
+    Score bm25 d'un film (plus petit = plus pertinent), calculé sur la ligne FTS5
+    jointe par search_entry__document__match : aucune sous-requête par film.
+    """
+    function = 'bm25'
+    output_field = models.FloatField()
+
+    def __init__(self):
+        super().__init__(models.F('search_entry__document'), *(models.Value(weight) for weight in FTS_WEIGHTS))
+
+
+def postgres_search(queryset, terms):
+    """Préfixes ("sta:* & wa:*") sur titre (A), genre (B) et description (C), classés par ts_rank."""
+    from django.contrib.postgres.search import SearchQuery, SearchRank as PgSearchRank, SearchVector
+
+    vector = (
+        SearchVector('title', weight='A', config='simple')
+        + SearchVector('genre', weight='B', config='simple')
+        + SearchVector('description', weight='C', config='simple')
+    )
+    query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+    # Même convention que bm25 : plus petit = plus pertinent
+    return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+        search_rank=PgSearchRank(vector, query) * -1
+    )
+
+
+def search_movies(queryset, text):
+    """
+    Filtre un queryset de films sur `text`.
+    Retourne (queryset, classé) : si classé est vrai, le queryset est annoté
+    avec `search_rank` (plus petit = plus pertinent) et peut être trié par pertinence.
+    Une saisie sans aucun mot (ponctuation seule) ne trouve rien.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none(), False
+    if connection.vendor == 'postgresql':
+        return postgres_search(queryset, terms), True
+    if not fts_available():
+        if connection.vendor == 'sqlite':
+            logger.warning("Index FTS5 absent : recherche sans classement (manage.py rebuild_search_index)")
+        for term in terms:
+            queryset = queryset.filter(models.Q(title__icontains=term) | models.Q(description__icontains=term))
+        return queryset, False
+    # Jointure avec la table FTS5 : un seul MATCH pour toute la requête, classé par bm25
+    queryset = queryset.filter(search_entry__document__match=build_match_query(text))
+    return queryset.annotate(search_rank=SearchRank()), True
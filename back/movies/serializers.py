@@ -1,7 +1,88 @@
 from rest_framework import serializers
+from django.db import models
 from .models import Movie, List, MovieInList, Like, View, Review, Report
 from django.contrib.auth.models import User
 
+
+class MovieFlagsResolver:
+    """
+    Résout is_liked / is_viewed pour un lot de films en une seule requête
+    (UNION des Like et View de l'utilisateur) au lieu d'un exists() par film.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.liked = set()
+        self.viewed = set()
+        self.resolved = set()
+
+    @property
+    def enabled(self):
+        return self.user is not None and self.user.is_authenticated
+
+    def prime(self, movie_ids):
+        missing = {movie_id for movie_id in movie_ids if movie_id is not None} - self.resolved
+        if not missing or not self.enabled:
+            return
+        likes = (
+            Like.objects.filter(user=self.user, movie_id__in=missing)
+            .order_by()
+            .annotate(kind=models.Value('like', output_field=models.CharField()))
+            .values_list('movie_id', 'kind')
+        )
+        views = (
+            View.objects.filter(user=self.user, movie_id__in=missing)
+            .order_by()
+            .annotate(kind=models.Value('view', output_field=models.CharField()))
+            .values_list('movie_id', 'kind')
+        )
+        for movie_id, kind in likes.union(views, all=True):
+            if kind == 'like':
+                self.liked.add(movie_id)
+            else:
+                self.viewed.add(movie_id)
+        self.resolved |= missing
+
+    def set(self, movie_id, liked=None, viewed=None):
+        # Permet aux vues qui viennent de modifier un Like / View d'éviter une relecture
+        if liked is not None:
+            (self.liked.add if liked else self.liked.discard)(movie_id)
+        if viewed is not None:
+            (self.viewed.add if viewed else self.viewed.discard)(movie_id)
+
+    def is_liked(self, movie_id):
+        self.prime([movie_id])
+        return movie_id in self.liked
+
+    def is_viewed(self, movie_id):
+        self.prime([movie_id])
+        return movie_id in self.viewed
+
+
+def get_flags_resolver(context):
+    """Retourne le resolver partagé par tous les serializers d'une même réponse."""
+    resolver = context.get('movie_flags')
+    if resolver is None:
+        request = context.get('request')
+        resolver = MovieFlagsResolver(getattr(request, 'user', None))
+        context['movie_flags'] = resolver
+    return resolver
+
+
+class MovieFlagsListSerializer(serializers.ListSerializer):
+    """
+    Pré-charge les flags de tous les films de la page avant de sérialiser
+    les éléments un par un.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        get_flags_resolver(self.context).prime(
+            self.child.get_flags_movie_id(item) for item in items
+        )
+        return super().to_representation(items)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -15,20 +96,20 @@ class MovieSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = ['id', 'title', 'description', 'release_year', 'genre', 'poster_url', 
-                 'created_at', 'updated_at', 'created_by', 'is_liked', 'is_viewed']
-        read_only_fields = ['created_at', 'updated_at', 'created_by']
+                 'created_at', 'updated_at', 'created_by', 'is_liked', 'is_viewed',
+                 'review_avg', 'review_count', 'like_count', 'view_count']
+        read_only_fields = ['created_at', 'updated_at', 'created_by',
+                            'review_avg', 'review_count', 'like_count', 'view_count']
+        list_serializer_class = MovieFlagsListSerializer
+
+    def get_flags_movie_id(self, obj):
+        return obj.pk
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Like.objects.filter(user=request.user, movie=obj).exists()
-        return False
+        return get_flags_resolver(self.context).is_liked(obj.pk)
 
     def get_is_viewed(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return View.objects.filter(user=request.user, movie=obj).exists()
-        return False
+        return get_flags_resolver(self.context).is_viewed(obj.pk)
 
 class MovieInListSerializer(serializers.ModelSerializer):
     movie = MovieSerializer(read_only=True)
@@ -39,14 +120,34 @@ class MovieInListSerializer(serializers.ModelSerializer):
         model = MovieInList
         fields = ['id', 'movie', 'added_at', 'note']
         read_only_fields = ['id', 'added_at']
+        list_serializer_class = MovieFlagsListSerializer
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['movie'] = MovieSerializer(
-            instance.movie,
-            context=self.context
-        ).data
-        return representation
+    def get_flags_movie_id(self, obj):
+        return obj.movie_id
+
+class BulkListItemSerializer(serializers.Serializer):
+    movie_id = serializers.IntegerField(min_value=1)
+    note = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class BulkListMoviesSerializer(serializers.Serializer):
+    """
+    Entrée des ajouts / retraits groupés dans une liste :
+    {"movies": [{"movie_id": 1, "note": "..."}, ...]} et/ou {"movie_ids": [1, 2, ...]}.
+    """
+    MAX_ITEMS = 500
+
+    movies = BulkListItemSerializer(many=True, required=False)
+    movie_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, attrs):
+        items = [dict(item) for item in attrs.get('movies', [])]
+        items += [{'movie_id': movie_id, 'note': ''} for movie_id in attrs.get('movie_ids', [])]
+        if not items:
+            raise serializers.ValidationError("movie_ids ou movies est requis.")
+        if len(items) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f"Au plus {self.MAX_ITEMS} films par requête.")
+        return {'items': items}
 
 class ListSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
@@ -59,7 +160,9 @@ class ListSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at', 'created_by']
 
     def get_movies_count(self, obj):
-        return obj.movies.count()
+        # Annoté par ListViewSet.get_queryset ; sinon (liste qui vient d'être créée) on compte
+        count = getattr(obj, 'movies_count', None)
+        return obj.movies.count() if count is None else count
 
     def validate_name(self, value):
         user = self.context['request'].user
@@ -78,7 +181,11 @@ class ListDetailSerializer(ListSerializer):
         fields = ListSerializer.Meta.fields + ['movies']
 
     def get_movies(self, obj):
-        movies_in_list = obj.movieinlist_set.select_related('movie').all()
+        # Préchargé par ListViewSet.get_queryset pour le détail
+        if 'movieinlist_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            movies_in_list = obj.movieinlist_set.all()
+        else:
+            movies_in_list = obj.movieinlist_set.select_related('movie__created_by')
         return MovieInListSerializer(
             movies_in_list,
             many=True,
@@ -95,6 +202,53 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ['id', 'user', 'movie', 'rating', 'comment', 'created_at', 'is_reported', 'report_count']
         read_only_fields = ['created_at', 'is_reported', 'report_count']
+        list_serializer_class = MovieFlagsListSerializer
+
+    def get_flags_movie_id(self, obj):
+        return obj.movie_id
+
+class ReviewAuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+class MovieReviewSerializer(serializers.ModelSerializer):
+    """Avis dans le fil d'un film : sans le film (déjà connu du client), auteur réduit."""
+    user = ReviewAuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'rating', 'comment', 'created_at', 'is_reported', 'report_count']
+        read_only_fields = fields
+
+class ModerationReviewSerializer(serializers.ModelSerializer):
+    """
+    Élément de la file de modération : le film est réduit à l'essentiel et les
+    signalements sont résumés par motif (context['report_summaries'], calculé
+    en une requête pour toute la page).
+    """
+    user = UserSerializer(read_only=True)
+    movie = serializers.SerializerMethodField()
+    last_reported_at = serializers.DateTimeField(read_only=True)
+    reports = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'movie', 'rating', 'comment', 'created_at', 'is_reported', 'report_count',
+                  'last_reported_at', 'reports']
+
+    def get_movie(self, obj):
+        return {'id': obj.movie_id, 'title': obj.movie.title, 'poster_url': obj.movie.poster_url}
+
+    def get_reports(self, obj):
+        return self.context.get('report_summaries', {}).get(obj.pk, {})
+
+class ModerateReviewsSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    review_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                       max_length=MAX_ITEMS)
+    action = serializers.ChoiceField(choices=['dismiss', 'delete'])
 
 class ReportSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -106,10 +260,11 @@ class ReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
     def create(self, validated_data):
-        report = Report.objects.create(**validated_data)
-        review = report.review
-        review.is_reported = True
-        review.save()
+        from .services import report_review, AlreadyReported
+        try:
+            report, _ = report_review(**validated_data)
+        except AlreadyReported:
+            raise serializers.ValidationError("Vous avez déjà signalé ce commentaire")
         return report
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -120,6 +275,10 @@ class LikeSerializer(serializers.ModelSerializer):
         model = Like
         fields = ['id', 'user', 'movie', 'created_at']
         read_only_fields = ['created_at']
+        list_serializer_class = MovieFlagsListSerializer
+
+    def get_flags_movie_id(self, obj):
+        return obj.movie_id
 
 class ViewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -128,4 +287,8 @@ class ViewSerializer(serializers.ModelSerializer):
     class Meta:
         model = View
         fields = ['id', 'user', 'movie', 'viewed_at']
-        read_only_fields = ['viewed_at']
\ No newline at end of file
+        read_only_fields = ['viewed_at']
+        list_serializer_class = MovieFlagsListSerializer
+
+    def get_flags_movie_id(self, obj):
+        return obj.movie_id
\ No newline at end of file
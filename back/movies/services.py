@@ -0,0 +1,308 @@
+"""
+Écritures « métier » partagées par les vues : likes / vus et listes système.
+
+Un Like ou un View est posé par un INSERT protégé par la contrainte d'unicité
+(user, movie) dans un savepoint, puis retiré par un DELETE : pas de lecture
+préalable, et deux clics simultanés ne peuvent pas créer de doublon ni faire
+échouer la requête. Chaque opération est atomique avec la mise à jour de la
+liste système associée ("Favoris" pour les likes, "Déjà vu" pour les vus).
+
+Les signalements de commentaires suivent le même principe : l'unicité (user,
+review) remplace la vérification préalable, et le compteur est incrémenté en
+base (F()) pour ne perdre aucun signalement quand ils arrivent en rafale.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+
+from .cache import invalidate_catalog, invalidate_movies, invalidate_user_flags
+from .models import Movie, List, MovieInList, Like, View, Review, Report
+from .signals import COUNTERS, batched_stats_refresh
+
+# Type d'interaction -> (modèle, liste système, description de la liste, note ajoutée au film)
+INTERACTIONS = {
+    'like': (Like, "Favoris", 'Films que vous avez aimés', 'Ajouté aux favoris automatiquement'),
+    'view': (View, "Déjà vu", 'Films que vous avez vus', 'Marqué comme vu automatiquement'),
+}
+
+
+def supports_returning():
+    """
+    ON CONFLICT DO NOTHING et UPDATE ... RETURNING : PostgreSQL et SQLite >= 3.35.
+    can_return_rows_from_bulk_insert seul ne suffit pas : il est vrai sur MariaDB,
+    qui n'a ni l'un ni l'autre.
+    """
+    return connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_rows_from_bulk_insert
+
+
+def ensure_system_lists(user):
+    """
+    Crée les listes système de l'utilisateur en un INSERT (les listes déjà
+    présentes sont ignorées grâce à l'unicité (name, created_by)). Appelé à la
+    vérification du compte : les clics sur like / vu n'ont plus à s'en soucier.
+    """
+    List.objects.bulk_create([
+        List(name=name, description=description, created_by=user, is_system=True)
+        for _, name, description, _ in INTERACTIONS.values()
+    ], ignore_conflicts=True)
+
+
+def system_list(user, kind):
+    name = INTERACTIONS[kind][1]
+    try:
+        return List.objects.get(created_by=user, is_system=True, name=name)
+    except List.DoesNotExist:
+        # Comptes créés avant que les listes système ne soient créées à la vérification
+        ensure_system_lists(user)
+        return List.objects.get(created_by=user, is_system=True, name=name)
+
+
+def set_interaction(user, movie, kind):
+    """Pose le like / vu. Retourne False s'il existait déjà."""
+    model, _, _, note = INTERACTIONS[kind]
+    with transaction.atomic(savepoint=False):
+        try:
+            # Seul l'INSERT a besoin d'un savepoint : un doublon l'annule sans casser la transaction
+            with transaction.atomic():
+                model.objects.create(user=user, movie=movie)
+        except IntegrityError:
+            return False
+        MovieInList.objects.bulk_create(
+            [MovieInList(movie=movie, list=system_list(user, kind), note=note)], ignore_conflicts=True
+        )
+    return True
+
+
+def unset_interaction(user, movie, kind):
+    """Retire le like / vu. Retourne False s'il n'existait pas."""
+    model, name, _, _ = INTERACTIONS[kind]
+    with transaction.atomic(savepoint=False):
+        deleted, _ = model.objects.filter(user=user, movie=movie).delete()
+        if deleted:
+            MovieInList.objects.filter(
+                movie=movie, list__created_by=user, list__is_system=True, list__name=name
+            ).delete()
+    return bool(deleted)
+
+
+def toggle_interaction(user, movie, kind):
+    """
+    Ancien comportement de POST like / view. Retourne le nouvel état.
+    Si deux bascules se croisent, la seconde trouve l'INSERT déjà fait : l'état
+    final reste cohérent et aucune requête n'échoue.
+    """
+    with transaction.atomic(savepoint=False):
+        if unset_interaction(user, movie, kind):
+            return False
+        set_interaction(user, movie, kind)
+        return True
+
+
+def insert_new_rows(model, objs, scope, key='movie_id', batch_size=500):
+    """
+    INSERT groupé de `objs` qui ignore les lignes déjà présentes (contrainte d'unicité) ;
+    retourne les valeurs de `key` des lignes réellement insérées par cet appel.
+    SQLite et PostgreSQL : INSERT ... ON CONFLICT DO NOTHING RETURNING, exact même face
+    à une requête concurrente. Les autres bases (MySQL / MariaDB n'ont pas ON CONFLICT)
+    passent par bulk_create(ignore_conflicts=True) entre deux lectures des lignes de
+    `scope` : sont insérées celles dont la clé primaire n'existait pas avant.
+    """
+    keys = [getattr(obj, key) for obj in objs]
+    if not supports_returning():
+        rows = model.objects.filter(**scope, **{f'{key}__in': keys})
+        before = set(rows.values_list('pk', flat=True))
+        model.objects.bulk_create(objs, ignore_conflicts=True, batch_size=batch_size)
+        return {value for pk, value in rows.values_list('pk', key) if pk not in before}
+    qn = connection.ops.quote_name
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns = ', '.join(qn(field.column) for field in fields)
+    placeholders = f"({', '.join(['%s'] * len(fields))})"
+    inserted = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {qn(model._meta.db_table)} ({columns}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT DO NOTHING RETURNING {qn(model._meta.get_field(key).column)}",
+                # pre_save : valeurs auto_now_add comme le ferait bulk_create
+                [field.get_db_prep_save(field.pre_save(obj, True), connection) for obj in batch for field in fields],
+            )
+            inserted.update(row[0] for row in cursor.fetchall())
+    return inserted
+
+
+def insert_interactions(model, user, movie_ids, batch_size=500):
+    """
+    INSERT groupé des likes / vus ignorant ceux qui existent déjà ; retourne les ids
+    des films réellement insérés (insert_new_rows). Une requête concurrente qui a
+    posé le même like entre-temps n'est donc pas comptée comme un ajout.
+    """
+    return insert_new_rows(model, [model(user=user, movie_id=movie_id) for movie_id in movie_ids], {'user': user},
+                           batch_size=batch_size)
+
+
+def bulk_set_interaction(user, movie_ids, kind):
+    """
+    Pose le like / vu sur plusieurs films : une lecture, deux INSERT groupés et une
+    mise à jour des compteurs. Le statut 'added' ne vaut que pour les lignes
+    réellement insérées (insert_interactions). Les INSERT groupés n'envoient pas de
+    signaux, les compteurs et le cache sont donc mis à jour ici.
+    Retourne [{'movie_id', 'status'}].
+    """
+    model, _, _, note = INTERACTIONS[kind]
+    with transaction.atomic(savepoint=False):
+        known = dict(
+            Movie.objects.filter(pk__in=set(movie_ids))
+            .annotate(already=models.Exists(model.objects.filter(user=user, movie=models.OuterRef('pk'))))
+            .values_list('pk', 'already')
+        )
+        results, added, seen = [], [], set()
+        for movie_id in movie_ids:
+            if movie_id not in known:
+                outcome = 'not_found'
+            elif movie_id in seen:
+                outcome = 'duplicate'
+            elif known[movie_id]:
+                outcome = 'unchanged'
+            else:
+                outcome = 'added'
+                added.append(movie_id)
+            seen.add(movie_id)
+            results.append({'movie_id': movie_id, 'status': outcome})
+
+        if added:
+            inserted = insert_interactions(model, user, added)
+            # Posé par une requête concurrente entre la lecture et l'INSERT : rien de neuf
+            for result in results:
+                if result['status'] == 'added' and result['movie_id'] not in inserted:
+                    result['status'] = 'unchanged'
+            added = [movie_id for movie_id in added if movie_id in inserted]
+        if added:
+            list_obj = system_list(user, kind)
+            MovieInList.objects.bulk_create(
+                [MovieInList(movie_id=movie_id, list=list_obj, note=note) for movie_id in added],
+                ignore_conflicts=True
+            )
+            Movie.objects.filter(pk__in=added).add_to_counter(COUNTERS[model], 1)
+            invalidate_movies(added)
+            invalidate_user_flags([user.pk])
+    return results
+
+
+class AlreadyReviewed(Exception):
+    pass
+
+
+def create_review(user, movie, rating, comment):
+    """
+    Un seul INSERT, protégé par la contrainte unique (user, movie) : pas de lecture
+    préalable, et deux envois simultanés ne créent pas de doublon. Les agrégats du
+    film sont recalculés dans la même transaction (signal post_save).
+    """
+    with transaction.atomic(savepoint=False):
+        try:
+            with transaction.atomic():
+                review = Review.objects.create(user=user, movie=movie, rating=rating, comment=comment)
+        except IntegrityError:
+            review = None
+    if review is None:
+        raise AlreadyReviewed
+    return review
+
+
+def _update_review_returning(user, movie, rating, comment):
+    """UPDATE ... RETURNING : la ligne modifiée revient avec l'UPDATE, sans second SELECT."""
+    if not supports_returning():
+        # Base sans UPDATE ... RETURNING : UPDATE puis une seule lecture
+        if not Review.objects.filter(user=user, movie=movie).update(rating=rating, comment=comment):
+            return None
+        return Review.objects.get(user=user, movie=movie)
+    qn = connection.ops.quote_name
+    fields = {name: qn(Review._meta.get_field(name).column) for name in ('rating', 'comment', 'user', 'movie')}
+    sql = (
+        f"UPDATE {qn(Review._meta.db_table)} SET {fields['rating']} = %s, {fields['comment']} = %s "
+        f"WHERE {fields['user']} = %s AND {fields['movie']} = %s RETURNING *"
+    )
+    # list() : l'instruction est menée à son terme avant la suite de la transaction
+    rows = list(Review.objects.raw(sql, [rating, comment, user.pk, movie.pk]))
+    return rows[0] if rows else None
+
+
+def update_review(user, movie, rating, comment):
+    """
+    Modifie l'avis de l'utilisateur par un UPDATE direct (sans le relire avant) et
+    retourne la ligne modifiée, ou None si l'utilisateur n'a pas d'avis sur ce film.
+    update() n'envoie pas de signaux : agrégats et cache sont mis à jour ici, dans
+    la même transaction.
+    """
+    with transaction.atomic(savepoint=False):
+        review = _update_review_returning(user, movie, rating, comment)
+        if review is not None:
+            # L'auteur est celui du WHERE : rattaché sans relire auth_user (comme create_review)
+            review.user = user
+            Movie.objects.filter(pk=movie.pk).refresh_review_avg()
+            invalidate_movies([movie.pk])
+            invalidate_catalog()
+    return review
+
+
+class AlreadyReported(Exception):
+    pass
+
+
+def report_review(user, review, reason, description=''):
+    """
+    Enregistre le signalement et incrémente le compteur du commentaire, dans une
+    seule transaction. Au-delà de REVIEW_REPORT_DELETE_THRESHOLD signalements, le
+    commentaire est supprimé. Retourne (report, supprimé) ; lève AlreadyReported
+    si l'utilisateur avait déjà signalé ce commentaire.
+    """
+    threshold = getattr(settings, 'REVIEW_REPORT_DELETE_THRESHOLD', 10)
+    deleted = False
+    with transaction.atomic(savepoint=False):
+        try:
+            # Savepoint propre à l'INSERT : un doublon n'invalide pas la transaction
+            with transaction.atomic():
+                report = Report.objects.create(user=user, review=review, reason=reason, description=description)
+        except IntegrityError:
+            report = None
+        if report is not None:
+            # Incrément côté base : deux signalements simultanés comptent bien pour deux
+            Review.objects.filter(pk=review.pk).update(
+                report_count=models.F('report_count') + 1, is_reported=True, last_reported_at=report.created_at
+            )
+            review.refresh_from_db(fields=['report_count', 'is_reported', 'last_reported_at'])
+            if review.report_count >= threshold:
+                # Conditionnel : ne supprime pas un commentaire remis à zéro entre-temps par un modérateur
+                deleted = Review.objects.filter(pk=review.pk, report_count__gte=threshold).delete()[0] > 0
+    if report is None:
+        raise AlreadyReported
+    return report, deleted
+
+
+def moderate_reviews(review_ids, action):
+    """
+    Modération groupée. 'dismiss' classe les signalements (supprimés, compteur remis
+    à zéro) ; 'delete' supprime les commentaires. Retourne [{'review_id', 'status'}].
+    """
+    with transaction.atomic(savepoint=False):
+        known = set(Review.objects.filter(pk__in=set(review_ids)).values_list('pk', flat=True))
+        if action == 'dismiss':
+            Report.objects.filter(review_id__in=known).delete()
+            Review.objects.filter(pk__in=known).update(is_reported=False, report_count=0, last_reported_at=None)
+            outcome = 'dismissed'
+        else:
+            with batched_stats_refresh():
+                Review.objects.filter(pk__in=known).delete()
+            outcome = 'deleted'
+
+    results, seen = [], set()
+    for review_id in review_ids:
+        if review_id not in known:
+            status = 'not_found'
+        elif review_id in seen:
+            status = 'duplicate'
+        else:
+            status = outcome
+        seen.add(review_id)
+        results.append({'review_id': review_id, 'status': status})
+    return results
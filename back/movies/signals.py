@@ -0,0 +1,152 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Movie, Review, Like, View, sync_movie_genres
+from .search import index_movies, unindex_movies
+from .cache import invalidate_catalog, invalidate_movies, invalidate_user_flags
+
+User = get_user_model()
+
+_stats_batch = threading.local()
+
+
+def cascade_origin(kwargs):
+    """
+    Movie ou User si le signal vient de la suppression en cascade d'un film ou d'un
+    utilisateur (argument `origin` des signaux de suppression), sinon None.
+    """
+    origin = kwargs.get('origin')
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model if model in (Movie, User) else None
+
+
+# Interaction -> compteur dénormalisé du film
+COUNTERS = {Like: 'like_count', View: 'view_count'}
+
+
+def _stats_refresh_deferred(instance, kwargs):
+    """
+    Cascade : film supprimé (plus rien à recompter) ou utilisateur supprimé (un seul
+    recalcul dans refresh_stats_after_user_delete). Dans batched_stats_refresh, le
+    film est noté pour un recalcul complet en sortie de bloc.
+    """
+    if cascade_origin(kwargs) is not None:
+        return True
+    pending = getattr(_stats_batch, 'movie_ids', None)
+    if pending is not None:
+        pending.add(instance.movie_id)
+        return True
+    return False
+
+
+# Mise à jour en base (F()) plutôt que recomptage : un UPDATE sans sous-requête par clic.
+# Les écritures groupées (bulk_create, update) ajustent elles-mêmes les compteurs, et
+# manage.py rebuild_movie_stats recompte tout en cas de dérive.
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=View)
+@receiver(post_delete, sender=View)
+def refresh_movie_counter(sender, instance, created=True, **kwargs):
+    if not created or _stats_refresh_deferred(instance, kwargs):
+        return
+    delta = -1 if kwargs['signal'] is post_delete else 1
+    Movie.objects.filter(pk=instance.movie_id).add_to_counter(COUNTERS[sender], delta)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_movie_review_stats(sender, instance, created=True, **kwargs):
+    if _stats_refresh_deferred(instance, kwargs):
+        return
+    # Avis modifié : seule la moyenne change ; ajouté ou supprimé : le nombre d'avis aussi
+    review_delta = -1 if kwargs['signal'] is post_delete else int(created)
+    Movie.objects.filter(pk=instance.movie_id).refresh_review_avg(review_delta)
+
+
+@contextmanager
+def batched_stats_refresh(refresh=True):
+    """
+    Pour les suppressions en masse qui passent par les signaux (modération) : les
+    compteurs des films touchés sont recalculés en un seul UPDATE à la sortie du
+    bloc au lieu d'un UPDATE par objet supprimé. Avec refresh=False, aucun recalcul
+    (colonnes pas encore créées : manage.py rebuild_movie_stats après migrate).
+    """
+    if getattr(_stats_batch, 'movie_ids', None) is not None:
+        yield
+        return
+    _stats_batch.movie_ids = set()
+    try:
+        yield
+        movie_ids = _stats_batch.movie_ids
+    finally:
+        _stats_batch.movie_ids = None
+    if movie_ids and refresh:
+        Movie.objects.filter(pk__in=movie_ids).refresh_stats()
+
+
+@receiver(post_save, sender=Movie)
+def index_movie(sender, instance, **kwargs):
+    index_movies([instance])
+    sync_movie_genres([instance])
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_movie(sender, instance, **kwargs):
+    unindex_movies([instance.pk])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_cache(sender, instance, **kwargs):
+    invalidate_movies([instance.pk])
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_cache(sender, instance, **kwargs):
+    if cascade_origin(kwargs) is not None:
+        return
+    # La note moyenne sert aux filtres et aux tris : les pages de liste changent aussi
+    invalidate_movies([instance.movie_id])
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=View)
+@receiver(post_delete, sender=View)
+def invalidate_interaction_cache(sender, instance, **kwargs):
+    if cascade_origin(kwargs) is not None:
+        return
+    # Compteurs du film et flags de l'utilisateur seulement : les pages restent valables
+    invalidate_movies([instance.movie_id])
+    invalidate_user_flags([instance.user_id])
+
+
+@receiver(pre_delete, sender=User)
+def collect_user_movies(sender, instance, **kwargs):
+    # Films dont les compteurs changeront avec la cascade, lus avant qu'elle ne parte
+    instance._touched_movie_ids = set(
+        Review.objects.filter(user=instance).order_by().values_list('movie_id', flat=True).union(
+            Like.objects.filter(user=instance).order_by().values_list('movie_id', flat=True),
+            View.objects.filter(user=instance).order_by().values_list('movie_id', flat=True),
+        )
+    )
+
+
+@receiver(post_delete, sender=User)
+def refresh_stats_after_user_delete(sender, instance, **kwargs):
+    invalidate_user_flags([instance.pk])
+    movie_ids = getattr(instance, '_touched_movie_ids', None)
+    if not movie_ids:
+        return
+    # Avis, likes et vues déjà supprimés : un seul recalcul pour tous les films touchés
+    Movie.objects.filter(pk__in=movie_ids).refresh_stats()
+    invalidate_movies(movie_ids)
+    invalidate_catalog()
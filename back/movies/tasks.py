@@ -0,0 +1,20 @@
+"""Travaux longs du catalogue, exécutés par le worker (manage.py run_tasks)."""
+from django.core.management import call_command
+
+from tasks.queue import task
+
+
+@task('movies.import_tmdb')
+def import_tmdb(payload):
+    # payload : options de import_tmdb_movies, ex. {"pages": 20, "since": "2024-01-01"}
+    call_command('import_tmdb_movies', **payload)
+
+
+@task('movies.rebuild_stats')
+def rebuild_stats(payload):
+    call_command('rebuild_movie_stats', **payload)
+
+
+@task('movies.build_recommendations')
+def build_recommendations(payload):
+    call_command('build_recommendations', **payload)
@@ -1,3 +1,1165 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction, IntegrityError
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from backend.testing import QueryBudgetMixin, QUERY_BUDGETS, iter_routes
+from tasks import queue
+from tasks.models import Task
+from tasks.queue import enqueue_periodic, run_pending
+from . import search, services, tmdb, views
+from .models import Movie, Like, View, List, MovieInList, Review, Report, MovieNeighbor
+from .pagination import KeysetPagination
+from .services import ensure_system_lists, report_review
+from .signals import batched_stats_refresh
+
+
+class MovieFlagsBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000 + i % 20,
+                  genre="Drama", poster_url="https://example.com/p.jpg", created_by=cls.user)
+            for i in range(100)
+        ])
+        Like.objects.bulk_create([Like(user=cls.user, movie=m) for m in movies[::3]])
+        View.objects.bulk_create([View(user=cls.user, movie=m) for m in movies[::5]])
+        cls.liked_ids = {m.id for m in movies[::3]}
+        cls.viewed_ids = {m.id for m in movies[::5]}
+        favorites = List.objects.create(name="Favoris", created_by=cls.user, is_system=True)
+        MovieInList.objects.bulk_create([MovieInList(movie=m, list=favorites) for m in movies[:50]])
+        cls.favorites = favorites
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_movie_list_query_count_does_not_depend_on_page_size(self):
+        small, _ = self.count_queries('/api/movies/?page_size=10')
+        large, response = self.count_queries('/api/movies/?page_size=100')
+        self.assertEqual(small, large)
+        for movie in response.data['results']:
+            self.assertEqual(movie['is_liked'], movie['id'] in self.liked_ids)
+            self.assertEqual(movie['is_viewed'], movie['id'] in self.viewed_ids)
+
+    def test_list_detail_resolves_flags_in_batch(self):
+        queries, response = self.count_queries(f'/api/lists/{self.favorites.id}/')
+        self.assertLess(queries, 10)
+        self.assertEqual(len(response.data['movies']), 50)
+        for item in response.data['movies']:
+            self.assertEqual(item['movie']['is_liked'], item['movie']['id'] in self.liked_ids)
+
+    def test_list_movies_are_paginated_and_serialized_in_batch(self):
+        small, _ = self.count_queries(f'/api/lists/{self.favorites.id}/movies/?page_size=5')
+        large, response = self.count_queries(f'/api/lists/{self.favorites.id}/movies/?page_size=40')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 50)
+        self.assertEqual(len(response.data['results']), 40)
+        for item in response.data['results']:
+            self.assertEqual(item['movie']['is_liked'], item['movie']['id'] in self.liked_ids)
+            self.assertEqual(item['movie']['is_viewed'], item['movie']['id'] in self.viewed_ids)
+
+        newest = self.client.get(f'/api/lists/{self.favorites.id}/movies/?page_size=50').data['results']
+        oldest = self.client.get(f'/api/lists/{self.favorites.id}/movies/?page_size=50&ordering=added_at').data['results']
+        self.assertEqual([item['id'] for item in oldest], [item['id'] for item in reversed(newest)])
+
+        response = self.client.get(f'/api/lists/{self.favorites.id}/movies/?pagination=cursor&page_size=30')
+        self.assertEqual(len(response.data['results']), 30)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_lists_index_query_count_does_not_depend_on_list_count(self):
+        before, response = self.count_queries('/api/lists/')
+        self.assertEqual(response.data[0]['movies_count'], 50)
+        movie = Movie.objects.first()
+        for i in range(30):
+            extra = List.objects.create(name=f"Liste {i}", created_by=self.user)
+            MovieInList.objects.create(movie=movie, list=extra)
+        after, response = self.count_queries('/api/lists/')
+        self.assertEqual(before, after)
+        self.assertEqual(sorted(item['movies_count'] for item in response.data), [1] * 30 + [50])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MovieQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Budget SQL / latence pour chaque route de movies/urls.py sur un catalogue réaliste."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalog', movies=2000, users=40, stdout=StringIO())
+        call_command('build_recommendations', stdout=StringIO())
+        cls.user = User.objects.filter(username__startswith='seed_user_').first()
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'secret', is_staff=True)
+        cls.movie = Movie.objects.filter(reviews__isnull=False).first()
+        cls.review = Review.objects.filter(movie=cls.movie).exclude(user=cls.user).first()
+        cls.user_list = List.objects.filter(created_by=cls.user, is_system=False).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_every_route_has_a_budget(self):
+        missing = iter_routes('movies.urls') - set(QUERY_BUDGETS)
+        self.assertFalse(missing, f"Routes sans budget de requêtes : {sorted(missing)}")
+
+    def test_query_plans_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', '--fail-on-scan', stdout=out)
+        self.assertIn("0 lecture(s) complète(s) de table.", out.getvalue())
+        # La requête exacte de la vue, triée par l'index partiel (pas de tri en mémoire)
+        self.assertIn("OK      file de modération", out.getvalue())
+
+    def test_api_root(self):
+        self.assertWithinBudget('get', '/api/')
+
+    def test_movie_search(self):
+        # Classement bm25 sur la jointure FTS5 : le coût ne dépend pas du nombre de films trouvés
+        for text in ('star', 'star 1', 'last storm'):
+            response = self.assertWithinBudget('get', f'/api/movies/?search={text}&page_size=100')
+            self.assertTrue(response.data['results'], text)
+        response = self.assertWithinBudget('get', '/api/movies/?search=star&pagination=cursor&page_size=100')
+        self.assertWithinBudget('get', response.data['next'].replace('http://testserver', ''))
+
+    def test_movie_list(self):
+        self.assertWithinBudget('get', '/api/movies/?page_size=100')
+
+    def test_movie_list_filtered(self):
+        self.assertWithinBudget(
+            'get', '/api/movies/?page_size=100&genres=Drama&min_rating=2&ordering=-review_avg'
+        )
+
+    def test_genre_facets(self):
+        self.assertWithinBudget('get', '/api/movies/genre_facets/?genres=Drama&min_rating=2')
+
+    def test_recommended(self):
+        response = self.assertWithinBudget('get', '/api/movies/recommended/')
+        self.assertEqual(response.data['source'], 'neighbors')
+
+    def test_movie_detail(self):
+        self.assertWithinBudget('get', f'/api/movies/{self.movie.id}/')
+
+    def test_movie_reviews(self):
+        self.assertWithinBudget('get', f'/api/movies/{self.movie.id}/reviews/')
+
+    def test_add_and_update_review(self):
+        movie = Movie.objects.exclude(reviews__user=self.user).first()
+        self.assertWithinBudget('post', f'/api/movies/{movie.id}/add_review/',
+                                data={'rating': 4, 'comment': 'Bien'}, expected_status=201)
+        self.assertWithinBudget('put', f'/api/movies/{movie.id}/update_review/',
+                                data={'rating': 5, 'comment': 'Très bien'})
+
+    def test_delete_review(self):
+        review = Review.objects.filter(user=self.user).first()
+        self.assertWithinBudget('delete', f'/api/movies/{review.movie_id}/delete_review/?review_id={review.id}',
+                                expected_status=204)
+
+    def test_like_and_view_toggles(self):
+        movie = Movie.objects.exclude(likes=self.user).exclude(views=self.user).first()
+        for action in ('like', 'view'):
+            self.assertWithinBudget('post', f'/api/movies/{movie.id}/{action}/')
+            self.assertWithinBudget('post', f'/api/movies/{movie.id}/{action}/')
+            self.assertWithinBudget('put', f'/api/movies/{movie.id}/{action}/')
+            self.assertWithinBudget('delete', f'/api/movies/{movie.id}/{action}/')
+
+    def test_bulk_view(self):
+        movie_ids = list(Movie.objects.exclude(views=self.user).values_list('pk', flat=True)[:200])
+        self.assertWithinBudget('post', '/api/movies/bulk_view/', data={'movie_ids': movie_ids}, format='json')
+
+    def test_report_review(self):
+        review = Review.objects.exclude(user=self.user).exclude(reports__user=self.user).first()
+        self.assertWithinBudget('post', f'/api/movies/{review.movie_id}/report_review/',
+                                data={'review_id': review.id, 'reason': 'spam'}, expected_status=201)
+
+    def test_moderation_routes(self):
+        self.client.force_authenticate(self.admin)
+        review = Review.objects.filter(is_reported=True).first()
+        self.assertWithinBudget('get', f'/api/movies/{review.movie_id}/reported_reviews/')
+        self.assertWithinBudget('get', f'/api/movies/{review.movie_id}/reports/?review_id={review.id}')
+        self.assertWithinBudget('get', '/api/movies/all_reported_reviews/?page_size=100')
+        review_ids = list(Review.objects.filter(is_reported=True).values_list('pk', flat=True)[:50])
+        self.assertWithinBudget('post', '/api/movies/moderate_reviews/',
+                                data={'review_ids': review_ids[:25], 'action': 'dismiss'}, format='json')
+        self.assertWithinBudget('post', '/api/movies/moderate_reviews/',
+                                data={'review_ids': review_ids[25:], 'action': 'delete'}, format='json')
+
+    def test_lists(self):
+        self.assertWithinBudget('get', '/api/lists/')
+        self.assertWithinBudget('get', f'/api/lists/{self.user_list.id}/')
+
+    def test_list_movies(self):
+        self.assertWithinBudget('get', f'/api/lists/{self.user_list.id}/movies/?page_size=100')
+
+    def test_add_and_remove_movie_in_list(self):
+        movie = Movie.objects.exclude(user_lists=self.user_list).first()
+        self.assertWithinBudget('post', f'/api/lists/{self.user_list.id}/add_movie/',
+                                data={'movie_id': movie.id})
+        self.assertWithinBudget('post', f'/api/lists/{self.user_list.id}/remove_movie/',
+                                data={'movie_id': movie.id})
+
+    def test_bulk_add_and_remove_movies_in_list(self):
+        movie_ids = list(Movie.objects.exclude(user_lists=self.user_list).values_list('pk', flat=True)[:200])
+        self.assertWithinBudget('post', f'/api/lists/{self.user_list.id}/add_movies/',
+                                data={'movie_ids': movie_ids}, format='json')
+        self.assertWithinBudget('post', f'/api/lists/{self.user_list.id}/remove_movies/',
+                                data={'movie_ids': movie_ids}, format='json')
+
+
+class ListBulkMoviesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.other = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        cls.movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(4)
+        ])
+        cls.watchlist = List.objects.create(name="À voir", created_by=cls.user)
+        MovieInList.objects.create(list=cls.watchlist, movie=cls.movies[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, action, data):
+        return self.client.post(f'/api/lists/{self.watchlist.id}/{action}/', data, format='json')
+
+    def test_add_movies_reports_each_item(self):
+        a, b, c, d = self.movies
+        response = self.post('add_movies', {
+            'movies': [{'movie_id': b.id, 'note': "à revoir"}],
+            'movie_ids': [a.id, c.id, c.id, 999999],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], 2)
+        self.assertEqual(
+            [(item['movie_id'], item['status']) for item in response.data['results']],
+            [(b.id, 'added'), (a.id, 'already_in_list'), (c.id, 'added'), (c.id, 'duplicate'),
+             (999999, 'not_found')]
+        )
+        self.assertEqual(set(self.watchlist.movies.values_list('pk', flat=True)), {a.id, b.id, c.id})
+        self.assertEqual(MovieInList.objects.get(list=self.watchlist, movie=b).note, "à revoir")
+
+    def test_add_movies_counts_only_rows_it_inserted(self):
+        a, b, c, d = self.movies
+        original = services.insert_new_rows
+
+        def concurrent_then_insert(model, objs, scope):
+            # Une autre requête ajoute `b` entre la lecture et l'INSERT
+            MovieInList.objects.create(list=self.watchlist, movie=b, note="concurrent")
+            return original(model, objs, scope)
+
+        with mock.patch.object(views, 'insert_new_rows', side_effect=concurrent_then_insert):
+            response = self.post('add_movies', {'movie_ids': [b.id, c.id]})
+        self.assertEqual(response.data['added'], 1)
+        self.assertEqual([item['status'] for item in response.data['results']], ['already_in_list', 'added'])
+        self.assertEqual(MovieInList.objects.get(list=self.watchlist, movie=b).note, "concurrent")
+
+    def test_add_movies_without_on_conflict_returning(self):
+        a, b, c, d = self.movies
+        # MySQL / MariaDB : bulk_create(ignore_conflicts) puis relecture des lignes de la liste
+        with mock.patch.object(services.connection, 'vendor', 'mysql'):
+            entries = [MovieInList(list=self.watchlist, movie=movie) for movie in (a, b)]
+            inserted = services.insert_new_rows(MovieInList, entries, {'list': self.watchlist})
+        self.assertEqual(inserted, {b.id})
+        self.assertEqual(connection.vendor, 'sqlite')
+
+    def test_remove_movies_in_one_statement(self):
+        a, b, c, d = self.movies
+        self.post('add_movies', {'movie_ids': [b.id, c.id]})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post('remove_movies', {'movie_ids': [a.id, b.id, d.id]})
+        self.assertEqual(response.data['removed'], 2)
+        self.assertEqual([item['status'] for item in response.data['results']],
+                         ['removed', 'removed', 'not_in_list'])
+        self.assertEqual(list(self.watchlist.movies.values_list('pk', flat=True)), [c.id])
+        self.assertEqual(sum(q['sql'].startswith('DELETE') for q in ctx.captured_queries), 1)
+
+    def test_invalid_payloads_and_other_users_lists(self):
+        self.assertEqual(self.post('add_movies', {}).status_code, 400)
+        self.assertEqual(self.post('add_movies', {'movie_ids': ['x']}).status_code, 400)
+        self.assertEqual(self.post('add_movies', {'movie_ids': list(range(1, 502))}).status_code, 400)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.post('add_movies', {'movie_ids': [self.movies[1].id]}).status_code, 404)
+
+
+class MovieInteractionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def in_system_list(self, name, movie):
+        return MovieInList.objects.filter(list__created_by=self.user, list__name=name, movie=movie).exists()
+
+    def test_set_and_unset_are_idempotent(self):
+        movie = self.movies[0]
+        url = f'/api/movies/{movie.id}/like/'
+        for _ in range(2):
+            response = self.client.put(url)
+            self.assertEqual(response.data['status'], 'liked')
+            self.assertEqual((response.data['movie']['is_liked'], response.data['movie']['like_count']), (True, 1))
+        self.assertEqual(Like.objects.filter(user=self.user, movie=movie).count(), 1)
+        self.assertTrue(self.in_system_list("Favoris", movie))
+        for _ in range(2):
+            response = self.client.delete(url)
+            self.assertEqual(response.data['status'], 'unliked')
+            self.assertEqual((response.data['movie']['is_liked'], response.data['movie']['like_count']), (False, 0))
+        self.assertFalse(self.in_system_list("Favoris", movie))
+
+    def test_post_still_toggles(self):
+        movie = self.movies[1]
+        url = f'/api/movies/{movie.id}/view/'
+        self.assertEqual(self.client.post(url).data['status'], 'viewed')
+        self.assertTrue(self.in_system_list("Déjà vu", movie))
+        self.assertEqual(self.client.post(url).data['status'], 'unviewed')
+        self.assertFalse(View.objects.filter(user=self.user, movie=movie).exists())
+        self.assertEqual(List.objects.filter(created_by=self.user, is_system=True).count(), 2)
+
+    def test_bulk_view_updates_counters_lists_and_cache(self):
+        a, b, c = self.movies
+        View.objects.create(user=self.user, movie=a)
+        self.client.get('/api/movies/')
+        response = self.client.post('/api/movies/bulk_view/', {'movie_ids': [a.id, b.id, c.id, b.id, 999999]},
+                                    format='json')
+        self.assertEqual(response.data['viewed'], 2)
+        self.assertEqual([item['status'] for item in response.data['results']],
+                         ['unchanged', 'added', 'added', 'duplicate', 'not_found'])
+        self.assertTrue(all(self.in_system_list("Déjà vu", movie) for movie in (b, c)))
+        results = self.client.get('/api/movies/').data['results']
+        self.assertTrue(all(movie['is_viewed'] and movie['view_count'] == 1 for movie in results))
+
+    def test_bulk_view_counts_only_rows_it_inserted(self):
+        a, b, c = self.movies
+        original = services.insert_interactions
+
+        def concurrent_then_insert(model, user, movie_ids):
+            # Une autre requête pose le vu sur `a` entre la lecture et l'INSERT
+            View.objects.create(user=user, movie=a)
+            return original(model, user, movie_ids)
+
+        with mock.patch.object(services, 'insert_interactions', side_effect=concurrent_then_insert):
+            response = self.client.post('/api/movies/bulk_view/', {'movie_ids': [a.id, b.id]}, format='json')
+        self.assertEqual(response.data['viewed'], 1)
+        self.assertEqual([item['status'] for item in response.data['results']], ['unchanged', 'added'])
+        self.assertEqual(View.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_like_without_on_conflict_returning(self):
+        a, b, c = self.movies
+        Like.objects.create(user=self.user, movie=a)
+        # MariaDB : pas d'ON CONFLICT, les insertions se déduisent des clés primaires nouvelles
+        with mock.patch.object(services.connection, 'vendor', 'mysql'):
+            inserted = services.insert_interactions(Like, self.user, [a.id, b.id, c.id])
+        self.assertEqual(inserted, {b.id, c.id})
+
+    def test_system_lists_are_created_once(self):
+        ensure_system_lists(self.user)
+        ensure_system_lists(self.user)
+        self.assertEqual(
+            sorted(List.objects.filter(created_by=self.user, is_system=True).values_list('name', flat=True)),
+            ["Déjà vu", "Favoris"]
+        )
+
+
+class ReviewReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'secret')
+        cls.reporters = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'secret') for i in range(3)]
+        cls.movie = Movie.objects.create(title="Film", description="", release_year=2000,
+                                         genre="Drama", poster_url="https://example.com/p.jpg")
+
+    def setUp(self):
+        cache.clear()
+        self.review = Review.objects.create(user=self.author, movie=self.movie, rating=1, comment="Spam")
+        self.client = APIClient()
+
+    def report(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/movies/{self.movie.id}/report_review/',
+                                {'review_id': self.review.id, 'reason': 'spam'})
+
+    def test_counter_is_incremented_in_database(self):
+        # Deux requêtes qui ont lu le commentaire avant le premier incrément
+        first, second = Review.objects.get(pk=self.review.pk), Review.objects.get(pk=self.review.pk)
+        report_review(self.reporters[0], first, 'spam')
+        report_review(self.reporters[1], second, 'spam')
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.report_count, self.review.is_reported), (2, True))
+
+    def test_duplicate_report_is_rejected_by_the_constraint(self):
+        self.assertEqual(self.report(self.reporters[0]).status_code, 201)
+        response = self.report(self.reporters[0])
+        self.assertEqual(response.status_code, 400)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.report_count, 1)
+        self.assertEqual(Report.objects.filter(review=self.review).count(), 1)
+
+    @override_settings(REVIEW_REPORT_DELETE_THRESHOLD=3)
+    def test_review_is_deleted_at_threshold(self):
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.review_count, 1)
+        for user in self.reporters[:2]:
+            self.assertEqual(self.report(user).status_code, 201)
+        response = self.report(self.reporters[2])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Review.objects.filter(pk=self.review.pk).exists())
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.review_count, 0)
+
+
+class ModerationQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'secret', is_staff=True)
+        cls.author = User.objects.create_user('author', 'author@example.com', 'secret')
+        cls.reporters = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'secret') for i in range(3)]
+        cls.movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.reviews = [
+            Review.objects.create(user=self.author, movie=movie, rating=1, comment="Spam") for movie in self.movies
+        ]
+        # 1 signalement sur le premier, 3 sur le deuxième, 1 plus récent sur le troisième
+        for review, reporters in zip(self.reviews, ([0], [0, 1, 2], [1])):
+            for i in reporters:
+                report_review(self.reporters[i], review, 'spam' if i else 'other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_queue_is_ordered_paginated_and_summarized(self):
+        response = self.client.get('/api/movies/all_reported_reviews/?page_size=2')
+        self.assertEqual(response.data['count'], 3)
+        first, second = response.data['results']
+        self.assertEqual((first['id'], first['report_count']), (self.reviews[1].id, 3))
+        self.assertEqual(first['reports'], {'other': 1, 'spam': 2})
+        self.assertEqual(first['movie']['title'], self.movies[1].title)
+        self.assertEqual(second['id'], self.reviews[2].id)  # ex aequo : signalé le plus récemment
+
+    def test_cursor_pages_keep_the_full_queue_order(self):
+        # Signalement antérieur à la colonne last_reported_at : NULL, placé comme en mode page
+        Review.objects.filter(pk=self.reviews[2].pk).update(last_reported_at=None)
+        offset = self.client.get('/api/movies/all_reported_reviews/?page_size=10').data['results']
+        ids, url = [], '/api/movies/all_reported_reviews/?pagination=cursor&page_size=1'
+        while url:
+            response = self.client.get(url)
+            ids += [review['id'] for review in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, [review['id'] for review in offset])
+
+    def test_queue_is_staff_only(self):
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get('/api/movies/all_reported_reviews/').status_code, 403)
+        response = self.client.post('/api/movies/moderate_reviews/',
+                                    {'review_ids': [self.reviews[0].id], 'action': 'delete'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_dismiss_and_delete(self):
+        a, b, c = self.reviews
+        response = self.client.post('/api/movies/moderate_reviews/',
+                                    {'review_ids': [a.id, 999999], 'action': 'dismiss'}, format='json')
+        self.assertEqual([item['status'] for item in response.data['results']], ['dismissed', 'not_found'])
+        a.refresh_from_db()
+        self.assertEqual((a.is_reported, a.report_count, a.last_reported_at, a.reports.count()), (False, 0, None, 0))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/movies/moderate_reviews/',
+                                        {'review_ids': [b.id, c.id], 'action': 'delete'}, format='json')
+        self.assertEqual([item['status'] for item in response.data['results']], ['deleted', 'deleted'])
+        self.assertFalse(Review.objects.filter(pk__in=[b.id, c.id]).exists())
+        # Un seul recalcul des compteurs pour tous les films touchés
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "movies_movie"') for q in ctx.captured_queries), 1)
+        self.assertEqual(list(Movie.objects.filter(pk__in=[b.movie_id, c.movie_id]).values_list('review_count', flat=True)),
+                         [0, 0])
+        self.assertEqual(self.client.get('/api/movies/all_reported_reviews/').data['count'], 0)
+
+
+class MovieStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        cls.movie = Movie.objects.create(title="Film", description="", release_year=2000,
+                                         genre="Drama", poster_url="https://example.com/p.jpg")
+
+    def test_one_review_per_user_and_movie(self):
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        url = f'/api/movies/{self.movie.id}/'
+        response = client.post(url + 'add_review/', {'rating': 2, 'comment': "Bof"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user']['username'], 'alice')
+        self.assertEqual(client.post(url + 'add_review/', {'rating': 5, 'comment': "Encore"}).status_code, 400)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Review.objects.create(user=self.alice, movie=self.movie, rating=1, comment="Doublon")
+        self.assertEqual(Review.objects.filter(user=self.alice, movie=self.movie).count(), 1)
+
+        cache.clear()
+        client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.put(url + 'update_review/', {'rating': 4, 'comment': "Finalement bien"})
+        # La ligne revient avec l'UPDATE : ni relecture de l'avis, ni de son auteur
+        self.assertFalse([q for q in ctx.captured_queries
+                          if q['sql'].startswith('SELECT') and 'FROM "movies_review"' in q['sql']])
+        self.assertEqual(response.data['user']['username'], 'alice')
+        self.assertEqual((response.data['rating'], response.data['comment']), (4, "Finalement bien"))
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.review_avg, 4)
+        self.assertEqual(client.get(url).data['review_avg'], 4)  # cache invalidé
+
+        client.force_authenticate(self.bob)
+        self.assertEqual(client.put(url + 'update_review/', {'rating': 4, 'comment': ""}).status_code, 400)
+        self.assertEqual(client.put(url + 'update_review/', {'rating': 4, 'comment': "Non"}).status_code, 404)
+
+    def test_update_review_without_update_returning(self):
+        Review.objects.create(user=self.alice, movie=self.movie, rating=2, comment="Bof")
+        # MariaDB : UPDATE puis une seule lecture de l'avis
+        with mock.patch.object(services.connection, 'vendor', 'mysql'):
+            review = services.update_review(self.alice, self.movie, 5, "Revu, excellent")
+            self.assertIsNone(services.update_review(self.bob, self.movie, 5, "Non"))
+        self.assertEqual((review.rating, review.comment, review.user), (5, "Revu, excellent", self.alice))
+
+    def test_signals_adjust_counters_without_recounting(self):
+        def stats():
+            return Movie.objects.values_list('review_avg', 'review_count', 'like_count', 'view_count').get(
+                pk=self.movie.pk)
+
+        with CaptureQueriesContext(connection) as ctx:
+            like = Like.objects.create(user=self.alice, movie=self.movie)
+            View.objects.create(user=self.alice, movie=self.movie)
+            review = Review.objects.create(user=self.alice, movie=self.movie, rating=2, comment="")
+            Review.objects.create(user=self.bob, movie=self.movie, rating=4, comment="")
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "movies_movie"')]
+        self.assertEqual(len(updates), 4)
+        # Ni COUNT() des likes / vues ni des avis : seule la moyenne est recalculée
+        self.assertFalse([sql for sql in updates if 'COUNT(' in sql])
+        self.assertEqual(stats(), (3, 2, 1, 1))
+
+        review.rating = 5
+        review.save()
+        self.assertEqual(stats(), (4.5, 2, 1, 1))
+        review.delete()
+        like.delete()
+        Like.objects.create(user=self.bob, movie=self.movie)
+        self.assertEqual(stats(), (4, 1, 1, 1))
+
+    def test_cascade_deletes_refresh_stats_once(self):
+        other = Movie.objects.create(title="Autre", description="", release_year=2000,
+                                     genre="Drama", poster_url="https://example.com/p.jpg")
+        for movie in (self.movie, other):
+            Review.objects.create(user=self.alice, movie=movie, rating=2, comment="")
+            Review.objects.create(user=self.bob, movie=movie, rating=4, comment="")
+            Like.objects.create(user=self.alice, movie=movie)
+            View.objects.create(user=self.alice, movie=movie)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.alice.delete()
+        refreshes = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "movies_movie" SET "review_avg"')]
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list('review_avg', 'review_count', 'like_count',
+                                                                         'view_count')), [(4, 1, 0, 0)] * 2)
+
+        # Film supprimé : rien à recompter
+        with CaptureQueriesContext(connection) as ctx:
+            other.delete()
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "movies_movie" SET "review_avg"')])
+
+    def test_stats_refresh_can_be_skipped_before_migration(self):
+        Review.objects.create(user=self.alice, movie=self.movie, rating=3, comment="")
+        with CaptureQueriesContext(connection) as ctx, batched_stats_refresh(refresh=False):
+            Review.objects.filter(movie=self.movie).only('pk', 'user_id', 'movie_id').delete()
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "movies_movie"')])
+        self.assertFalse([q for q in ctx.captured_queries if 'last_reported_at' in q['sql']])
+
+    def test_dedupe_command_keeps_clean_data(self):
+        Review.objects.create(user=self.alice, movie=self.movie, rating=3, comment="")
+        out = StringIO()
+        call_command('dedupe_reviews', stdout=out)
+        self.assertIn("0 avis en double", out.getvalue())
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_reviews_feed_is_compact_and_paginated(self):
+        users = [self.alice, self.bob] + [
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', 'secret') for i in range(28)
+        ]
+        for i, user in enumerate(users):
+            Review.objects.create(user=user, movie=self.movie, rating=1 + i % 5, comment=f"Avis {i}")
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(f'/api/movies/{self.movie.id}/reviews/?page_size=20')
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertEqual((response.data['count'], response.data['review_count']), (30, 30))
+        self.assertEqual(response.data['review_avg'], 3.0)
+        first = response.data['results'][0]
+        self.assertEqual(first['comment'], "Avis 29")
+        self.assertNotIn('movie', first)
+        self.assertEqual(set(first['user']), {'id', 'username'})
+        self.assertEqual(len(client.get(response.data['next']).data['results']), 10)
+
+    def test_stats_follow_reviews_likes_and_views(self):
+        review = Review.objects.create(user=self.alice, movie=self.movie, rating=2, comment="Bof")
+        Review.objects.create(user=self.bob, movie=self.movie, rating=5, comment="Top")
+        Like.objects.create(user=self.alice, movie=self.movie)
+        View.objects.create(user=self.bob, movie=self.movie)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.review_avg, self.movie.review_count), (3.5, 2))
+        self.assertEqual((self.movie.like_count, self.movie.view_count), (1, 1))
+
+        review.rating = 4
+        review.save()
+        Like.objects.filter(movie=self.movie).delete()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.review_avg, self.movie.like_count), (4.5, 0))
+
+        Review.objects.filter(movie=self.movie).delete()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.review_avg, self.movie.review_count), (0, 0))
+
+    def test_rebuild_command_fixes_bulk_writes(self):
+        Review.objects.bulk_create([Review(user=self.alice, movie=self.movie, rating=4, comment="")])
+        call_command('rebuild_movie_stats', stdout=StringIO())
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.review_avg, self.movie.review_count), (4, 1))
+
+
+class MovieSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        def movie(title, description="", genre="Drama"):
+            return Movie.objects.create(title=title, description=description, release_year=2000,
+                                        genre=genre, poster_url="https://example.com/p.jpg")
+        cls.star_wars = movie("Star Wars", "A galaxy far away", "Science Fiction")
+        cls.stardust = movie("Stardust", "A fallen star", "Fantasy")
+        cls.documentary = movie("Behind the scenes", "How Star Wars was made", "Documentary")
+        cls.other = movie("Amélie", "Paris", "Comedy")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        response = self.client.get('/api/movies/', {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [m['id'] for m in response.data['results']]
+
+    def test_prefix_matching_for_search_as_you_type(self):
+        self.assertEqual(set(self.search("sta")), {self.star_wars.id, self.stardust.id, self.documentary.id})
+        self.assertEqual(set(self.search("star wa")), {self.star_wars.id, self.documentary.id})
+        self.assertEqual(self.search("amelie"), [self.other.id])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("star wars")[0], self.star_wars.id)
+
+    def test_explicit_ordering_overrides_relevance(self):
+        self.assertEqual(self.search("star wars", ordering="title"), [self.documentary.id, self.star_wars.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.title = "Zodiac"
+        self.other.save()
+        self.assertEqual(self.search("zodiac"), [self.other.id])
+        self.other.delete()
+        self.assertEqual(self.search("zodiac"), [])
+
+    def test_query_syntax_is_neutralized(self):
+        self.assertEqual(self.search('"star" OR -(NEAR'), [])
+
+    def test_punctuation_only_finds_nothing(self):
+        self.assertEqual(self.search('"*-()'), [])
+
+    def test_index_created_after_the_connection_opened_is_seen(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {search.FTS_TABLE}")
+        connection.movies_fts = None
+        # Sans index : mots cherchés dans le titre et la description, en milieu de texte aussi
+        self.assertEqual(set(self.search("galaxy")), {self.star_wars.id})
+        self.assertEqual(set(self.search("wars")), {self.star_wars.id, self.documentary.id})
+        search.create_search_index()
+        search.rebuild_search_index()
+        connection.movies_fts = False  # Autre connexion, qui avait vu la base avant la création
+        self.assertEqual(self.search("star wars")[0], self.star_wars.id)
+
+
+class GenreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        def movie(title, genre):
+            return Movie.objects.create(title=title, description="", release_year=2000,
+                                        genre=genre, poster_url="https://example.com/p.jpg")
+        cls.action = movie("A", "Action")
+        cls.action_drama = movie("B", "Action, Drama")
+        cls.adventure = movie("C", "Action & Adventure, Drama")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_genres_are_synced_from_the_text_field(self):
+        self.assertEqual(sorted(self.action_drama.genres.values_list('name', flat=True)), ["Action", "Drama"])
+        self.action_drama.genre = "Comedy"
+        self.action_drama.save()
+        self.assertEqual(list(self.action_drama.genres.values_list('name', flat=True)), ["Comedy"])
+
+    def test_filter_requires_all_genres_without_false_positives(self):
+        response = self.client.get('/api/movies/?genres=Action')
+        self.assertEqual({m['id'] for m in response.data['results']}, {self.action.id, self.action_drama.id})
+        response = self.client.get('/api/movies/?genres=action&genres=Drama')
+        self.assertEqual([m['id'] for m in response.data['results']], [self.action_drama.id])
+        response = self.client.get('/api/movies/?genres=Action&genres=Unknown')
+        self.assertEqual(response.data['results'], [])
+
+    def test_facet_counts(self):
+        response = self.client.get('/api/movies/genre_facets/?genres=Drama')
+        self.assertEqual(response.data, [
+            {'name': 'Drama', 'count': 2},
+            {'name': 'Action', 'count': 1},
+            {'name': 'Action & Adventure', 'count': 1},
+        ])
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        Movie.objects.bulk_create([
+            Movie(title=f"Film {i:02d}", description="", release_year=2000 + i % 3, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            ids += [m['id'] for m in response.data['results']]
+            url = response.data['next']
+        return ids, pages
+
+    def test_cursor_pages_match_offset_ordering(self):
+        for ordering in ('-created_at', 'title', '-release_year'):
+            tiebreak = '-pk' if ordering.startswith('-') else 'pk'
+            expected = list(Movie.objects.order_by(ordering, tiebreak).values_list('pk', flat=True))
+            ids, pages = self.walk(f'/api/movies/?pagination=cursor&page_size=7&ordering={ordering}')
+            self.assertEqual(ids, expected, ordering)
+            self.assertEqual(len(pages), 5)
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/api/movies/?pagination=cursor&page_size=10').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_cursor_pagination_does_not_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/movies/?pagination=cursor')
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/movies/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_every_ordering_term_is_kept(self):
+        # Ex aequo sur les deux premiers termes : le troisième (title) doit être respecté
+        Movie.objects.update(created_at=Movie.objects.get(title="Film 00").created_at)
+        paginator = KeysetPagination()
+        request = APIView().initialize_request(APIRequestFactory().get('/', {'page_size': 5}))
+        queryset = Movie.objects.order_by('-release_year', 'created_at', 'title')
+        ids, page = [], paginator.paginate_queryset(queryset, request)
+        while page:
+            ids += [movie.pk for movie in page]
+            if not paginator.has_next:
+                break
+            request = APIView().initialize_request(APIRequestFactory().get(paginator.get_next_link()))
+            page = paginator.paginate_queryset(queryset, request)
+        self.assertEqual(ids, list(queryset.order_by('-release_year', 'created_at', 'title', 'pk').values_list('pk', flat=True)))
+
+    def test_ordering_the_cursor_cannot_express_is_rejected(self):
+        request = APIView().initialize_request(APIRequestFactory().get('/'))
+        with self.assertRaises(ValidationError):
+            KeysetPagination().paginate_queryset(Movie.objects.order_by('created_by__username'), request)
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    """Faux serveur TMDB : compte les appels et peut renvoyer des 503 avant de répondre."""
+    hits = []
+    failures_before_success = 0
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        StubTMDBHandler.hits.append(path)
+        if StubTMDBHandler.failures_before_success:
+            StubTMDBHandler.failures_before_success -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if path == '/genre/movie/list':
+            body = {'genres': [{'id': 1, 'name': 'Action'}, {'id': 2, 'name': 'Drama'}]}
+        elif path == '/discover/movie':
+            page = int(parse_qs(urlparse(self.path).query).get('page', ['1'])[0])
+            body = {'results': [
+                {'id': page * 100 + i, 'title': f"Film {page * 100 + i}", 'genre_ids': [1, 2],
+                 'overview': "Un film", 'release_date': "2020-05-01", 'poster_path': f"/{i}.jpg"}
+                for i in range(20)
+            ]}
+        else:
+            body = {'id': int(path.rsplit('/', 1)[-1]), 'title': "Film"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubTMDBServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubTMDBHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(TMDB_BASE_URL=f"http://127.0.0.1:{cls.server.server_port}")
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        StubTMDBHandler.hits = []
+        StubTMDBHandler.failures_before_success = 0
+        tmdb.get_client().session.adapters['http://'].max_retries.backoff_factor = 0
+
+
+
+class TMDBClientTests(StubTMDBServerMixin, TestCase):
+    def test_genre_map_is_fetched_once_per_page(self):
+        movies = tmdb.discover_movies(page=1)
+        self.assertEqual(len(movies), 20)
+        self.assertEqual(movies[0]['genre_names'], ['Action', 'Drama'])
+        self.assertEqual(StubTMDBHandler.hits, ['/discover/movie', '/genre/movie/list'])
+
+    def test_pages_and_details_are_served_from_cache(self):
+        tmdb.discover_movies(page=1)
+        tmdb.discover_movies(page=1)
+        tmdb.discover_movies(page=2)
+        tmdb.get_movie_details(42)
+        self.assertEqual(tmdb.get_movie_details(42)['id'], 42)
+        self.assertEqual(StubTMDBHandler.hits, [
+            '/discover/movie', '/genre/movie/list', '/discover/movie', '/movie/42'
+        ])
+
+    def test_retries_on_server_errors(self):
+        StubTMDBHandler.failures_before_success = 2
+        self.assertEqual(tmdb.get_movie_details(7)['id'], 7)
+        self.assertEqual(StubTMDBHandler.hits, ['/movie/7'] * 3)
+
+
+class ImportTMDBMoviesTests(StubTMDBServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def run_import(self, *args):
+        call_command('import_tmdb_movies', '--checkpoint', self.checkpoint, '--rate', '0', *args, stdout=StringIO())
+
+    def test_import_is_an_idempotent_upsert_on_tmdb_id(self):
+        legacy = Movie.objects.create(title="Film 105", description="", release_year=0, genre="",
+                                      poster_url="https://example.com/p.jpg")
+        self.run_import('--pages', '3', '--batch-size', '25')
+        self.run_import('--pages', '3')
+        self.assertEqual(Movie.objects.count(), 60)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.tmdb_id, legacy.release_year), (105, 2020))
+        self.assertEqual(sorted(legacy.genres.values_list('name', flat=True)), ["Action", "Drama"])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_skips_pages_already_imported(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'filters': {}, 'pages': [1, 2]}, f)
+        self.run_import('--pages', '3', '--resume')
+        self.assertEqual(StubTMDBHandler.hits.count('/discover/movie'), 1)
+        self.assertEqual(sorted(Movie.objects.values_list('tmdb_id', flat=True))[0], 300)
+
+    def test_failed_pages_are_kept_for_resume(self):
+        StubTMDBHandler.failures_before_success = 100
+        with self.assertRaises(CommandError):
+            self.run_import('--pages', '2')
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['pages'], [])
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        cls.movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, headers=headers)
+        return response, len(ctx.captured_queries)
+
+    def test_second_read_is_served_without_sql(self):
+        self.get('/api/movies/')
+        response, queries = self.get('/api/movies/')
+        self.assertEqual(queries, 0)
+        self.assertEqual(response.data['count'], 5)
+        self.get(f'/api/movies/{self.movies[0].id}/')
+        self.assertEqual(self.get(f'/api/movies/{self.movies[0].id}/')[1], 0)
+
+    def test_shared_data_is_cached_apart_from_user_flags(self):
+        Like.objects.create(user=self.bob, movie=self.movies[0])
+        self.get('/api/movies/')
+        self.client.force_authenticate(self.bob)
+        response, queries = self.get('/api/movies/')
+        self.assertEqual(queries, 1)  # uniquement les flags de bob
+        liked = {m['id'] for m in response.data['results'] if m['is_liked']}
+        self.assertEqual(liked, {self.movies[0].id})
+
+    def test_writes_invalidate_entries(self):
+        movie = self.movies[1]
+        self.get('/api/movies/')
+        Like.objects.create(user=self.alice, movie=movie)
+        Review.objects.create(user=self.alice, movie=movie, rating=4, comment="")
+        response, _ = self.get('/api/movies/?ordering=-review_avg')
+        first = response.data['results'][0]
+        self.assertEqual((first['id'], first['is_liked'], first['like_count'], first['review_avg']),
+                         (movie.id, True, 1, 4.0))
+        movie.delete()
+        self.assertEqual(self.get('/api/movies/')[0].data['count'], 4)
+        self.assertEqual(self.get(f'/api/movies/{movie.id}/')[0].status_code, 404)
+
+    def test_conditional_requests(self):
+        response, _ = self.get('/api/movies/')
+        self.assertIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/movies/', **{'If-None-Match': etag})[0].status_code, 304)
+        Like.objects.create(user=self.alice, movie=self.movies[0])
+        self.assertEqual(self.get('/api/movies/', **{'If-None-Match': etag})[0].status_code, 200)
+
+
+class MovieExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.movies = Movie.objects.bulk_create([
+            Movie(title=f"Film {i}", description="", release_year=2000 + i, genre="Drama",
+                  poster_url="https://example.com/p.jpg")
+            for i in range(5)
+        ])
+        Like.objects.create(user=cls.user, movie=cls.movies[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read_ndjson(self, response):
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_export_streams_the_filtered_catalog_in_chunks(self):
+        with mock.patch('movies.views.EXPORT_CHUNK_SIZE', 2):
+            response = self.client.get('/api/movies/?export=ndjson&ordering=release_year')
+            with CaptureQueriesContext(connection) as ctx:
+                rows = self.read_ndjson(response)
+        self.assertEqual([row['id'] for row in rows], [movie.id for movie in self.movies])
+        self.assertEqual([row['is_liked'] for row in rows], [True, False, False, False, False])
+        # Une lecture par paquet de films, pas une par film
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+        response = self.client.get('/api/movies/?export=ndjson&release_year=2001')
+        self.assertEqual([row['id'] for row in self.read_ndjson(response)], [self.movies[1].id])
+
+    def test_legacy_movie_list_is_paginated_unless_exported(self):
+        factory = APIRequestFactory()
+        request = factory.get('/movies/', {'page_size': 2})
+        force_authenticate(request, self.user)
+        response = views.movie_list(request)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        request = factory.get('/movies/', {'export': 'ndjson'})
+        force_authenticate(request, self.user)
+        self.assertEqual(len(self.read_ndjson(views.movie_list(request))), 5)
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'secret') for i in range(4)]
+        cls.movies = {
+            title: Movie.objects.create(title=title, description="", release_year=2000, genre=genre,
+                                        poster_url="https://example.com/p.jpg")
+            for title, genre in [('A', 'Drama'), ('B', 'Drama'), ('C', 'Comedy'), ('D', 'Horror')]
+        }
+        # A et B sont aimés par les mêmes personnes, C par une seule d'entre elles
+        for user in cls.users[:3]:
+            Like.objects.create(user=user, movie=cls.movies['A'])
+            Like.objects.create(user=user, movie=cls.movies['B'])
+        Like.objects.create(user=cls.users[0], movie=cls.movies['C'])
+        Review.objects.create(user=cls.users[3], movie=cls.movies['D'], rating=5, comment="Génial")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.fan = User.objects.create_user('fan', 'fan@example.com', 'secret')
+        self.client.force_authenticate(self.fan)
+
+    def neighbors(self, title):
+        return list(MovieNeighbor.objects.filter(movie=self.movies[title]).values_list('neighbor__title', flat=True))
+
+    def test_build_ranks_co_liked_movies_first(self):
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertEqual(self.neighbors('A')[:2], ['B', 'C'])
+        # D n'a ni interaction ni genre en commun avec A
+        self.assertNotIn('D', self.neighbors('A'))
+        self.assertNotIn('A', self.neighbors('A'))
+
+    def test_recommended_uses_the_neighbor_table(self):
+        call_command('build_recommendations', stdout=StringIO())
+        Like.objects.create(user=self.fan, movie=self.movies['A'])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/movies/recommended/')
+        self.assertEqual(response.data['source'], 'neighbors')
+        titles = [movie['title'] for movie in response.data['results']]
+        self.assertEqual(titles[0], 'B')
+        self.assertNotIn('A', titles)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_new_account_gets_popular_movies(self):
+        response = self.client.get('/api/movies/recommended/?limit=2')
+        self.assertEqual(response.data['source'], 'popular')
+        titles = [movie['title'] for movie in response.data['results']]
+        self.assertEqual(len(titles), 2)
+        self.assertEqual(titles[0], 'D')
+
+    def test_incremental_build_only_recomputes_touched_movies(self):
+        call_command('build_recommendations', stdout=StringIO())
+        computed_at = dict(MovieNeighbor.objects.values_list('movie_id', 'computed_at'))
+        out = StringIO()
+        call_command('build_recommendations', stdout=out)
+        self.assertIn("Aucun film à recalculer.", out.getvalue())
+
+        Like.objects.create(user=self.users[3], movie=self.movies['C'])
+        out = StringIO()
+        call_command('build_recommendations', stdout=out)
+        self.assertIn("incrémental", out.getvalue())
+        recomputed = {
+            movie_id for movie_id, at in MovieNeighbor.objects.values_list('movie_id', 'computed_at')
+            if at != computed_at.get(movie_id)
+        }
+        # C, et D qui fait partie de l'historique du même utilisateur
+        self.assertTrue({self.movies['C'].pk, self.movies['D'].pk} <= recomputed)
+        self.assertIn('C', self.neighbors('D'))
+
+    def test_workers_rebuild_recommendations_periodically(self):
+        interval = settings.PERIODIC_TASKS['movies.build_recommendations']
+        now = timezone.now()
+        queue._scheduled.clear()
+        enqueue_periodic(now)
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            run_pending()
+        self.assertIn('B', self.neighbors('A'))
+
+        # Période suivante : calcul incrémental (payload vide, sans --full)
+        Like.objects.create(user=self.users[3], movie=self.movies['C'])
+        enqueue_periodic(now + timedelta(seconds=interval))
+        with mock.patch('sys.stdout', new_callable=StringIO) as out:
+            run_pending()
+        self.assertIn("calcul incrémental", out.getvalue())
+        self.assertIn('C', self.neighbors('D'))
+        self.assertEqual(
+            list(Task.objects.filter(name='movies.build_recommendations').values_list('status', 'payload')),
+            [(Task.DONE, {})] * 2
+        )
+
+
+class ConcurrentWriteBenchTests(SimpleTestCase):
+    def test_production_profile_serializes_writers(self):
+        # Processus séparé : le benchmark ouvre ses propres connexions depuis plusieurs threads
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'bench_concurrent_writes', '--threads', '4', '--ops', '20',
+             '--profile', 'production'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        row = result.stdout.splitlines()[-1].split()
+        self.assertEqual(row[0], 'production')
+        # Colonne « échecs » : aucun « database is locked »
+        self.assertEqual(row[2], '0')
@@ -1,35 +1,123 @@
 # movies/tmdb.py
+import logging
+
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.themoviedb.org/3"
 
-headers = {
-    "accept": "application/json",
-    "Authorization": f"Bearer {settings.TMDB_API_TOKEN}"
-}
 
-def get_genre_names(genre_ids):
-    url = f"{BASE_URL}/genre/movie/list"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        genres = {genre['id']: genre['name'] for genre in response.json()['genres']}
+class TMDBClient:
+    """
+    Client TMDB partagé :
+    - une seule session HTTP (pool de connexions keep-alive),
+    - timeout sur chaque appel et retries avec backoff sur 429 / 5xx,
+    - cache (framework de cache Django) de la liste des genres, des pages
+      discover et des fiches films, avec une durée de vie.
+    L'URL de base est configurable (settings.TMDB_BASE_URL) pour pointer les
+    tests vers un serveur local.
+    """
+
+    GENRES_TTL = 24 * 60 * 60
+    DISCOVER_TTL = 10 * 60
+    DETAILS_TTL = 60 * 60
+
+    def __init__(self, base_url=BASE_URL, token=None, timeout=5, retries=3, backoff_factor=0.5, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "accept": "application/json",
+            "Authorization": f"Bearer {token}",
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path, params=None):
+        """GET sur l'API ; retourne le JSON décodé, ou None en cas d'erreur."""
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"TMDB {path} injoignable : {e}")
+            return None
+        if response.status_code != 200:
+            logger.warning(f"TMDB {path} a répondu {response.status_code}")
+            return None
+        return response.json()
+
+    def cached(self, key, timeout, fetch, use_cache=True):
+        # Les échecs (None) ne sont pas mis en cache : on réessaiera au prochain appel
+        value = cache.get(key) if use_cache else None
+        if value is None:
+            value = fetch()
+            if value is not None:
+                cache.set(key, value, timeout)
+        return value
+
+    def genre_map(self):
+        def fetch():
+            data = self.get("/genre/movie/list")
+            return {genre['id']: genre['name'] for genre in data['genres']} if data else None
+        return self.cached("tmdb:genres", self.GENRES_TTL, fetch)
+
+    def genre_names(self, genre_ids):
+        genres = self.genre_map()
+        if genres is None:
+            return ["Unknown"]
         return [genres.get(genre_id, "Unknown") for genre_id in genre_ids]
-    return ["Unknown"]
+
+    def discover_movies(self, page=1, use_cache=True, **filters):
+        def fetch():
+            data = self.get("/discover/movie", params={'page': page, **filters})
+            if data is None:
+                return None
+            genres = self.genre_map() or {}
+            movies = data['results']
+            for movie in movies:
+                movie['genre_names'] = [genres.get(genre_id, "Unknown") for genre_id in movie.get('genre_ids', [])]
+            return movies
+        key = "tmdb:discover:" + "&".join(f"{k}={v}" for k, v in sorted({'page': page, **filters}.items()))
+        return self.cached(key, self.DISCOVER_TTL, fetch, use_cache=use_cache) or []
+
+    def movie_details(self, movie_id):
+        return self.cached(f"tmdb:movie:{movie_id}", self.DETAILS_TTL, lambda: self.get(f"/movie/{movie_id}"))
+
+
+_client = None
+
+
+def get_client():
+    """Client partagé du processus, recréé si la configuration change (tests)."""
+    global _client
+    base_url = getattr(settings, 'TMDB_BASE_URL', BASE_URL)
+    token = settings.TMDB_API_TOKEN
+    if _client is None or (_client.base_url, _client.token) != (base_url.rstrip('/'), token):
+        _client = TMDBClient(base_url=base_url, token=token)
+    return _client
+
+
+def get_genre_names(genre_ids):
+    return get_client().genre_names(genre_ids)
+
 
 def discover_movies(page=1):
-    url = f"{BASE_URL}/discover/movie?page={page}"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        movies = response.json()['results']
-        for movie in movies:
-            movie['genre_names'] = get_genre_names(movie.get('genre_ids', []))
-        return movies
-    return []
+    return get_client().discover_movies(page=page)
+
 
 def get_movie_details(movie_id):
-    url = f"{BASE_URL}/movie/{movie_id}"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    return None
+    return get_client().movie_details(movie_id)
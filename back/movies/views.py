@@ -1,37 +1,118 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .tmdb import discover_movies, get_movie_details
+from .search import search_movies
+from .recommendations import recommend_for_user, popular_movie_ids
+from .services import (
+    set_interaction, unset_interaction, toggle_interaction, bulk_set_interaction,
+    create_review, update_review, AlreadyReviewed, report_review, AlreadyReported, moderate_reviews,
+    insert_new_rows,
+)
+from .pagination import MoviePagination, KeysetPagination, CursorPaginationMixin, use_cursor_pagination
+from .cache import (
+    ENTRY_TIMEOUT, catalog_generation, page_key, get_movies_data, store_movies_data,
+    get_user_flags, with_user_flags, conditional_response, apply_cache_headers
+)
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
 from rest_framework import status
-from .models import Movie, Review, List, MovieInList, Like, View, Report
+from .models import Movie, Genre, Review, List, MovieInList, Like, View, Report
 from .serializers import (
     MovieSerializer, ReviewSerializer, ListSerializer, ListDetailSerializer,
-    MovieInListSerializer, LikeSerializer, ViewSerializer, ReportSerializer
+    MovieInListSerializer, LikeSerializer, ViewSerializer, ReportSerializer, BulkListMoviesSerializer,
+    MovieReviewSerializer, ModerationReviewSerializer, ModerateReviewsSerializer, get_flags_resolver
 )
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+import json
 import logging
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db import models, IntegrityError
+import operator
+from functools import reduce
+from rest_framework.filters import OrderingFilter
+from django.db import models, transaction, IntegrityError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Q
 from rest_framework import serializers
 
 logger = logging.getLogger(__name__)
 
-# Add custom pagination class
-class MoviePagination(PageNumberPagination):
-    page_size = 24  # 4 rows with 6 movies per row
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def shared_movies_data(movies):
+    # Représentation commune à tous les utilisateurs : les flags sont ajoutés ensuite
+    data = MovieSerializer(movies, many=True, context={'request': None}).data
+    return {movie['id']: dict(movie) for movie in data}
+
+
+def load_shared_movies(movie_ids):
+    return shared_movies_data(Movie.objects.filter(pk__in=movie_ids).select_related('created_by'))
+
+
+def cached_response(request, data, last_modified=None):
+    not_modified, headers = conditional_response(request, data, last_modified)
+    return apply_cache_headers(not_modified or Response(data), headers)
+
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def wants_export(request):
+    return request.query_params.get('export') == 'ndjson'
+
+
+def stream_movies_ndjson(queryset, user):
+    """
+    Export du catalogue en NDJSON (un film JSON par ligne), produit au fil de l'eau :
+    les films sont lus par paquets avec .iterator() et sérialisés paquet par paquet,
+    la mémoire utilisée ne dépend donc pas de la taille du catalogue.
+    """
+    liked, viewed, _ = get_user_flags(user)
+
+    def serialize(chunk):
+        for movie in shared_movies_data(chunk).values():
+            yield json.dumps(with_user_flags(movie, liked, viewed), cls=DjangoJSONEncoder) + '\n'
+
+    def rows():
+        chunk = []
+        for movie in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            chunk.append(movie)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                yield from serialize(chunk)
+                chunk = []
+        yield from serialize(chunk)
+
+    response = StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="movies.ndjson"'
+    return response
+
 
 @api_view(['GET', 'POST'])
 def movie_list(request):
     if request.method == 'GET':
-        movies = Movie.objects.all()
-        serializer = MovieSerializer(movies, many=True)
-        return Response(serializer.data)
+        queryset = Movie.objects.select_related('created_by').order_by('-created_at', '-pk')
+        if wants_export(request):
+            return stream_movies_ndjson(queryset, request.user)
+
+        # Paginé par défaut (page / page_size, ou curseur sur demande)
+        generation = catalog_generation()
+        key = page_key(generation, request.build_absolute_uri())
+        page = cache.get(key)
+        if page is None:
+            paginator = KeysetPagination() if use_cursor_pagination(request) else MoviePagination()
+            movies = paginator.paginate_queryset(queryset, request)
+            shared = shared_movies_data(movies)
+            store_movies_data(shared)
+            page = {**paginator.get_paginated_response([]).data, 'ids': list(shared)}
+            cache.set(key, page, ENTRY_TIMEOUT)
+
+        movies_data, movies_at = get_movies_data(page['ids'], load_shared_movies)
+        liked, viewed, flags_at = get_user_flags(request.user)
+        data = {name: value for name, value in page.items() if name != 'ids'}
+        data['results'] = [
+            with_user_flags(movies_data[movie_id], liked, viewed)
+            for movie_id in page['ids'] if movie_id in movies_data
+        ]
+        return cached_response(request, data, max(generation, movies_at, flags_at))
 
     if request.method == 'POST':
         serializer = MovieSerializer(data=request.data)
@@ -44,7 +125,7 @@ def movie_list(request):
 @api_view(['GET'])
 def tmdb_popular_movies(request):
     movies = discover_movies(page=1)
-    return Response(movies)
+    return cached_response(request, movies)
 
 @api_view(['GET'])
 def movie_details(request, movie_id):
@@ -53,25 +134,52 @@ def movie_details(request, movie_id):
         return Response(movie)
     return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
 
-class MovieViewSet(viewsets.ModelViewSet):
+def movies_with_all_genres(names):
+    """
+    Sous-requête des ids de films ayant TOUS les genres demandés : intersection
+    sur la table de jointure indexée (GROUP BY movie HAVING COUNT = nb de genres).
+    Un genre inconnu ne peut jamais être compté, le résultat est alors vide.
+    """
+    names = {name.strip().lower() for name in names if name.strip()}
+    genres = Genre.objects.filter(reduce(operator.or_, (Q(name__iexact=name) for name in names)))
+    return (
+        Movie.genres.through.objects.filter(genre__in=genres)
+        .values('movie_id')
+        .annotate(matched=models.Count('genre_id'))
+        .filter(matched=len(names))
+        .values('movie_id')
+    )
+
+def moderation_queue():
+    """
+    File de modération : les plus signalés d'abord, puis le signalement le plus
+    récent. Ordre servi tel quel par l'index partiel review_moderation_queue_idx.
+    """
+    return (
+        Review.objects.filter(is_reported=True)
+        .select_related('user', 'movie')
+        .order_by('-report_count', '-last_reported_at', '-pk')
+    )
+
+class MovieViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = MoviePagination
-    filter_backends = [SearchFilter, OrderingFilter]
-    search_fields = ['title', 'description']
+    filter_backends = [OrderingFilter]
     ordering_fields = ['title', 'release_year', 'created_at', 'review_avg']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        queryset = Movie.objects.annotate(
-            review_avg=models.Avg('reviews__rating')
-        ).all()
+        # review_avg est une colonne dénormalisée (movies/signals.py) : filtre et tri indexés
+        queryset = Movie.objects.select_related('created_by')
         
-        # Searchbar query
+        # Searchbar query : index plein texte, trié par pertinence sauf tri explicite
         search_query = self.request.query_params.get('search', None)
         if search_query:
-            queryset = queryset.filter(title__istartswith=search_query)
+            queryset, ranked = search_movies(queryset, search_query)
+            if ranked:
+                self.ordering = ['search_rank', '-created_at']
             
         # Release year filter
         release_year = self.request.query_params.get('release_year', None)
@@ -84,11 +192,9 @@ class MovieViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(review_avg__gte=float(min_rating))
             
         # Genre filter - require ALL selected genres to be present
-        genres = self.request.query_params.getlist('genres', [])
+        genres = [genre for genre in self.request.query_params.getlist('genres', []) if genre.strip()]
         if genres:
-            # Create a Q object that requires ALL genres to be present
-            for genre in genres:
-                queryset = queryset.filter(genre__icontains=genre)
+            queryset = queryset.filter(pk__in=movies_with_all_genres(genres))
             
         return queryset
 
@@ -100,47 +206,125 @@ class MovieViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        if wants_export(request):
+            # Tout le catalogue filtré (mêmes paramètres que la liste), en flux
+            return stream_movies_ndjson(self.filter_queryset(self.get_queryset()), request.user)
+
+        # Partie partagée en cache (ids de la page + films), puis surcouche de l'utilisateur
+        generation = catalog_generation()
+        key = page_key(generation, request.build_absolute_uri())
+        page = cache.get(key)
+        if page is None:
+            movies = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            shared = shared_movies_data(movies)
+            store_movies_data(shared)
+            page = {**self.get_paginated_response([]).data, 'ids': list(shared)}
+            cache.set(key, page, ENTRY_TIMEOUT)
+
+        movies_data, movies_at = get_movies_data(page['ids'], load_shared_movies)
+        liked, viewed, flags_at = get_user_flags(request.user)
+        data = {name: value for name, value in page.items() if name != 'ids'}
+        data['results'] = [
+            with_user_flags(movies_data[movie_id], liked, viewed)
+            for movie_id in page['ids'] if movie_id in movies_data
+        ]
+        return cached_response(request, data, max(generation, movies_at, flags_at))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            movie_id = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        movies_data, movies_at = get_movies_data([movie_id], load_shared_movies)
+        if movie_id not in movies_data:
+            raise Http404
+        liked, viewed, flags_at = get_user_flags(request.user)
+        data = with_user_flags(movies_data[movie_id], liked, viewed)
+        return cached_response(request, data, max(movies_at, flags_at))
+
+    @action(detail=False, methods=['get'])
+    def genre_facets(self, request):
+        # Nombre de films par genre parmi les résultats filtrés (mêmes paramètres que la liste)
+        movie_ids = self.filter_queryset(self.get_queryset()).order_by().values('pk')
+        facets = (
+            Movie.genres.through.objects.filter(movie_id__in=movie_ids)
+            .values('genre__name')
+            .annotate(count=models.Count('movie_id'))
+            .order_by('-count', 'genre__name')
+        )
+        return Response([{'name': f['genre__name'], 'count': f['count']} for f in facets])
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """
+        Films recommandés à l'utilisateur (?limit=, 20 par défaut, 100 au plus), lus
+        dans la table de voisins précalculée (manage.py build_recommendations).
+        Sans aucune interaction, on retombe sur les films les mieux notés.
+        """
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            limit = 20
+        scored = recommend_for_user(request.user, limit)
+        source = 'neighbors'
+        if not scored:
+            source = 'popular'
+            scored = [(movie_id, None) for movie_id in popular_movie_ids(request.user, limit)]
+
+        movies_data, _ = get_movies_data([movie_id for movie_id, _ in scored], load_shared_movies)
+        liked, viewed, _ = get_user_flags(request.user)
+        results = [
+            {**with_user_flags(movies_data[movie_id], liked, viewed), 'recommendation_score': score}
+            for movie_id, score in scored if movie_id in movies_data
+        ]
+        return Response({'source': source, 'results': results})
+
     @action(detail=True, methods=['get'])
     def reviews(self, request, pk=None):
+        # Fil paginé, les plus récents d'abord (index (movie, created_at)) ;
+        # la note moyenne et le nombre d'avis viennent des colonnes du film
         movie = self.get_object()
-        reviews = Review.objects.filter(movie=movie)
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.filter(movie=movie).select_related('user').order_by('-created_at', '-pk')
+        page = self.paginate_queryset(reviews)
+        response = self.get_paginated_response(MovieReviewSerializer(page, many=True).data)
+        response.data['review_avg'] = movie.review_avg
+        response.data['review_count'] = movie.review_count
+        return response
 
     @action(detail=True, methods=['post'])
     def add_review(self, request, pk=None):
         movie = self.get_object()
         serializer = ReviewSerializer(data=request.data, context={'request': request})
-        
-        if serializer.is_valid():
-            # Vérifier si l'utilisateur a déjà commenté ce film
-            existing_review = Review.objects.filter(user=request.user, movie=movie).first()
-            if existing_review:
-                return Response(
-                    {'error': 'Vous avez déjà commenté ce film'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            serializer.save(user=request.user, movie=movie)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            review = create_review(request.user, movie, serializer.validated_data['rating'],
+                                   serializer.validated_data['comment'])
+        except AlreadyReviewed:
+            return Response(
+                {'error': 'Vous avez déjà commenté ce film'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Même représentation que le fil des avis du film
+        return Response(MovieReviewSerializer(review).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['put'])
     def update_review(self, request, pk=None):
         movie = self.get_object()
-        try:
-            review = Review.objects.get(user=request.user, movie=movie)
-            serializer = ReviewSerializer(review, data=request.data, context={'request': request})
-            
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data)
+        serializer = ReviewSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        except Review.DoesNotExist:
+
+        review = update_review(request.user, movie, serializer.validated_data['rating'],
+                               serializer.validated_data['comment'])
+        if review is None:
             return Response(
                 {'error': 'Commentaire non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(MovieReviewSerializer(review).data)
 
     @action(detail=True, methods=['delete'])
     def delete_review(self, request, pk=None):
@@ -167,99 +351,51 @@ class MovieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    @action(detail=True, methods=['post'])
-    def like(self, request, pk=None):
+    def interaction_response(self, request, kind):
+        """
+        like / view : POST bascule (ancien comportement), PUT pose, DELETE retire.
+        Chaque opération est atomique (voir movies/services.py).
+        """
         movie = self.get_object()
-        like, created = Like.objects.get_or_create(user=request.user, movie=movie)
-        
-        if created:
-            # Créer ou récupérer la liste "Favoris"
-            favorites_list, _ = List.objects.get_or_create(
-                name="Favoris",
-                created_by=request.user,
-                is_system=True,
-                defaults={'description': 'Films que vous avez aimés'}
-            )
-            # Ajouter le film à la liste des favoris
-            MovieInList.objects.get_or_create(
-                movie=movie,
-                list=favorites_list,
-                defaults={'note': 'Ajouté aux favoris automatiquement'}
-            )
-            logger.info(f"User {request.user.username} liked movie {movie.id}")
-            serializer = MovieSerializer(movie, context={'request': request})
-            return Response({
-                'status': 'liked',
-                'movie': serializer.data
-            })
+        if request.method == 'PUT':
+            set_interaction(request.user, movie, kind)
+            active = True
+        elif request.method == 'DELETE':
+            unset_interaction(request.user, movie, kind)
+            active = False
         else:
-            # Si on unlike, on retire aussi de la liste des favoris
-            like.delete()
-            try:
-                favorites_list = List.objects.get(
-                    name="Favoris",
-                    created_by=request.user,
-                    is_system=True
-                )
-                MovieInList.objects.filter(
-                    movie=movie,
-                    list=favorites_list
-                ).delete()
-            except List.DoesNotExist:
-                pass
-            logger.info(f"User {request.user.username} unliked movie {movie.id}")
-            serializer = MovieSerializer(movie, context={'request': request})
-            return Response({
-                'status': 'unliked',
-                'movie': serializer.data
-            })
+            active = toggle_interaction(request.user, movie, kind)
+        logger.info(f"User {request.user.username} {'set' if active else 'unset'} {kind} on movie {movie.id}")
+
+        # Compteurs mis à jour en base par les signaux ; l'état de l'utilisateur est déjà connu
+        movie.refresh_from_db(fields=['review_avg', 'review_count', 'like_count', 'view_count'])
+        context = self.get_serializer_context()
+        get_flags_resolver(context).set(movie.pk, **{'liked' if kind == 'like' else 'viewed': active})
+        labels = {'like': ('liked', 'unliked'), 'view': ('viewed', 'unviewed')}[kind]
+        return Response({
+            'status': labels[0] if active else labels[1],
+            'movie': MovieSerializer(movie, context=context).data
+        })
+
+    @action(detail=True, methods=['post', 'put', 'delete'])
+    def like(self, request, pk=None):
+        return self.interaction_response(request, 'like')
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post', 'put', 'delete'])
     def view(self, request, pk=None):
-        movie = self.get_object()
-        view, created = View.objects.get_or_create(user=request.user, movie=movie)
-        
-        if created:
-            # Créer ou récupérer la liste "Déjà vu"
-            watched_list, _ = List.objects.get_or_create(
-                name="Déjà vu",
-                created_by=request.user,
-                is_system=True,
-                defaults={'description': 'Films que vous avez vus'}
-            )
-            # Ajouter le film à la liste "Déjà vu"
-            MovieInList.objects.get_or_create(
-                movie=movie,
-                list=watched_list,
-                defaults={'note': 'Marqué comme vu automatiquement'}
-            )
-            logger.info(f"User {request.user.username} viewed movie {movie.id}")
-            serializer = MovieSerializer(movie, context={'request': request})
-            return Response({
-                'status': 'viewed',
-                'movie': serializer.data
-            })
-        else:
-            # Si on unview, on retire aussi de la liste "Déjà vu"
-            view.delete()
-            try:
-                watched_list = List.objects.get(
-                    name="Déjà vu",
-                    created_by=request.user,
-                    is_system=True
-                )
-                MovieInList.objects.filter(
-                    movie=movie,
-                    list=watched_list
-                ).delete()
-            except List.DoesNotExist:
-                pass
-            logger.info(f"User {request.user.username} unviewed movie {movie.id}")
-            serializer = MovieSerializer(movie, context={'request': request})
-            return Response({
-                'status': 'unviewed',
-                'movie': serializer.data
-            })
+        return self.interaction_response(request, 'view')
+
+    @action(detail=False, methods=['post'])
+    def bulk_view(self, request):
+        """Marque plusieurs films comme vus : {"movie_ids": [...]} ; résultat film par film."""
+        serializer = BulkListMoviesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        movie_ids = [item['movie_id'] for item in serializer.validated_data['items']]
+        results = bulk_set_interaction(request.user, movie_ids, 'view')
+        return Response({
+            'viewed': sum(item['status'] == 'added' for item in results),
+            'results': results
+        })
 
     @action(detail=True, methods=['post'])
     def report_review(self, request, pk=None):
@@ -275,39 +411,28 @@ class MovieViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            review = Review.objects.get(id=review_id, movie=movie)
-            # Vérifier si l'utilisateur a déjà signalé ce commentaire
-            if Report.objects.filter(user=request.user, review=review).exists():
-                return Response(
-                    {'error': 'Vous avez déjà signalé ce commentaire'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            # Créer le signalement
-            report = Report.objects.create(
-                user=request.user,
-                review=review,
-                reason=reason,
-                description=description
-            )
-            # Mettre à jour le statut du commentaire et le compteur de signalements
-            review.is_reported = True
-            review.report_count += 1
-            review.save()
-            # Si le nombre de signalements atteint 10, supprimer le commentaire
-            if review.report_count >= 10:
-                review.delete()
-                return Response(
-                    {'message': 'Le commentaire a été supprimé automatiquement suite à trop de signalements'},
-                    status=status.HTTP_200_OK
-                )
-            serializer = ReportSerializer(report)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        except Review.DoesNotExist:
+            review = Review.objects.select_related('user', 'movie__created_by').get(id=review_id, movie=movie)
+        except (Review.DoesNotExist, ValueError):
             return Response(
                 {'error': 'Commentaire non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        try:
+            report, deleted = report_review(request.user, review, reason, description)
+        except AlreadyReported:
+            return Response(
+                {'error': 'Vous avez déjà signalé ce commentaire'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if deleted:
+            return Response(
+                {'message': 'Le commentaire a été supprimé automatiquement suite à trop de signalements'},
+                status=status.HTTP_200_OK
+            )
+        serializer = ReportSerializer(report)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def reported_reviews(self, request, pk=None):
         if not request.user.is_staff:
@@ -317,7 +442,7 @@ class MovieViewSet(viewsets.ModelViewSet):
             )
         
         movie = self.get_object()
-        reviews = Review.objects.filter(movie=movie, is_reported=True)
+        reviews = Review.objects.filter(movie=movie, is_reported=True).select_related('user', 'movie__created_by')
         serializer = ReviewSerializer(reviews, many=True)
         return Response(serializer.data)
 
@@ -341,9 +466,41 @@ class MovieViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def all_reported_reviews(self, request):
-        reported_reviews = Review.objects.filter(is_reported=True)
-        serializer = ReviewSerializer(reported_reviews, many=True, context={'request': request})
-        return Response(serializer.data)
+        """File de modération paginée : les plus signalés d'abord, puis le signalement le plus récent."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Accès non autorisé. Seuls les administrateurs peuvent voir les commentaires signalés.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        page = self.paginate_queryset(moderation_queue())
+
+        # Résumé des signalements par motif, une requête pour toute la page
+        summaries = {}
+        reasons = (
+            Report.objects.filter(review__in=[review.pk for review in page])
+            .order_by()
+            .values_list('review_id', 'reason')
+            .annotate(count=models.Count('id'))
+        )
+        for review_id, reason, count in reasons:
+            summaries.setdefault(review_id, {})[reason] = count
+
+        serializer = ModerationReviewSerializer(page, many=True, context={'report_summaries': summaries})
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def moderate_reviews(self, request):
+        """Modération groupée : {"review_ids": [...], "action": "dismiss" | "delete"}."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Accès non autorisé. Seuls les administrateurs peuvent modérer les commentaires.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = ModerateReviewsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = moderate_reviews(serializer.validated_data['review_ids'], serializer.validated_data['action'])
+        return Response({'results': results})
 
 class ListViewSet(viewsets.ModelViewSet):
     serializer_class = ListSerializer
@@ -351,12 +508,17 @@ class ListViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         logger.info(f"Fetching lists for user {self.request.user.username}")
-        queryset = List.objects.filter(created_by=self.request.user).prefetch_related(
-            'movies',
-            'movieinlist_set',
-            'movieinlist_set__movie'
+        # Le nombre de films est compté en SQL (une seule requête pour toutes les listes) ;
+        # les films eux-mêmes ne sont chargés que pour le détail d'une liste
+        queryset = (
+            List.objects.filter(created_by=self.request.user)
+            .select_related('created_by')
+            .annotate(movies_count=models.Count('movieinlist'))
         )
-        logger.info(f"Found {queryset.count()} lists")
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                models.Prefetch('movieinlist_set', queryset=MovieInList.objects.select_related('movie__created_by'))
+            )
         return queryset
 
     def get_serializer_class(self):
@@ -375,6 +537,23 @@ class ListViewSet(viewsets.ModelViewSet):
         except IntegrityError:
             raise serializers.ValidationError({'name': 'Une liste avec ce nom existe déjà.'})
 
+    @action(detail=True, methods=['get'])
+    def movies(self, request, pk=None):
+        # Films d'une liste, paginés : les listes système (Déjà vu, Favoris) grandissent sans limite
+        list_obj = self.get_object()
+        ordering = request.query_params.get('ordering', '-added_at')
+        if ordering not in ('added_at', '-added_at'):
+            ordering = '-added_at'
+        queryset = (
+            MovieInList.objects.filter(list=list_obj)
+            .select_related('movie__created_by')
+            .order_by(ordering, ordering.replace('added_at', 'pk'))
+        )
+        paginator = KeysetPagination() if use_cursor_pagination(request) else MoviePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = MovieInListSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def add_movie(self, request, pk=None):
         list_obj = self.get_object()
@@ -447,4 +626,67 @@ class ListViewSet(viewsets.ModelViewSet):
             return Response(
                 {'error': 'Film non trouvé dans la liste'},
                 status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            )
+
+    @action(detail=True, methods=['post'])
+    def add_movies(self, request, pk=None):
+        """Ajoute plusieurs films en une requête ; retourne le résultat film par film."""
+        list_obj = self.get_object()
+        serializer = BulkListMoviesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+
+        with transaction.atomic():
+            # Une seule requête pour savoir quels films existent et lesquels sont déjà dans la liste
+            known = dict(
+                Movie.objects.filter(pk__in={item['movie_id'] for item in items})
+                .annotate(in_list=models.Exists(
+                    MovieInList.objects.filter(list=list_obj, movie=models.OuterRef('pk'))
+                ))
+                .values_list('pk', 'in_list')
+            )
+            results, entries, seen = [], [], set()
+            for item in items:
+                movie_id = item['movie_id']
+                if movie_id not in known:
+                    outcome = 'not_found'
+                elif movie_id in seen:
+                    outcome = 'duplicate'
+                elif known[movie_id]:
+                    outcome = 'already_in_list'
+                else:
+                    outcome = 'added'
+                    entries.append(MovieInList(list=list_obj, movie_id=movie_id, note=item['note']))
+                seen.add(movie_id)
+                results.append({'movie_id': movie_id, 'status': outcome})
+            inserted = insert_new_rows(MovieInList, entries, {'list': list_obj}) if entries else set()
+            # Ajouté par une requête concurrente entre la lecture et l'INSERT : déjà dans la liste
+            for result in results:
+                if result['status'] == 'added' and result['movie_id'] not in inserted:
+                    result['status'] = 'already_in_list'
+
+        logger.info(f"Added {len(inserted)} movies to list {list_obj.id}")
+        return Response({'added': len(inserted), 'results': results})
+
+    @action(detail=True, methods=['post'])
+    def remove_movies(self, request, pk=None):
+        """Retire plusieurs films en une requête (un seul DELETE) ; résultat film par film."""
+        list_obj = self.get_object()
+        serializer = BulkListMoviesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        movie_ids = [item['movie_id'] for item in serializer.validated_data['items']]
+
+        with transaction.atomic():
+            entries = MovieInList.objects.filter(list=list_obj, movie_id__in=set(movie_ids))
+            present = set(entries.values_list('movie_id', flat=True))
+            entries.delete()
+
+        results, seen = [], set()
+        for movie_id in movie_ids:
+            if movie_id in seen:
+                outcome = 'duplicate'
+            else:
+                outcome = 'removed' if movie_id in present else 'not_in_list'
+            seen.add(movie_id)
+            results.append({'movie_id': movie_id, 'status': outcome})
+        return Response({'removed': len(present), 'results': results})
@@ -0,0 +1,29 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = "Ajouter une tâche à la file (ex. depuis cron : movies.build_recommendations)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help="Nom de la tâche (ex. movies.rebuild_stats)")
+        parser.add_argument('--payload', default='{}', help="Paramètres de la tâche, en JSON")
+        parser.add_argument('--dedup-key', help="Ignorer l'ajout si une tâche active a déjà cette clé")
+        parser.add_argument('--delay', type=int, default=0, help="Exécuter dans N secondes")
+
+    def handle(self, *args, **options):
+        try:
+            payload = json.loads(options['payload'])
+        except ValueError as e:
+            raise CommandError(f"--payload n'est pas du JSON valide : {e}")
+        try:
+            enqueue(options['name'], payload, dedup_key=options['dedup_key'],
+                    run_after=timezone.now() + timedelta(seconds=options['delay']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Tâche {options['name']} ajoutée."))
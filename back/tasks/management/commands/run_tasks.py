@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.queue import enqueue_periodic, run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la file de tâches (emails, imports, recalculs). Plusieurs processus "
+        "peuvent tourner en parallèle : une tâche n'est réservée que par un seul."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vider la file puis s'arrêter (cron, tests)")
+        parser.add_argument('--batch-size', type=int, default=50, help="Tâches réservées à la fois")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Attente en secondes quand la file est vide")
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                close_old_connections()
+                enqueue_periodic()
+                count = run_pending(options['batch_size'])
+                processed += count
+                if not count:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{processed} tâche(s) traitée(s)."))
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'En attente'),
+        (RUNNING, 'En cours'),
+        (DONE, 'Terminée'),
+        (FAILED, 'Échouée'),
+    ]
+
+    name = models.CharField(max_length=100)  # Handler déclaré avec @task (voir tasks/queue.py)
+    payload = models.JSONField(default=dict, blank=True)
+    # Deux tâches en attente ne peuvent pas partager la même clé ; une tâche en cours n'empêche
+    # pas d'en ajouter une nouvelle, qui verra les changements faits pendant son exécution
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)  # Jeton du worker qui l'exécute
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['run_after', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=models.Q(status='pending'),
+                                    name='unique_pending_task'),
+        ]
+        indexes = [
+            # Prochaines tâches à exécuter : WHERE status = 'pending' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['locked_by']),
+            # Purge des tâches terminées (manage.py prune_expired)
+            models.Index(fields=['status', 'finished_at']),
+        ]
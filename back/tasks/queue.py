@@ -0,0 +1,214 @@
+"""
+File de tâches en base de données, exécutée hors des requêtes par `manage.py run_tasks`.
+
+Une vue ajoute une tâche par un seul INSERT (enqueue), dans sa transaction : si la
+requête échoue, la tâche disparaît avec elle. Les workers (un ou plusieurs
+processus run_tasks) réservent les tâches dues par un UPDATE conditionnel, si bien
+que deux workers ne prennent jamais la même tâche, puis les exécutent :
+- dedup_key : tant qu'une tâche est en attente, les suivantes de même clé sont ignorées ;
+  une tâche en cours ne bloque pas la suivante, qui refera le travail après elle, et
+  une tâche reprise ou en échec qui a une remplaçante plus récente n'est pas relancée ;
+- une tâche en échec est reprogrammée avec un délai qui double à chaque essai,
+  jusqu'à max_attempts ;
+- pendant l'exécution, le worker renouvelle locked_at toutes les HEARTBEAT_INTERVAL
+  (battement de cœur) ; une tâche dont le verrou n'a pas été renouvelé depuis
+  LOCK_TIMEOUT (worker arrêté) est reprise, et le worker qui a perdu le verrou
+  ne peut plus en enregistrer le résultat ;
+- un handler déclaré avec batch=True reçoit en un appel toutes les tâches réservées
+  de son nom (les emails partent ainsi sur une seule connexion SMTP).
+
+Les handlers sont déclarés avec @task dans le module tasks.py de chaque application.
+Les tâches récurrentes (settings.PERIODIC_TASKS) sont ajoutées par les workers,
+une seule fois par période même avec plusieurs workers.
+"""
+import logging
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = timedelta(minutes=10)
+HEARTBEAT_INTERVAL = LOCK_TIMEOUT / 5
+RETRY_DELAY = timedelta(seconds=30)
+SUPERSEDED = "Remplacée par une tâche plus récente de même dedup_key"
+
+_handlers = {}
+# Tâche périodique -> dernière période déjà planifiée par ce processus
+_scheduled = {}
+
+
+def task(name, batch=False):
+    """
+    Déclare le handler de la tâche `name`. Sans batch : handler(payload).
+    Avec batch : handler(payloads) -> liste d'erreurs alignée sur payloads (None = succès).
+    """
+    def register(func):
+        _handlers[name] = (func, batch)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, dedup_key=None, run_after=None, max_attempts=5):
+    """Ajoute une tâche en un INSERT, ignoré si une tâche active a déjà cette dedup_key."""
+    if name not in _handlers:
+        raise ValueError(f"Tâche inconnue : {name}")
+    Task.objects.bulk_create([Task(
+        name=name, payload=payload or {}, dedup_key=dedup_key,
+        run_after=run_after or timezone.now(), max_attempts=max_attempts,
+    )], ignore_conflicts=True)
+
+
+def enqueue_periodic(now=None):
+    """
+    Ajoute les tâches de settings.PERIODIC_TASKS ({nom: période en secondes}) dont
+    la période a commencé. La dedup_key contient le numéro de période : plusieurs
+    workers ne l'exécutent qu'une fois.
+    """
+    now = now or timezone.now()
+    for name, interval in getattr(settings, 'PERIODIC_TASKS', {}).items():
+        period = int(now.timestamp() // interval)
+        if _scheduled.get(name) == period:
+            continue
+        dedup_key = f'periodic:{name}:{period}'
+        if not Task.objects.filter(dedup_key=dedup_key).exists():
+            enqueue(name, dedup_key=dedup_key)
+        _scheduled[name] = period
+
+
+def _superseded():
+    """Une tâche plus récente de même dedup_key est active : elle fera le travail à sa place."""
+    return models.Exists(Task.objects.filter(
+        dedup_key=models.OuterRef('dedup_key'), pk__gt=models.OuterRef('pk'), status__in=[Task.PENDING, Task.RUNNING]
+    ))
+
+
+def claim(limit=50):
+    """Réserve jusqu'à `limit` tâches dues pour ce worker et les retourne."""
+    now = timezone.now()
+    # Worker arrêté en pleine exécution : ses tâches redeviennent disponibles, sauf si une
+    # tâche de même clé a été ajoutée entre-temps (deux tâches en attente ne partagent pas de clé)
+    superseded = _superseded()
+    Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - LOCK_TIMEOUT).update(
+        status=models.Case(models.When(superseded, then=models.Value(Task.FAILED)), default=models.Value(Task.PENDING)),
+        finished_at=models.Case(models.When(superseded, then=models.Value(now)), default=None),
+        last_error=models.Case(models.When(superseded, then=models.Value(SUPERSEDED, models.TextField())),
+                               default=models.F('last_error')),
+        locked_by='',
+    )
+    ids = list(
+        Task.objects.filter(status=Task.PENDING, run_after__lte=now).values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Conditionnel : un autre worker qui a réservé les mêmes lignes entre-temps les garde
+    Task.objects.filter(pk__in=ids, status=Task.PENDING).update(
+        status=Task.RUNNING, locked_by=token, locked_at=now, attempts=models.F('attempts') + 1
+    )
+    return list(Task.objects.filter(locked_by=token, status=Task.RUNNING))
+
+
+def renew_locks(tasks):
+    """Repousse l'expiration du verrou des tâches réservées encore détenues par ce worker."""
+    Task.objects.filter(locked_by__in={task.locked_by for task in tasks}, status=Task.RUNNING).update(
+        locked_at=timezone.now()
+    )
+
+
+@contextmanager
+def heartbeat(tasks, interval=HEARTBEAT_INTERVAL):
+    """Renouvelle le verrou des tâches réservées tant que le bloc s'exécute (import TMDB, recalculs longs)."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval.total_seconds()):
+                try:
+                    renew_locks(tasks)
+                except Exception:
+                    # Base verrouillée ou connexion perdue : on réessaie au battement suivant,
+                    # le verrou n'expire qu'après LOCK_TIMEOUT
+                    logger.exception("Renouvellement du verrou des tâches en échec")
+        finally:
+            # Connexion propre à ce thread
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish(tasks, errors):
+    now = timezone.now()
+    # Seulement si ce worker détient encore le verrou : sinon la tâche a été reprise
+    # par un autre, dont le résultat ne doit pas être écrasé
+    done = [task.pk for task, error in zip(tasks, errors) if error is None]
+    if done:
+        Task.objects.filter(pk__in=done, status=Task.RUNNING, locked_by__in={task.locked_by for task in tasks}).update(
+            status=Task.DONE, finished_at=now, locked_by='', last_error=''
+        )
+    for task, error in zip(tasks, errors):
+        if error is None:
+            continue
+        logger.warning(f"Tâche {task.name} #{task.pk} en échec (essai {task.attempts}/{task.max_attempts}) : {error}")
+        if task.attempts >= task.max_attempts:
+            changes = {'status': Task.FAILED, 'finished_at': now}
+        else:
+            # Une tâche plus récente de même clé refera le travail : pas de nouvel essai
+            changes = {
+                'status': models.Case(models.When(_superseded(), then=models.Value(Task.FAILED)),
+                                      default=models.Value(Task.PENDING)),
+                'finished_at': models.Case(models.When(_superseded(), then=models.Value(now)), default=None),
+                'run_after': now + RETRY_DELAY * 2 ** (task.attempts - 1),
+            }
+        Task.objects.filter(pk=task.pk, status=Task.RUNNING, locked_by=task.locked_by).update(
+            locked_by='', last_error=str(error), **changes
+        )
+
+
+def run_tasks(tasks):
+    """Exécute des tâches réservées, groupées par nom, et enregistre leur résultat."""
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task.name, []).append(task)
+    for name, group in groups.items():
+        handler, batch = _handlers.get(name, (None, False))
+        if handler is None:
+            errors = [f"Tâche inconnue : {name}"] * len(group)
+        elif batch:
+            try:
+                errors = list(handler([task.payload for task in group]))
+            except Exception:
+                errors = [traceback.format_exc()] * len(group)
+        else:
+            errors = []
+            for task in group:
+                try:
+                    handler(task.payload)
+                    errors.append(None)
+                except Exception:
+                    errors.append(traceback.format_exc())
+        _finish(group, errors)
+    return len(tasks)
+
+
+def run_pending(limit=50):
+    """Réserve et exécute un lot de tâches dues ; retourne le nombre de tâches traitées."""
+    tasks = claim(limit)
+    if not tasks:
+        return 0
+    with heartbeat(tasks):
+        return run_tasks(tasks)
@@ -0,0 +1,176 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Task
+from .queue import (LOCK_TIMEOUT, claim, enqueue, enqueue_periodic, heartbeat, renew_locks, run_pending,
+                    run_tasks, task)
+
+calls = []
+
+
+@task('tests.record')
+def record(payload):
+    calls.append(payload)
+
+
+@task('tests.fail')
+def fail(payload):
+    raise RuntimeError("SMTP indisponible")
+
+
+@task('tests.batch', batch=True)
+def batch(payloads):
+    calls.append(payloads)
+    return [None if payload.get('ok', True) else "refusé" for payload in payloads]
+
+
+@override_settings(PERIODIC_TASKS={})
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        queue._scheduled.clear()
+
+    def test_enqueue_then_run(self):
+        enqueue('tests.record', {'n': 1})
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [{'n': 1}])
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts, task.locked_by), (Task.DONE, 1, ''))
+        self.assertIsNotNone(task.finished_at)
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+    def test_dedup_key_only_applies_to_active_tasks(self):
+        enqueue('tests.record', {'n': 1}, dedup_key='same')
+        enqueue('tests.record', {'n': 2}, dedup_key='same')
+        self.assertEqual(Task.objects.count(), 1)
+        run_pending()
+        enqueue('tests.record', {'n': 3}, dedup_key='same')
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+
+    def test_dedup_key_does_not_drop_a_task_enqueued_while_one_runs(self):
+        enqueue('tests.record', {'n': 1}, dedup_key='same')
+        running = claim()
+        # Renvoi pendant l'exécution : la tâche en cours a pu lire l'état d'avant
+        enqueue('tests.record', {'n': 2}, dedup_key='same')
+        enqueue('tests.record', {'n': 3}, dedup_key='same')
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+        run_tasks(running)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [{'n': 1}, {'n': 2}])
+
+    def test_stale_or_failed_task_with_a_newer_pending_twin_is_not_retried(self):
+        enqueue('tests.fail', dedup_key='same')
+        enqueue('tests.record', dedup_key='stale')
+        first = claim()
+        enqueue('tests.fail', dedup_key='same')
+        enqueue('tests.record', dedup_key='stale')
+        run_tasks([task for task in first if task.name == 'tests.fail'])
+        Task.objects.filter(status=Task.RUNNING).update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(len(claim()), 2)
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('status', flat=True)),
+            [Task.FAILED, Task.FAILED, Task.RUNNING, Task.RUNNING],
+        )
+        self.assertEqual(Task.objects.get(pk=first[1].pk).last_error, queue.SUPERSEDED)
+
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        enqueue('tests.fail', max_attempts=2)
+        run_pending()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertIn("SMTP indisponible", task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+        # Pas encore dû
+        self.assertEqual(run_pending(), 0)
+
+        Task.objects.update(run_after=timezone.now())
+        run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_claimed_tasks_are_not_claimed_twice(self):
+        for n in range(3):
+            enqueue('tests.record', {'n': n})
+        first = claim(limit=2)
+        second = claim(limit=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({task.pk for task in first} & {task.pk for task in second})
+        self.assertEqual(claim(), [])
+
+    def test_stale_running_task_is_taken_back(self):
+        enqueue('tests.record', {'n': 1})
+        claim()
+        Task.objects.update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Task.objects.get().attempts, 2)
+
+    def test_worker_that_lost_the_lock_does_not_record_the_result(self):
+        enqueue('tests.fail', max_attempts=1)
+        first = claim()
+        Task.objects.update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        second = claim()
+        self.assertEqual(len(second), 1)
+        run_tasks(first)
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.locked_by, task.last_error), (Task.RUNNING, second[0].locked_by, ''))
+
+    def test_renewed_lock_is_not_taken_back(self):
+        enqueue('tests.record', {'n': 1})
+        tasks = claim()
+        Task.objects.update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        renew_locks(tasks)
+        self.assertEqual(claim(), [])
+
+    def test_heartbeat_renews_while_the_block_runs(self):
+        with mock.patch.object(queue, 'renew_locks') as renew:
+            with heartbeat([], interval=timedelta(milliseconds=5)):
+                time.sleep(0.05)
+        self.assertTrue(renew.called)
+
+    def test_heartbeat_keeps_beating_after_a_renewal_error(self):
+        with mock.patch.object(queue, 'renew_locks', side_effect=OperationalError("database is locked")) as renew:
+            with self.assertLogs('tasks.queue', 'ERROR'):
+                with heartbeat([], interval=timedelta(milliseconds=5)):
+                    time.sleep(0.05)
+        self.assertGreater(renew.call_count, 1)
+
+    def test_batch_handler_gets_all_claimed_payloads_at_once(self):
+        enqueue('tests.batch', {'n': 1})
+        enqueue('tests.batch', {'n': 2, 'ok': False})
+        run_pending()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('status', flat=True)), [Task.DONE, Task.PENDING]
+        )
+
+    def test_commands(self):
+        call_command('enqueue_task', 'tests.record', '--payload', '{"n": 1}', stdout=StringIO())
+        out = StringIO()
+        call_command('run_tasks', '--once', stdout=out)
+        self.assertIn("1 tâche(s) traitée(s).", out.getvalue())
+        self.assertEqual(calls, [{'n': 1}])
+
+    @override_settings(PERIODIC_TASKS={'tests.record': 3600})
+    def test_periodic_task_is_enqueued_once_per_period(self):
+        now = timezone.now()
+        enqueue_periodic(now)
+        run_pending()
+        # Un autre worker (sans mémoire locale), même période : déjà fait
+        queue._scheduled.clear()
+        enqueue_periodic(now)
+        self.assertEqual(run_pending(), 0)
+        enqueue_periodic(now + timedelta(hours=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(len(calls), 2)
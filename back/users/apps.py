@@ -1,11 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
 
-
-def ready(self):
-    import users.signals
-
+    def ready(self):
+        import users.signals
+        from .backends import create_login_indexes
+        from .housekeeping import create_housekeeping_indexes
+        post_migrate.connect(create_login_indexes, sender=self)
+        post_migrate.connect(create_housekeeping_indexes, sender=self)
@@ -0,0 +1,134 @@
+"""
+Authentification JWT sans requête SQL par appel.
+
+JWTAuthentication relit la ligne User à chaque requête authentifiée. Ici
+l'utilisateur est servi par deux niveaux de cache :
+- un dictionnaire local au processus, de courte durée (LOCAL_TTL) ;
+- le cache Django, seulement s'il est réellement partagé entre processus
+  (redis, fichiers) : avec locmem chaque worker n'y verrait pas les
+  invalidations des autres (users/signals.py). Il est alors ignoré.
+
+Seuls les champs utiles à l'authentification et aux vues sont mis en cache
+(CACHED_FIELDS), pas le hachage du mot de passe : une empreinte suffit au
+contrôle CHECK_REVOKE_TOKEN. request.user est reconstruit avec ces seuls
+champs ; les autres sont différés (relus à la demande) et un save() sans
+update_fields n'écrit que les champs chargés. Une vue qui modifie le compte
+doit de toute façon relire la ligne (UpdateProfileView).
+
+Un compte désactivé ou modifié depuis un autre processus est pris en compte au
+plus LOCAL_TTL secondes plus tard.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+LOCAL_TTL = 5
+SHARED_TTL = 5 * 60
+LOCAL_MAX_ENTRIES = 10000
+CACHED_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+# user_id -> (expiration time.monotonic(), (champs, empreinte du mot de passe))
+_local = {}
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def shared_cache():
+    """Le cache Django s'il est commun à tous les processus, sinon None."""
+    cache = caches[DEFAULT_CACHE_ALIAS]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
+
+
+def _load(user_id):
+    user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is None:
+        return None
+    return {name: getattr(user, name) for name in CACHED_FIELDS}, get_md5_hash_password(user.password)
+
+
+def _build(values):
+    # from_db : instance « chargée », les champs absents (password, last_login...) sont différés.
+    # Les valeurs doivent suivre l'ordre des champs du modèle.
+    model = get_user_model()
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def get_cached_entry(user_id):
+    """(utilisateur reconstruit, empreinte du mot de passe) de `user_id`, ou None s'il n'existe pas."""
+    # Le claim est une chaîne, instance.pk un entier : même clé pour les deux
+    user_id = str(user_id)
+    now = time.monotonic()
+    entry = _local.get(user_id)
+    if entry is None or entry[0] < now:
+        shared = shared_cache()
+        data = shared.get(user_cache_key(user_id)) if shared is not None else None
+        if data is None:
+            data = _load(user_id)
+            if data is None:
+                return None
+            if shared is not None:
+                shared.set(user_cache_key(user_id), data, SHARED_TTL)
+        if len(_local) >= LOCAL_MAX_ENTRIES:
+            _local.clear()
+        _local[user_id] = entry = (now + LOCAL_TTL, data)
+    values, password_hash = entry[1]
+    # Nouvelle instance à chaque appel : la vue peut modifier request.user sans toucher au cache
+    return _build(values), password_hash
+
+
+def get_cached_user(user_id):
+    entry = get_cached_entry(user_id)
+    return entry[0] if entry else None
+
+
+def invalidate_cached_user(user_id):
+    user_id = str(user_id)
+
+    def invalidate():
+        _local.pop(user_id, None)
+        shared = shared_cache()
+        if shared is not None:
+            shared.delete(user_cache_key(user_id))
+    # Tout de suite, et après le commit pour ne pas garder une version relue entre-temps
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def clear_local_cache():
+    _local.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        entry = get_cached_entry(user_id)
+        if entry is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        user, password_hash = entry
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,60 @@
+"""
+Connexion par nom d'utilisateur ou par email, sans casse, en une requête.
+
+La recherche compare LOWER(username) et LOWER(email) à l'identifiant saisi ;
+les index sur ces expressions sont créés après `migrate` (voir UsersConfig.ready),
+la table auth_user n'appartenant pas à ce projet. La vérification du mot de
+passe reste celle de Django : check_password ré-encode le mot de passe si le
+hasher ou son nombre d'itérations a changé.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+LOGIN_INDEXES = {
+    'auth_user_username_lower_idx': 'username',
+    'auth_user_email_lower_idx': 'email',
+}
+
+
+def create_login_indexes(using='default', **kwargs):
+    """Crée les index LOWER(username) / LOWER(email) si besoin (appelé sur post_migrate)."""
+    table = UserModel._meta.db_table
+    with connections[using].cursor() as cursor:
+        for name, column in LOGIN_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (LOWER({column}))')
+
+
+def login_candidates(login):
+    """Comptes dont le nom d'utilisateur ou l'email correspond à `login`, sans casse."""
+    login = Lower(Value(login))
+    return (
+        UserModel._default_manager
+        .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower=login) | Q(email_lower=login))
+    )
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        # Quelques lignes au plus : l'email n'est pas unique, ni le nom d'utilisateur sans casse
+        candidates = list(login_candidates(username).order_by('pk')[:5])
+        if not candidates:
+            # Même coût qu'un compte existant, pour ne pas révéler les comptes (cf. ModelBackend)
+            UserModel().set_password(password)
+            return None
+        # Priorité au nom d'utilisateur exact, puis sans casse, puis à l'email
+        user = min(candidates, key=lambda user: (
+            user.username != username, user.username.lower() != username.lower()
+        ))
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,74 @@
+"""
+Ménage des tables qui ne font que grossir (manage.py prune_expired).
+
+- jetons de rafraîchissement expirés (token_blacklist) : avec ROTATE_REFRESH_TOKENS
+  et BLACKLIST_AFTER_ROTATION, chaque rafraîchissement ajoute une ligne ; les
+  BlacklistedToken partent en cascade avec leur OutstandingToken ;
+- inscriptions jamais vérifiées (PendingUser) et anciens codes (EmailVerification) ;
+- tâches terminées ou abandonnées de la file (tasks.Task).
+
+Les suppressions se font par petits lots, une transaction courte par lot, pour ne
+jamais verrouiller une table longtemps. Durées de conservation : *_RETENTION_DAYS
+dans les settings.
+"""
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from tasks.models import Task
+from .models import EmailVerification, PendingUser
+
+
+def create_housekeeping_indexes(using='default', **kwargs):
+    """Index sur expires_at des jetons (modèle de simplejwt), créé après `migrate`."""
+    if not apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        return
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+    table = OutstandingToken._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_expires_at_idx ON {table} (expires_at)')
+
+
+def retention(name, default):
+    return timedelta(days=getattr(settings, name, default))
+
+
+def expired_querysets(now=None):
+    """(libellé, queryset des lignes à supprimer)."""
+    now = now or timezone.now()
+    if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+        yield "jetons expirés", OutstandingToken.objects.filter(
+            expires_at__lt=now - retention('EXPIRED_TOKEN_RETENTION_DAYS', 1)
+        )
+    yield "inscriptions non vérifiées", PendingUser.objects.filter(
+        created_at__lt=now - retention('PENDING_USER_RETENTION_DAYS', 2)
+    )
+    yield "codes de vérification", EmailVerification.objects.filter(
+        created_at__lt=now - retention('EMAIL_VERIFICATION_RETENTION_DAYS', 2)
+    )
+    yield "tâches terminées", Task.objects.filter(
+        status__in=[Task.DONE, Task.FAILED], finished_at__lt=now - retention('TASK_RETENTION_DAYS', 7)
+    )
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0):
+    """Supprime les lignes du queryset par lots de `batch_size` ; retourne le nombre supprimé."""
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            _, per_model = model.objects.filter(pk__in=ids).delete()
+        deleted += per_model.get(model._meta.label, 0)
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            # Laisse passer les écritures de l'application entre deux lots
+            time.sleep(pause)
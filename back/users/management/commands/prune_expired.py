@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from users.housekeeping import delete_in_batches, expired_querysets
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprimer les jetons expirés, les inscriptions non vérifiées, les anciens codes de "
+        "vérification et les tâches terminées (par lots courts, sans long verrou)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Lignes supprimées par transaction")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Pause en secondes entre deux lots")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans supprimer")
+
+    def handle(self, *args, **options):
+        for label, queryset in expired_querysets():
+            if options['dry_run']:
+                self.stdout.write(f"{label} : {queryset.count()} à supprimer")
+                continue
+            deleted = delete_in_batches(queryset, options['batch_size'], options['pause'])
+            self.stdout.write(f"{label} : {deleted} supprimé(s)")
+        self.stdout.write(self.style.SUCCESS("Ménage terminé."))
@@ -6,7 +6,7 @@ User = get_user_model()
 class EmailVerification(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='email_verification')
     code = models.CharField(max_length=6)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Purge : manage.py prune_expired
     
     def __str__(self):
         return f"Verification for {self.user.email}"
@@ -16,4 +16,4 @@ class PendingUser(models.Model):
     username = models.CharField(max_length=150)
     password = models.CharField(max_length=128)  
     verification_code = models.CharField(max_length=6)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Purge : manage.py prune_expired
@@ -1,5 +1,6 @@
 from .models import PendingUser
-from .utils import generate_verification_code, send_verification_email
+from .utils import generate_verification_code, queue_verification_email
+from django.db import transaction
 from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 
@@ -12,11 +13,12 @@ class RegisterSerializer(serializers.Serializer):
         code = generate_verification_code()
         hashed_password = make_password(validated_data["password"])
         
-        pending_user = PendingUser.objects.create(
-            email=validated_data["email"],
-            username=validated_data["username"],
-            password=hashed_password,
-            verification_code=code,
-        )
-        send_verification_email(pending_user.email, code)
+        with transaction.atomic(savepoint=False):
+            pending_user = PendingUser.objects.create(
+                email=validated_data["email"],
+                username=validated_data["username"],
+                password=hashed_password,
+                verification_code=code,
+            )
+            queue_verification_email(pending_user.email)
         return pending_user
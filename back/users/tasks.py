@@ -0,0 +1,42 @@
+"""Emails et ménage, exécutés par le worker (manage.py run_tasks)."""
+from django.core.mail import get_connection
+from django.core.management import call_command
+
+from tasks.queue import task
+from .models import EmailVerification, PendingUser
+from .utils import verification_message
+
+
+@task('users.send_verification_email', batch=True)
+def send_verification_emails(payloads):
+    """
+    Envoie les codes de vérification en attente sur une seule connexion SMTP. Le
+    code est lu au moment de l'envoi : après un renvoi, seul le dernier code part.
+    """
+    emails = [payload['email'] for payload in payloads]
+    codes = dict(PendingUser.objects.filter(email__in=emails).values_list('email', 'verification_code'))
+    codes.update(
+        (email, code) for email, code in
+        EmailVerification.objects.filter(user__email__in=emails).values_list('user__email', 'code')
+        if email not in codes
+    )
+    errors = []
+    with get_connection() as connection:
+        for email in emails:
+            code = codes.get(email)
+            if code is None:
+                # Compte vérifié ou supprimé entre-temps : plus rien à envoyer
+                errors.append(None)
+                continue
+            try:
+                verification_message(email, code, connection).send()
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+    return errors
+
+
+@task('users.prune_expired')
+def prune_expired(payload):
+    # Planifiée par PERIODIC_TASKS (settings), ou à la main : manage.py enqueue_task users.prune_expired
+    call_command('prune_expired', **payload)
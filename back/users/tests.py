@@ -1,3 +1,304 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.testing import QueryBudgetMixin, QUERY_BUDGETS, iter_routes
+from tasks.models import Task
+from tasks.queue import run_pending
+from . import tasks
+from .authentication import clear_local_cache, user_cache_key
+from .models import EmailVerification, PendingUser
+
+User = get_user_model()
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Budget SQL / latence pour chaque route de users/urls.py."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalog', movies=200, users=200, stdout=StringIO())
+        cls.user = User.objects.create_user('bob', 'bob@example.com', 'secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_every_route_has_a_budget(self):
+        missing = iter_routes('users.urls') - set(QUERY_BUDGETS)
+        self.assertFalse(missing, f"Routes sans budget de requêtes : {sorted(missing)}")
+
+    def test_login_with_username_and_email(self):
+        self.assertWithinBudget('post', '/api/users/login/', data={'username': 'bob', 'password': 'secret'})
+        self.assertWithinBudget('post', '/api/users/login/',
+                                data={'username': 'bob@example.com', 'password': 'secret'})
+
+    def test_logout(self):
+        self.client.force_authenticate(self.user)
+        self.client.cookies['refresh_token'] = str(RefreshToken.for_user(self.user))
+        self.assertWithinBudget('post', '/api/users/logout/')
+
+    def test_me(self):
+        self.client.force_authenticate(self.user)
+        self.assertWithinBudget('get', '/api/users/me/')
+
+    def test_token_refresh(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertWithinBudget('post', '/api/users/token/refresh/', data={'refresh': str(refresh)})
+
+    def test_update_profile(self):
+        self.client.force_authenticate(self.user)
+        self.assertWithinBudget('patch', '/api/users/update-profile/', data={'username': 'bobby'})
+
+    def test_register_and_verify(self):
+        self.assertWithinBudget('post', '/api/users/register/', expected_status=201, data={
+            'email': 'carol@example.com', 'username': 'carol', 'password': 'secret'
+        })
+        pending = PendingUser.objects.get(email='carol@example.com')
+        self.assertWithinBudget('post', '/api/users/verify-email/', expected_status=201, data={
+            'email': pending.email, 'code': pending.verification_code
+        })
+        user = User.objects.get(email=pending.email)
+        self.assertEqual(sorted(user.lists.filter(is_system=True).values_list('name', flat=True)),
+                         ["Déjà vu", "Favoris"])
+
+    def test_resend_verification(self):
+        self.assertWithinBudget('post', '/api/users/resend-verification/', data={'email': 'bob@example.com'})
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class VerificationEmailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, name):
+        return self.client.post('/api/users/register/', {
+            'email': f'{name}@example.com', 'username': name, 'password': 'secret'
+        })
+
+    def test_register_does_not_wait_for_smtp(self):
+        self.assertEqual(self.register('carol').status_code, 201)
+        self.assertEqual(mail.outbox, [])
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['carol@example.com'])
+        self.assertIn(PendingUser.objects.get().verification_code, mail.outbox[0].body)
+
+    def test_pending_emails_share_one_smtp_connection(self):
+        for name in ('carol', 'dave', 'erin'):
+            self.register(name)
+        with mock.patch.object(tasks, 'get_connection', wraps=tasks.get_connection) as get_connection:
+            run_pending()
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_resend_sends_only_the_latest_code(self):
+        User.objects.create_user('bob', 'bob@example.com', 'secret')
+        for _ in range(3):
+            self.client.post('/api/users/resend-verification/', {'email': 'bob@example.com'})
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(User.objects.get().email_verification.code, mail.outbox[0].body)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.user = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(self.client.get('/api/users/me/').data['username'], 'bob')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_profile_update_is_seen_by_the_next_request(self):
+        self.client.get('/api/users/me/')
+        self.client.patch('/api/users/update-profile/', {'username': 'bobby'})
+        self.assertEqual(self.client.get('/api/users/me/').data['username'], 'bobby')
+
+    def test_shared_cache_survives_a_new_process(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }}):
+            self.client.get('/api/users/me/')
+            clear_local_cache()
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/users/me/')
+            self.assertEqual(len(ctx.captured_queries), 0)
+            # Ni le hachage du mot de passe ni l'objet User dans le cache
+            values, password_hash = cache.get(user_cache_key(self.user.pk))
+            self.assertNotIn('password', values)
+            self.assertNotIn(self.user.password, password_hash)
+
+    def test_process_local_cache_is_not_used_as_shared_level(self):
+        self.client.get('/api/users/me/')
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        clear_local_cache()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/users/me/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_profile_update_does_not_restore_stale_fields(self):
+        self.client.get('/api/users/me/')
+        # Rétrogradé par un autre processus pendant que l'ancienne version est en cache
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.client.patch('/api/users/update-profile/', {'username': 'bobby'})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.username, self.user.is_staff), ('bobby', True))
+
+    def test_deactivated_and_deleted_users_are_rejected(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    LOGIN_THROTTLE_ACCOUNT_FAILURES=3,
+    LOGIN_THROTTLE_IP_FAILURES=5,
+)
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('Bob', 'Bob@Example.com', 'secret')
+
+    def login(self, username, password='secret'):
+        return self.client.post('/api/users/login/', {'username': username, 'password': password})
+
+    def test_username_or_email_without_case_in_one_query(self):
+        for login in ('Bob', 'bob', 'bob@example.com', 'BOB@EXAMPLE.COM'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.login(login)
+            self.assertEqual(response.status_code, 200, login)
+            self.assertEqual(response.data['user']['id'], self.user.id)
+            self.assertEqual(sum('FROM "auth_user"' in q['sql'] for q in ctx.captured_queries), 1)
+
+    def test_exact_username_wins_over_other_matches(self):
+        other = User.objects.create_user('bob', 'other@example.com', 'other')
+        self.assertEqual(self.login('bob', 'other').data['user']['id'], other.id)
+        self.assertEqual(self.login('Bob').data['user']['id'], self.user.id)
+
+    def test_lookup_uses_the_lower_indexes(self):
+        from .backends import login_candidates
+        plan = login_candidates('bob').explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('auth_user_username_lower_idx', plan)
+            self.assertIn('auth_user_email_lower_idx', plan)
+
+    def test_account_is_throttled_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('bob', 'wrong').status_code, 401)
+        with mock.patch('django.contrib.auth.base_user.AbstractBaseUser.check_password') as check_password:
+            response = self.login('bob')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        check_password.assert_not_called()
+        # Les autres comptes restent accessibles depuis cette IP
+        User.objects.create_user('carol', 'carol@example.com', 'secret')
+        self.assertEqual(self.login('carol').status_code, 200)
+
+    def test_account_stays_open_from_other_addresses(self):
+        for _ in range(3):
+            self.login('bob', 'wrong')
+        self.assertEqual(self.login('bob').status_code, 429)
+        response = self.client.post('/api/users/login/', {'username': 'bob', 'password': 'secret'},
+                                    REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_forwarded_for_header_does_not_reset_the_ip_counter(self):
+        for n in range(5):
+            self.client.post('/api/users/login/', {'username': f'nobody{n}', 'password': 'wrong'},
+                             HTTP_X_FORWARDED_FOR=f'203.0.113.{n}')
+        response = self.client.post('/api/users/login/', {'username': 'bob', 'password': 'secret'},
+                                    HTTP_X_FORWARDED_FOR='203.0.113.99')
+        self.assertEqual(response.status_code, 429)
+
+    def test_ip_is_throttled_across_accounts(self):
+        for n in range(5):
+            self.login(f'nobody{n}', 'wrong')
+        self.assertEqual(self.login('bob').status_code, 429)
+
+    def test_success_resets_the_account_counter(self):
+        for _ in range(2):
+            self.login('bob', 'wrong')
+        self.assertEqual(self.login('bob').status_code, 200)
+        for _ in range(2):
+            self.login('bob', 'wrong')
+        self.assertEqual(self.login('bob').status_code, 200)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'
+    ])
+    def test_outdated_hash_is_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('secret', hasher='md5'))
+        self.assertEqual(self.login('bob').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+
+class PruneExpiredTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        old = timezone.now() - timedelta(days=30)
+
+        expired, live = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=old)
+        self.live_jti = live['jti']
+
+        PendingUser.objects.bulk_create([
+            PendingUser(email=f'p{n}@example.com', username=f'p{n}', password='x', verification_code='123456')
+            for n in range(5)
+        ])
+        PendingUser.objects.exclude(email='p0@example.com').update(created_at=old)
+        EmailVerification.objects.create(user=self.user, code='123456')
+        EmailVerification.objects.update(created_at=old)
+        Task.objects.create(name='users.prune_expired', status=Task.DONE, finished_at=old)
+        Task.objects.create(name='users.prune_expired')
+
+    def test_prunes_expired_rows_in_batches(self):
+        out = StringIO()
+        call_command('prune_expired', '--batch-size', '2', '--pause', '0', stdout=out)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [self.live_jti])
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertEqual(list(PendingUser.objects.values_list('email', flat=True)), ['p0@example.com'])
+        self.assertFalse(EmailVerification.objects.exists())
+        self.assertEqual(list(Task.objects.values_list('status', flat=True)), [Task.PENDING])
+        self.assertIn("inscriptions non vérifiées : 4 supprimé(s)", out.getvalue())
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('prune_expired', '--dry-run', stdout=out)
+        self.assertIn("inscriptions non vérifiées : 4 à supprimer", out.getvalue())
+        self.assertEqual(PendingUser.objects.count(), 5)
@@ -0,0 +1,48 @@
+"""
+Limitation des échecs de connexion, dans le cache partagé.
+
+Les échecs sont comptés sur une fenêtre fixe, par adresse IP et par couple
+(identifiant saisi, IP). Au-delà de la limite, LoginView répond 429 avant toute
+vérification du mot de passe : une rafale de tentatives ne consomme plus un
+hachage PBKDF2 chacune. Une connexion réussie remet le compteur du couple à zéro.
+
+Le compte n'est jamais bloqué pour toutes les IP : sinon n'importe qui
+connaissant un nom d'utilisateur pourrait en interdire l'accès à son
+propriétaire. L'IP est REMOTE_ADDR, ou l'adresse vue par le dernier proxy de
+confiance (REST_FRAMEWORK['NUM_PROXIES']) : un X-Forwarded-For forgé ne donne
+pas un nouveau compteur.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class LoginThrottle:
+    def __init__(self, request, login):
+        self.window = getattr(settings, 'LOGIN_THROTTLE_WINDOW', 300)
+        ip = BaseThrottle().get_ident(request)
+        account = hashlib.md5(f"{(login or '').strip().lower()}|{ip}".encode()).hexdigest()
+        self.account_key = f'login-fail:account:{account}'
+        self.limits = {
+            f'login-fail:ip:{ip}': getattr(settings, 'LOGIN_THROTTLE_IP_FAILURES', 20),
+            self.account_key: getattr(settings, 'LOGIN_THROTTLE_ACCOUNT_FAILURES', 5),
+        }
+
+    def blocked(self):
+        counts = cache.get_many(list(self.limits))
+        return any(counts.get(key, 0) >= limit for key, limit in self.limits.items())
+
+    def failed(self):
+        for key in self.limits:
+            # add ne fait rien si la fenêtre est déjà ouverte : elle n'est pas prolongée
+            cache.add(key, 0, self.window)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Expirée entre add et incr
+                cache.set(key, 1, self.window)
+
+    def succeeded(self):
+        cache.delete(self.account_key)
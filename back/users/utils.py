@@ -3,21 +3,20 @@ import requests
 import random
 
 import random
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+
+from tasks.queue import enqueue
 
 def generate_verification_code():
     return str(random.randint(100000, 999999))
 
-def send_verification_email(email, code):
+def verification_message(email, code, connection=None):
     subject = "Code de vérification"
     message = f"Bonjour,\n\nVoici votre code de vérification : {code}\n\nL'équipe Critiq"
-    
-    print(f"[DEBUG] Envoi SMTP à {email} avec code {code}")
-    
-    send_mail(
-        subject,
-        message,
-        None,  # Utilise DEFAULT_FROM_EMAIL
-        [email],
-        fail_silently=False
-    )
\ No newline at end of file
+    # from_email None : DEFAULT_FROM_EMAIL
+    return EmailMessage(subject, message, None, [email], connection=connection)
+
+def queue_verification_email(email):
+    # Envoyé par le worker (manage.py run_tasks, voir users/tasks.py) : la requête
+    # n'attend pas le serveur SMTP. Plusieurs demandes en attente -> un seul email.
+    enqueue('users.send_verification_email', {'email': email}, dedup_key=f'verification-email:{email}')
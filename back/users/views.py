@@ -10,7 +10,10 @@ from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import User as DefaultUser
 from .serializers import RegisterSerializer
 from .models import EmailVerification
-from .utils import send_verification_email
+from .utils import queue_verification_email
+from .throttling import LoginThrottle
+from movies.services import ensure_system_lists
+from django.db import transaction
 from rest_framework.decorators import api_view
 from rest_framework.views import APIView
 import logging
@@ -48,15 +51,21 @@ class LoginView(APIView):
 
         logger.info(f"Tentative de connexion pour: {username_or_email}")
 
-        try:
-            user = User.objects.get(email=username_or_email)
-            username = user.username
-        except User.DoesNotExist:
-            username = username_or_email
+        # Rafale d'échecs (IP ou compte) : refusé avant de hacher le mot de passe
+        throttle = LoginThrottle(request, username_or_email)
+        if throttle.blocked():
+            logger.warning(f"Connexion bloquée (trop d'échecs) pour: {username_or_email}")
+            return Response(
+                {"detail": "Trop de tentatives de connexion. Réessayez dans quelques minutes."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(throttle.window)}
+            )
 
-        user = authenticate(username=username, password=password)
+        # Nom d'utilisateur ou email, en une requête (users/backends.py)
+        user = authenticate(request, username=username_or_email, password=password)
 
         if user:
+            throttle.succeeded()
             if not user.is_active:
                 return Response(
                     {"detail": "Veuillez vérifier votre adresse email avant de vous connecter."},
@@ -87,6 +96,7 @@ class LoginView(APIView):
             )
             return response
 
+        throttle.failed()
         logger.warning(f"Échec de la connexion pour: {username_or_email}")
         return Response(
             {"detail": "Invalid credentials"},
@@ -139,13 +149,15 @@ class VerifyEmailView(APIView):
         if pending.verification_code != code:
             return Response({"error": "Invalid code"}, status=400)
 
-        user = User.objects.create(
-            username=pending.username,
-            email=pending.email,
-            password=pending.password,  # already hashed
-        )
-
-        pending.delete()
+        with transaction.atomic():
+            user = User.objects.create(
+                username=pending.username,
+                email=pending.email,
+                password=pending.password,  # already hashed
+            )
+            # Listes "Favoris" et "Déjà vu" créées une fois pour toutes
+            ensure_system_lists(user)
+            pending.delete()
         return Response({"message": "Account verified and created successfully!"}, status=201)
 
 
@@ -169,7 +181,9 @@ class UpdateProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request):
-        user = request.user
+        # request.user vient du cache d'authentification : relire la ligne avant de la modifier
+        user = User.objects.get(pk=request.user.pk)
+        changed = []
         username = request.data.get('username')
         current_password = request.data.get('current_password')
         new_password = request.data.get('new_password')
@@ -181,6 +195,7 @@ class UpdateProfileView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             user.username = username
+            changed.append('username')
 
         if new_password:
             if not current_password:
@@ -196,8 +211,11 @@ class UpdateProfileView(APIView):
                 )
 
             user.set_password(new_password)
+            changed.append('password')
 
-        user.save()
+        if changed:
+            # Seuls les champs modifiés : is_active, is_staff... changés ailleurs ne sont pas écrasés
+            user.save(update_fields=changed)
         return Response({
             "username": user.username,
             "message": "Profil mis à jour avec succès"
@@ -223,7 +241,8 @@ def resend_verification(request):
         pass
 
     code = generate_code()
-    EmailVerification.objects.create(user=user, code=code)
-    send_verification_email(user.email, code)
+    with transaction.atomic(savepoint=False):
+        EmailVerification.objects.create(user=user, code=code)
+        queue_verification_email(user.email)
 
     return Response({'message': 'Code renvoyé'})
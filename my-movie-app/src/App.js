@@ -110,7 +110,7 @@ function ProtectedApp() {
     let url = `/movies/?page=${page}`;
 
     if (effectiveSearch) {
-      url += `&search=${encodeURIComponent(effectiveSearch)}&startswith=true`;
+      url += `&search=${encodeURIComponent(effectiveSearch)}`;
     }
 
     if (effectiveSort) {
@@ -137,26 +137,9 @@ function ProtectedApp() {
     axiosInstance
       .get(url)
       .then((response) => {
-        let results = response.data.results;
-
-        // If searching and startswith=true not supported by backend, filter on frontend
-        if (effectiveSearch && effectiveSearch.trim() !== "") {
-          const lowerSearch = effectiveSearch.toLowerCase();
-          results = results.filter((movie) =>
-            movie.title.toLowerCase().startsWith(lowerSearch)
-          );
-        }
-
-        setMovies(results);
-
-        // Recalculate pagination based on filtered results if we did frontend filtering
-        if (effectiveSearch && effectiveSearch.trim() !== "") {
-          setTotalPages(Math.max(1, Math.ceil(results.length / 24)));
-          setTotalMovies(results.length);
-        } else {
-          setTotalPages(Math.ceil(response.data.count / 24));
-          setTotalMovies(response.data.count);
-        }
+        setMovies(response.data.results);
+        setTotalPages(Math.max(1, Math.ceil(response.data.count / 24)));
+        setTotalMovies(response.data.count);
       })
       .catch((error) => {
         console.error("Erreur :", error);
@@ -639,7 +622,7 @@ function ProtectedApp() {
                           let url = `/movies/?page=${currentPage}`;
                           
                           if (searchTerm) {
-                            url += `&search=${encodeURIComponent(searchTerm)}&startswith=true`;
+                            url += `&search=${encodeURIComponent(searchTerm)}`;
                           }
                           
                           if (sortBy) {
@@ -662,16 +645,7 @@ function ProtectedApp() {
                           axiosInstance
                             .get(url)
                             .then((response) => {
-                              let results = response.data.results;
-
-                              if (searchTerm && searchTerm.trim() !== "") {
-                                const lowerSearch = searchTerm.toLowerCase();
-                                results = results.filter((movie) =>
-                                  movie.title.toLowerCase().startsWith(lowerSearch)
-                                );
-                              }
-
-                              setMovies(results);
+                              setMovies(response.data.results);
                               setTotalPages(Math.ceil(response.data.count / 24));
                               setTotalMovies(response.data.count);
                             })
@@ -706,7 +680,7 @@ function ProtectedApp() {
                               let url = `/movies/?page=${currentPage}`;
                               
                               if (searchTerm) {
-                                url += `&search=${encodeURIComponent(searchTerm)}&startswith=true`;
+                                url += `&search=${encodeURIComponent(searchTerm)}`;
                               }
                               
                               if (sortBy) {
@@ -733,16 +707,7 @@ function ProtectedApp() {
                               axiosInstance
                                 .get(url)
                                 .then((response) => {
-                                  let results = response.data.results;
-
-                                  if (searchTerm && searchTerm.trim() !== "") {
-                                    const lowerSearch = searchTerm.toLowerCase();
-                                    results = results.filter((movie) =>
-                                      movie.title.toLowerCase().startsWith(lowerSearch)
-                                    );
-                                  }
-
-                                  setMovies(results);
+                                  setMovies(response.data.results);
                                   setTotalPages(Math.ceil(response.data.count / 24));
                                   setTotalMovies(response.data.count);
                                 })
@@ -786,7 +751,7 @@ function ProtectedApp() {
                             searchTerm
                               ? `&search=${encodeURIComponent(
                                   searchTerm
-                                )}&startswith=true`
+                                )}`
                               : ""
                           }${
                             yearFilter && !isNaN(yearFilter)
@@ -800,19 +765,7 @@ function ProtectedApp() {
                           axiosInstance
                             .get(url)
                             .then((response) => {
-                              let results = response.data.results;
-
-                              // Apply frontend filtering for search if needed
-                              if (searchTerm && searchTerm.trim() !== "") {
-                                const lowerSearch = searchTerm.toLowerCase();
-                                results = results.filter((movie) =>
-                                  movie.title
-                                    .toLowerCase()
-                                    .startsWith(lowerSearch)
-                                );
-                              }
-
-                              setMovies(results);
+                              setMovies(response.data.results);
                               setTotalPages(
                                 Math.ceil(response.data.count / 24)
                               );
@@ -864,7 +817,7 @@ function ProtectedApp() {
                           let url = `/movies/?page=${currentPage}`;
                           
                           if (searchTerm) {
-                            url += `&search=${encodeURIComponent(searchTerm)}&startswith=true`;
+                            url += `&search=${encodeURIComponent(searchTerm)}`;
                           }
                           
                           if (sortBy) {
@@ -887,16 +840,7 @@ function ProtectedApp() {
                           axiosInstance
                             .get(url)
                             .then((response) => {
-                              let results = response.data.results;
-
-                              if (searchTerm && searchTerm.trim() !== "") {
-                                const lowerSearch = searchTerm.toLowerCase();
-                                results = results.filter((movie) =>
-                                  movie.title.toLowerCase().startsWith(lowerSearch)
-                                );
-                              }
-
-                              setMovies(results);
+                              setMovies(response.data.results);
                               setTotalPages(Math.ceil(response.data.count / 24));
                               setTotalMovies(response.data.count);
                             })
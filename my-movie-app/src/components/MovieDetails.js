@@ -8,6 +8,8 @@ import './MovieDetails.css';
 
 const MovieDetails = ({ movie, onClose, onUpdate }) => {
   const [reviews, setReviews] = useState([]);
+  const [reviewStats, setReviewStats] = useState({ count: 0, avg: 0 });
+  const [nextReviewsUrl, setNextReviewsUrl] = useState(null);
   const [reportedReviews, setReportedReviews] = useState([]);
   const [activeTab, setActiveTab] = useState('all'); // 'all' ou 'reported'
   const [newReview, setNewReview] = useState({ rating: 5, comment: '' });
@@ -46,8 +48,11 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
   const fetchReviews = async () => {
     setIsLoading(true);
     try {
+      // Les avis sont paginés : moyenne et nombre d'avis viennent du serveur
       const response = await axiosInstance.get(`/movies/${movie.id}/reviews/`);
-      setReviews(response.data);
+      setReviews(response.data.results);
+      setNextReviewsUrl(response.data.next);
+      setReviewStats({ count: response.data.review_count, avg: response.data.review_avg });
     } catch (error) {
       console.error("Erreur lors de la récupération des commentaires:", error);
     } finally {
@@ -55,6 +60,28 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
     }
   };
 
+  const loadMoreReviews = async () => {
+    try {
+      const response = await axiosInstance.get(nextReviewsUrl);
+      const knownIds = new Set(reviews.map(review => review.id));
+      setReviews([...reviews, ...response.data.results.filter(review => !knownIds.has(review.id))]);
+      setNextReviewsUrl(response.data.next);
+    } catch (error) {
+      console.error("Erreur lors de la récupération des commentaires:", error);
+    }
+  };
+
+  // Met à jour la moyenne et le nombre d'avis après un ajout (+1) ou une suppression (-1)
+  const updateReviewStats = (rating, delta) => {
+    setReviewStats(({ count, avg }) => {
+      const newCount = count + delta;
+      return {
+        count: newCount,
+        avg: newCount > 0 ? (avg * count + rating * delta) / newCount : 0
+      };
+    });
+  };
+
   const fetchReportedReviews = async () => {
     try {
       if (user?.is_staff) {
@@ -88,6 +115,7 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
       
       const updatedReviews = [response.data, ...reviews];
       setReviews(updatedReviews);
+      updateReviewStats(response.data.rating, 1);
       setNewReview({ rating: 5, comment: '' });
     } catch (error) {
       console.error("Erreur lors de l'ajout du commentaire:", error);
@@ -100,6 +128,10 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
       await axiosInstance.delete(`/movies/${movie.id}/delete_review/`, {
         params: { review_id: reviewId }
       });
+      const deleted = reviews.find(review => review.id === reviewId);
+      if (deleted) {
+        updateReviewStats(deleted.rating, -1);
+      }
       setReviews(reviews.filter(review => review.id !== reviewId));
       setReportedReviews(reportedReviews.filter(review => review.id !== reviewId));
     } catch (error) {
@@ -118,6 +150,10 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
 
       // Si le commentaire a été supprimé automatiquement
       if (response.data.message && response.data.message.includes('supprimé automatiquement')) {
+        const deleted = reviews.find(review => review.id === reviewId);
+        if (deleted) {
+          updateReviewStats(deleted.rating, -1);
+        }
         setReviews(reviews.filter(review => review.id !== reviewId));
         setReportedReviews(reportedReviews.filter(review => review.id !== reviewId));
       } else {
@@ -140,8 +176,8 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
   };
 
   // Calcul de la moyenne des notes
-  const averageRating = reviews.length > 0
-    ? (reviews.reduce((sum, review) => sum + review.rating, 0) / reviews.length).toFixed(1)
+  const averageRating = reviewStats.count > 0
+    ? reviewStats.avg.toFixed(1)
     : 'Aucune note';
 
   return (
@@ -186,7 +222,7 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
                       <span className="rating-stars">
                         {renderStars(parseFloat(averageRating))}
                       </span>
-                      <span className="rating-count">({reviews.length} avis)</span>
+                      <span className="rating-count">({reviewStats.count} avis)</span>
                     </>
                   ) : (
                     'Aucune note'
@@ -263,7 +299,8 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
               reviews.length === 0 ? (
                 <p className="no-reviews animate-fadeIn">Aucun commentaire pour le moment. Soyez le premier à donner votre avis !</p>
               ) : (
-                reviews.map(review => (
+                <>
+                {reviews.map(review => (
                   <div 
                     key={review.id} 
                     className="review animate-fadeIn"
@@ -304,7 +341,16 @@ const MovieDetails = ({ movie, onClose, onUpdate }) => {
                     </div>
                     <p className="review-comment">{review.comment}</p>
                   </div>
-                ))
+                ))}
+                {nextReviewsUrl && (
+                  <button
+                    onClick={loadMoreReviews}
+                    className="load-more-reviews transition-colors duration-200 hover:bg-gray-100"
+                  >
+                    Voir plus de commentaires
+                  </button>
+                )}
+                </>
               )
             ) : (
               reportedReviews.length === 0 ? (